@@ -0,0 +1,393 @@
+"""ASGI entry point: async serving mode for the slow upstream endpoints.
+
+Run with any ASGI server, for example:
+
+  uvicorn asgi:app --port 5000
+
+`GET /api/park/<id>` and `POST /api/chat` (including its server-sent events
+stream) are served on the event loop with the async HTTP client and the async
+OpenAI client (see finalproject.outbound), so a slow NPS or OpenAI call holds
+a coroutine instead of a worker thread and one process can wait on hundreds
+of them at once. Every other route is the
+unchanged Flask app from main.py, run on a small thread pool through a
+minimal WSGI bridge.
+
+Upstream calls are bounded by semaphores; a request that cannot get a slot
+within ASYNC_QUEUE_TIMEOUT seconds is answered with 503. Tunable through
+environment variables:
+  ASYNC_NPS_CONCURRENCY   concurrent NPS lookups (default 200)
+  ASYNC_LLM_CONCURRENCY   concurrent OpenAI calls (default 100)
+  ASYNC_QUEUE_TIMEOUT     seconds to wait for a free slot (default 10)
+  ASYNC_NPS_TIMEOUT       NPS request timeout in seconds (default 8)
+  ASYNC_LLM_TIMEOUT       OpenAI request timeout in seconds (default 30)
+  ASYNC_WSGI_THREADS      threads running the Flask routes (default 16)
+"""
+
+import asyncio
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack, asynccontextmanager
+
+import main
+import nps
+from finalproject import outbound
+
+
+# Upstream HTTP failures of the async NPS client (none to catch without httpx).
+HTTP_ERRORS = (outbound.httpx.HTTPError,) if outbound.httpx is not None else ()
+
+
+class Busy(Exception):
+    """No upstream slot became free within the queue timeout."""
+
+
+def _environ(scope, body):
+    """Build a WSGI environ for an ASGI http scope."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_LENGTH':
+            continue
+        key = name if name == 'CONTENT_TYPE' else 'HTTP_' + name
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+def _call_wsgi(wsgi_app, environ):
+    """Run a WSGI app to completion; returns (status code, headers, body)."""
+    started = []
+
+    def start_response(status, headers, exc_info=None):
+        started[:] = [status, headers]
+
+    chunks = wsgi_app(environ, start_response)
+    try:
+        body = b''.join(chunks)
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+    status, headers = started
+    return int(status.split(' ', 1)[0]), [(k.encode('latin-1'), v.encode('latin-1')) for k, v in headers], body
+
+
+async def _read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            break
+    return body
+
+
+async def _send(send, status, headers, body):
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+class EventStream:
+    """Server-sent event strings from an async generator, plus cleanup to run when the response ends."""
+
+    def __init__(self, events, cleanup):
+        self.events = events
+        self.cleanup = cleanup
+
+    def __aiter__(self):
+        return self.events
+
+    async def aclose(self):
+        try:
+            await self.events.aclose()
+        finally:
+            await self.cleanup.aclose()
+
+
+class AsyncApp:
+    """ASGI application: async park detail and chat views in front of the Flask app."""
+
+    def __init__(self, wsgi_app=None, nps_concurrency=None, llm_concurrency=None, queue_timeout=None,
+                 nps_timeout=None, llm_timeout=None, wsgi_threads=None):
+        env = os.environ.get
+        self.wsgi_app = wsgi_app or main.app
+        self.nps_slots = asyncio.Semaphore(nps_concurrency or int(env('ASYNC_NPS_CONCURRENCY', '200')))
+        self.llm_slots = asyncio.Semaphore(llm_concurrency or int(env('ASYNC_LLM_CONCURRENCY', '100')))
+        self.queue_timeout = queue_timeout or float(env('ASYNC_QUEUE_TIMEOUT', '10'))
+        self.nps_timeout = nps_timeout or float(env('ASYNC_NPS_TIMEOUT', '8'))
+        self.llm_timeout = llm_timeout or float(env('ASYNC_LLM_TIMEOUT', '30'))
+        self.pool = ThreadPoolExecutor(max_workers=wsgi_threads or int(env('ASYNC_WSGI_THREADS', '16')),
+                                       thread_name_prefix='wsgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+        method, path = scope['method'], scope['path']
+        if method == 'GET' and path.startswith('/api/park/') and '/' not in path[len('/api/park/'):]:
+            status, payload = await self.park_detail(path[len('/api/park/'):])
+        elif method == 'POST' and path == '/api/chat':
+            status, payload = await self.chat(await _read_body(receive), _wants_stream(scope))
+            if isinstance(payload, EventStream):
+                await self._send_events(send, payload)
+                return
+        else:
+            environ = _environ(scope, await _read_body(receive))
+            loop = asyncio.get_running_loop()
+            await _send(send, *await loop.run_in_executor(self.pool, _call_wsgi, self.wsgi_app, environ))
+            return
+        body = json.dumps(payload).encode('utf-8')
+        await _send(send, status, [(b'content-type', b'application/json'),
+                                   (b'content-length', str(len(body)).encode('ascii'))], body)
+
+    async def _send_events(self, send, events):
+        """Send an async iterator of server-sent event strings as a streamed response."""
+        headers = [(b'content-type', b'text/event-stream; charset=utf-8')]
+        headers += [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in main.SSE_HEADERS.items()]
+        try:
+            await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+            async for event in events:
+                await send({'type': 'http.response.body', 'body': event.encode('utf-8'), 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            await events.aclose()
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await self._blocking(self.warm_up)
+                except Exception as e:
+                    await send({'type': 'lifespan.startup.failed', 'message': f'{type(e).__name__}: {e}'})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await outbound.aclose()
+                self.pool.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def warm_up(self):
+        """Load the park list, the enrichment offset index and the retrieval index before serving."""
+        parks = main.load_parks()
+        if parks:
+            main.snapshot_details(parks[0].get('id'))
+        main.retrieval_index()
+
+    async def _blocking(self, func, *args):
+        """Run a blocking call (file reads, index builds, cache writes) on the thread pool, off the event loop."""
+        return await asyncio.get_running_loop().run_in_executor(self.pool, func, *args)
+
+    @asynccontextmanager
+    async def _slot(self, slots):
+        try:
+            await asyncio.wait_for(slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise Busy() from None
+        try:
+            yield
+        finally:
+            slots.release()
+
+    async def park_detail(self, park_id):
+        """Async twin of main.api_park_detail; returns (status, payload)."""
+        park = await self._blocking(main.CATALOG.get, park_id)
+        if not park:
+            return 404, {'error': 'park not found'}
+
+        details = await self._blocking(main.snapshot_details, park_id)
+        if details:
+            return 200, main.park_detail_payload(park, details)
+
+        nps_key = os.environ.get('NPS_API_KEY')
+        if not nps_key:
+            return 200, {'park': park, 'note': main.NO_NPS_KEY_NOTE}
+
+        async def load():
+            async with self._slot(self.nps_slots):
+                return await nps.search_park_async(park, nps_key, url=main.NPS_API_URL, timeout=self.nps_timeout)
+
+        try:
+            details = await main.NPS_CACHE.get_or_load_async(park_id, load)
+        except Busy:
+            return 503, {'error': 'too many pending NPS lookups, try again shortly'}
+        except HTTP_ERRORS + (ValueError,) as e:
+            # ValueError: the NPS API answered with a body that is not JSON
+            return 502, {'error': 'failed to fetch NPS data', 'detail': str(e)}
+        return 200, main.park_detail_payload(park, details)
+
+    async def chat(self, body, stream=False):
+        """Async twin of main.api_chat; returns (status, payload).
+
+        With `stream` and an LLM answer that is not cached, the payload is an
+        async iterator of server-sent events instead (see main.stream_chat).
+        """
+        started = time.perf_counter()
+        try:
+            data = json.loads(body or b'{}')
+        except ValueError:
+            return 400, {'error': 'expected a JSON body'}
+        if not isinstance(data, dict):
+            return 400, {'error': 'expected a JSON object'}
+        user_message = (data.get('message') or '').lower()
+        if not user_message:
+            return 200, {'response': 'Please ask a question about national parks!'}
+
+        client = outbound.async_llm_client()
+        if client is not None:
+            answer, messages, max_tokens = await self._blocking(main.llm_request, user_message)
+            if answer is not None:
+                main.CHAT_LATENCY.record('local', time.perf_counter() - started)
+                return 200, {'response': answer}
+            key = main.chat_cache_key(user_message, max_tokens)
+            if stream:
+                cached, future, leader = main.CHAT_CACHE.claim_async(key)
+                if not leader:
+                    try:
+                        # shield: giving up must not cancel the call others are waiting on
+                        answer = cached if future is None else await asyncio.shield(future)
+                    except Exception:
+                        return await self._fallback(user_message, started)
+                    main.CHAT_LATENCY.record('cached', time.perf_counter() - started)
+                    return 200, {'response': answer}
+                try:
+                    return 200, await self._open_stream(client, user_message, messages, max_tokens, key, future, started)
+                except BaseException as e:
+                    await main.CHAT_CACHE.land_async(key, future, error=e)
+                    if not isinstance(e, Exception):
+                        raise
+                    return await self._fallback(user_message, started)
+
+            async def ask():
+                async with self._slot(self.llm_slots):
+                    response = await client.chat.completions.create(
+                        model=main.LLM_MODEL,
+                        messages=messages,
+                        max_tokens=max_tokens,
+                        timeout=self.llm_timeout,
+                    )
+                return response.choices[0].message.content.strip()
+
+            try:
+                answer = await main.CHAT_CACHE.get_or_call_async(key, ask)
+                main.CHAT_LATENCY.record('llm', time.perf_counter() - started)
+                return 200, {'response': answer}
+            except Exception:
+                pass  # fall back to the rule-based answer, like the sync view
+
+        return await self._fallback(user_message, started)
+
+    async def _fallback(self, user_message, started):
+        response = await self._blocking(main.chat_fallback, user_message)
+        main.CHAT_LATENCY.record('fallback', time.perf_counter() - started)
+        return 200, {'response': response}
+
+    async def _open_stream(self, client, user_message, messages, max_tokens, key, future, started):
+        """Start an OpenAI completion stream and return its server-sent events.
+
+        The LLM slot is held until the stream ends, and the answer lands
+        `future` (from CHAT_CACHE.claim_async) for requests waiting on it.
+        Errors before the stream opens are raised, so the caller can still
+        answer with plain JSON.
+        """
+        async with AsyncExitStack() as stack:
+            await stack.enter_async_context(self._slot(self.llm_slots))
+            stream = await client.chat.completions.create(
+                model=main.LLM_MODEL,
+                messages=messages,
+                max_tokens=max_tokens,
+                timeout=self.llm_timeout,
+                stream=True,
+            )
+            stack.push_async_callback(stream.close)
+            # never leave joined requests waiting, even if the events are not consumed
+            stack.push_async_callback(main.CHAT_CACHE.land_async, key, future, None,
+                                      RuntimeError('the stream was not completed'))
+            cleanup = stack.pop_all()
+
+        async def events():
+            main.CHAT_LATENCY.record('stream_first_byte', time.perf_counter() - started)
+            parts = []
+            try:
+                async for chunk in stream:
+                    delta = main.chunk_text(chunk)
+                    if delta:
+                        if not parts:
+                            main.CHAT_LATENCY.record('stream_first_token', time.perf_counter() - started)
+                        parts.append(delta)
+                        yield main.sse_event({'delta': delta})
+            except Exception as e:
+                await main.CHAT_CACHE.land_async(key, future, error=e)
+                if parts:
+                    yield main.sse_event({'error': 'the AI response was interrupted', 'detail': str(e)}, event='error')
+                    return
+                parts = [await self._blocking(main.chat_fallback, user_message)]
+            else:
+                await main.CHAT_CACHE.land_async(key, future, ''.join(parts).strip(), load_s=time.perf_counter() - started)
+            main.CHAT_LATENCY.record('stream_total', time.perf_counter() - started)
+            yield main.sse_event({'response': ''.join(parts).strip()}, event='done')
+
+        return EventStream(events(), cleanup)
+
+
+def _wants_stream(scope):
+    if b'stream=1' in scope.get('query_string', b'').split(b'&'):
+        return True
+    return any(name == b'accept' and b'text/event-stream' in value for name, value in scope.get('headers', []))
+
+
+async def call(app, method, path, body=b'', headers=()):
+    """Send one request to an ASGI app in-process; returns (status, headers dict, body).
+
+    For tests and loadtest_async.py, which exercise the app without a server.
+    """
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'scheme': 'http',
+        'method': method, 'path': path, 'raw_path': path.encode('utf-8'), 'root_path': '',
+        'query_string': query.encode('latin-1'), 'server': ('127.0.0.1', 5000), 'client': ('127.0.0.1', 0),
+        'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers],
+    }
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    start = sent[0]
+    return (start['status'], {k.decode('latin-1'): v.decode('latin-1') for k, v in start['headers']},
+            b''.join(m.get('body', b'') for m in sent[1:]))
+
+
+app = AsyncApp()
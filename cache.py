@@ -0,0 +1,429 @@
+"""Small thread-safe TTL + LRU cache used for slow upstream lookups.
+
+Entries live for `ttl` seconds. After that they are still served for up to
+`stale_ttl` more seconds while a background thread refreshes them
+(stale-while-revalidate), so a hot key never waits on the network twice.
+`get_or_load_async` does the same for coroutine loaders on an event loop.
+A loader result of None is treated as a "no match" answer and cached for the
+shorter `negative_ttl`. Loader exceptions are never cached.
+
+`PromptCache` caches LLM answers by normalized prompt. Concurrent requests for
+the same prompt share one upstream call (single flight), and entries can be
+persisted to a JSON Lines file so they survive restarts.
+"""
+
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    def __init__(self, maxsize=256, ttl=3600.0, negative_ttl=300.0, stale_ttl=86400.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self._lock = threading.Lock()
+        # key -> (value, fresh_until, stale_until)
+        self._data = OrderedDict()
+        self._refreshing = set()
+        self._tasks = set()  # running async refreshes (kept referenced until done)
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refresh_errors = 0
+
+    def _entry(self, value, now):
+        fresh_until = now + (self.ttl if value is not None else self.negative_ttl)
+        return (value, fresh_until, fresh_until + self.stale_ttl)
+
+    def set(self, key, value):
+        now = time.monotonic()
+        with self._lock:
+            self._data[key] = self._entry(value, now)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def _lookup(self, key):
+        """Return (state, value): 'hit', 'refresh' (stale, caller refreshes) or 'miss'."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, fresh_until, stale_until = entry
+                if now < fresh_until:
+                    self.hits += 1
+                    self._data.move_to_end(key)
+                    return 'hit', value
+                if now < stale_until:
+                    self.stale_hits += 1
+                    self._data.move_to_end(key)
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        return 'refresh', value
+                    return 'hit', value
+                del self._data[key]
+            self.misses += 1
+            return 'miss', None
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for `key`, calling `loader()` on a miss.
+
+        Exceptions raised by `loader` propagate to the caller on a miss; during
+        a background refresh they are counted and the stale value is kept.
+        """
+        state, value = self._lookup(key)
+        if state == 'refresh':
+            threading.Thread(target=self._refresh, args=(key, loader), daemon=True).start()
+        if state != 'miss':
+            return value
+        value = loader()
+        self.set(key, value)
+        return value
+
+    async def get_or_load_async(self, key, loader):
+        """Like `get_or_load` for a coroutine function `loader`; refreshes run as tasks."""
+        state, value = self._lookup(key)
+        if state == 'refresh':
+            task = asyncio.ensure_future(self._refresh_async(key, loader))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        if state != 'miss':
+            return value
+        value = await loader()
+        self.set(key, value)
+        return value
+
+    def _refresh(self, key, loader):
+        try:
+            self.set(key, loader())
+        except Exception:
+            with self._lock:
+                self.refresh_errors += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    async def _refresh_async(self, key, loader):
+        try:
+            self.set(key, await loader())
+        except Exception:
+            with self._lock:
+                self.refresh_errors += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'refresh_errors': self.refresh_errors,
+                'hit_rate': round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+_PUNCT = re.compile(r'[^\w\s]+')
+_MISSING = object()
+
+
+def normalize_prompt(text: str) -> str:
+    """Case-fold, drop punctuation and collapse whitespace: "Yellowstone?" == "yellowstone"."""
+    return ' '.join(_PUNCT.sub(' ', text.casefold()).split())
+
+
+class _Flight:
+    """One in-progress upstream call that other threads can wait on."""
+
+    __slots__ = ('done', 'value', 'error', 'landed')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.landed = False
+
+    def result(self):
+        """Wait for the call to finish; return its value or raise its error."""
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class PromptCache:
+    """TTL + LRU cache of LLM answers with single-flight loading.
+
+    Keys are built by the caller (normally from `normalize_prompt`). A miss
+    calls the upstream once; threads (`get_or_call`) or coroutines
+    (`get_or_call_async`) asking for the same key meanwhile wait for that call
+    instead of making their own. Callers that assemble the answer themselves,
+    such as a streamed reply, take part through `claim`/`land` (or the
+    `_async` pair). Errors are never cached; they are raised to the caller
+    and to everyone waiting on the same call.
+
+    With `path`, every stored answer is appended to a JSON Lines file that is
+    replayed on startup; the file is rewritten from memory when it grows past
+    twice `maxsize` lines. Expiry uses wall-clock time so it survives restarts.
+    """
+
+    def __init__(self, maxsize=1024, ttl=86400.0, path=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = path
+        self._lock = threading.Lock()
+        # key -> (value, expires_at, upstream seconds it took to produce)
+        self._data = OrderedDict()
+        self._flights = {}
+        self._async_flights = {}
+        self._disk_lines = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+        self.upstream_seconds = 0.0
+        if path:
+            self._load_disk()
+
+    def _fresh(self, key):
+        """Cached value for `key` (counting the hit) or _MISSING; call with the lock held."""
+        entry = self._data.get(key)
+        if entry is None:
+            return _MISSING
+        value, expires_at, load_s = entry
+        if time.time() >= expires_at:
+            del self._data[key]
+            return _MISSING
+        self.hits += 1
+        self.saved_seconds += load_s
+        self._data.move_to_end(key)
+        return value
+
+    def _store(self, key, value, load_s):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self.upstream_seconds += load_s
+            self._data[key] = (value, expires_at, load_s)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+            if self.path:
+                self._append_disk(key, value, expires_at, load_s)
+
+    def get(self, key):
+        """Cached value for `key`, or None (counted as a miss: the caller will go upstream)."""
+        with self._lock:
+            value = self._fresh(key)
+            if value is _MISSING:
+                self.misses += 1
+                return None
+        return value
+
+    def put(self, key, value, load_s=0.0):
+        """Store an answer produced outside `get_or_call` (e.g. assembled from a stream)."""
+        self._store(key, value, load_s)
+
+    def claim(self, key):
+        """Cached answer for `key`, or a share in the upstream call producing it.
+
+        For callers that produce the answer themselves (e.g. by relaying a
+        stream). Returns (value, flight, leader). On a hit `flight` is None.
+        Otherwise `flight` is the call in progress for `key`: the caller
+        started it if `leader` is True and must end it with `land()`; if not,
+        `flight.result()` waits for the leader's answer.
+        """
+        with self._lock:
+            value = self._fresh(key)
+            if value is not _MISSING:
+                return value, None, False
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                return None, flight, False
+            flight = self._flights[key] = _Flight()
+            self.misses += 1
+            return None, flight, True
+
+    def land(self, key, flight, value=None, error=None, load_s=0.0):
+        """End a flight from `claim`: cache `value` (or record `error`) and wake its waiters.
+
+        Only the first call for a flight counts, so cleanup hooks may call it unconditionally.
+        """
+        with self._lock:
+            if flight.landed:
+                return
+            flight.landed = True
+            if error is not None:
+                self.errors += 1
+        try:
+            if error is None:
+                flight.value = value
+                self._store(key, value, load_s)
+            else:
+                flight.error = error
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.done.set()
+
+    def get_or_call(self, key, call):
+        """Return the cached answer for `key`, or `call()` it once for all concurrent callers."""
+        value, flight, leader = self.claim(key)
+        if flight is None:
+            return value
+        if not leader:
+            return flight.result()
+        t0 = time.perf_counter()
+        try:
+            value = call()
+        except BaseException as e:
+            self.land(key, flight, error=e)
+            raise
+        self.land(key, flight, value, load_s=time.perf_counter() - t0)
+        return value
+
+    def claim_async(self, key):
+        """`claim` for coroutines on the running loop; the flight is a future to await (shielded)."""
+        with self._lock:
+            value = self._fresh(key)
+            if value is not _MISSING:
+                return value, None, False
+            future = self._async_flights.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return None, future, False
+            future = self._async_flights[key] = asyncio.get_running_loop().create_future()
+            self.misses += 1
+            return None, future, True
+
+    async def land_async(self, key, future, value=None, error=None, load_s=0.0):
+        """`land` for a future from `claim_async`."""
+        if future.done():
+            return
+        try:
+            if error is not None:
+                with self._lock:
+                    self.errors += 1
+                if isinstance(error, asyncio.CancelledError):
+                    error = RuntimeError('upstream call was cancelled')
+                future.set_exception(error)
+                future.exception()  # retrieved here, so an unwaited failure is not logged
+            else:
+                future.set_result(value)
+                if self.path:  # the disk append must not block the event loop
+                    await asyncio.get_running_loop().run_in_executor(None, self._store, key, value, load_s)
+                else:
+                    self._store(key, value, load_s)
+        finally:
+            with self._lock:
+                if self._async_flights.get(key) is future:
+                    del self._async_flights[key]
+
+    async def get_or_call_async(self, key, call):
+        """`get_or_call` for a coroutine function `call`, coalescing callers on the running loop."""
+        value, future, leader = self.claim_async(key)
+        if future is None:
+            return value
+        if not leader:
+            # shield: a waiter that gives up must not cancel the shared call
+            return await asyncio.shield(future)
+        t0 = time.perf_counter()
+        try:
+            value = await call()
+        except BaseException as e:
+            await self.land_async(key, future, error=e)
+            raise
+        await self.land_async(key, future, value, load_s=time.perf_counter() - t0)
+        return value
+
+    # persistence
+
+    def _load_disk(self):
+        now = time.time()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return
+        for line in lines:
+            try:
+                rec = json.loads(line)
+                key, value, expires_at, load_s = rec['k'], rec['v'], rec['e'], rec['s']
+            except (ValueError, KeyError, TypeError):
+                continue  # torn or foreign line
+            if expires_at > now:
+                self._data[key] = (value, expires_at, load_s)
+                self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        self._disk_lines = len(lines)
+
+    def _append_disk(self, key, value, expires_at, load_s):
+        """Append one entry (lock held); compacts the file when it has grown too long."""
+        if self._disk_lines >= 2 * self.maxsize:
+            self._rewrite_disk()
+            return
+        line = json.dumps({'k': key, 'v': value, 'e': expires_at, 's': load_s})
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+            self._disk_lines += 1
+        except OSError:
+            pass  # persistence is best effort
+
+    def _rewrite_disk(self):
+        tmp = f'{self.path}.tmp'
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                for key, (value, expires_at, load_s) in self._data.items():
+                    f.write(json.dumps({'k': key, 'v': value, 'e': expires_at, 's': load_s}) + '\n')
+            os.replace(tmp, self.path)
+            self._disk_lines = len(self._data)
+        except OSError:
+            pass
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            if self.path:
+                self._rewrite_disk()
+
+    def stats(self) -> dict:
+        with self._lock:
+            saved_calls = self.hits + self.coalesced
+            lookups = saved_calls + self.misses
+            upstream_calls = self.misses - self.errors
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'errors': self.errors,
+                'evictions': self.evictions,
+                'hit_rate': round(saved_calls / lookups, 4) if lookups else 0.0,
+                'saved_calls': saved_calls,
+                'saved_seconds': round(self.saved_seconds, 3),
+                'avg_upstream_seconds': round(self.upstream_seconds / upstream_calls, 3) if upstream_calls else 0.0,
+            }
@@ -0,0 +1,147 @@
+"""In-memory parks catalog shared by the Flask app.
+
+The catalog parses `data/parks.json` once and keeps the list plus an id index
+in memory. Each access does a cheap `os.stat` and only re-parses the file when
+its mtime or size changed, so `update_parks.py` can rewrite the data while the
+server is running. Both JSON arrays and JSON Lines files are accepted.
+
+`LazyCatalog` is the variant for large files that are only queried by id: it
+keeps an on-disk offset index and decodes just the requested record.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+from finalproject.recordfile import RecordFile, read_records
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+
+def encode_json(obj):
+    """Serialize `obj` once and pre-compress it.
+
+    Returns a dict with the content hash under 'etag' and the body bytes for
+    each supported content coding ('identity', 'gzip' and, when the optional
+    `brotli` package is installed, 'br').
+    """
+    body = json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    encoded = {
+        'etag': hashlib.sha256(body).hexdigest()[:32],
+        'identity': body,
+        'gzip': gzip.compress(body, compresslevel=9, mtime=0),
+    }
+    if brotli is not None:
+        encoded['br'] = brotli.compress(body)
+    return encoded
+
+
+class ParksCatalog:
+    """Thread-safe, lazily reloaded view of a parks JSON file.
+
+    The parsed data is held in a single immutable snapshot tuple that is swapped
+    atomically on reload, so readers in a threaded WSGI server never see a half
+    built index and never need to take the lock.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        # (stamp, version, parks list, {id: park})
+        self._snapshot = (None, 0, [], {})
+        # name -> (version, value) for data built from the park list
+        self._derived = {}
+        # name -> lock, so concurrent first requests build each value once
+        self._build_locks = {}
+
+    def _stat(self):
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def _refresh(self, force=False):
+        stamp = self._stat()
+        if not force and stamp == self._snapshot[0]:
+            return self._snapshot
+        with self._lock:
+            current = self._snapshot
+            if not force and stamp == current[0]:
+                return current
+            try:
+                parks = read_records(self.path)
+            except ValueError:
+                # The file may be caught mid-rewrite; keep serving the previous
+                # snapshot and try again on the next access.
+                if current[0] is None:
+                    raise
+                return current
+            by_id = {p.get('id'): p for p in parks if p.get('id') is not None}
+            self._snapshot = (stamp, current[1] + 1, parks, by_id)
+            return self._snapshot
+
+    @property
+    def version(self):
+        """Counter bumped on every successful (re)load."""
+        return self._refresh()[1]
+
+    def parks(self):
+        """Return the full park list. Callers must treat it as read-only."""
+        return self._refresh()[2]
+
+    def get(self, park_id):
+        """Return the park with the given id, or None."""
+        return self._refresh()[3].get(park_id)
+
+    def derived(self, name, build):
+        """Return `build(parks)`, computed once per catalog version.
+
+        Use this for indexes and serialized forms of the park list; the value is
+        rebuilt automatically after the file changes.
+        """
+        version, parks = self._refresh()[1:3]
+        cached = self._derived.get(name)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        with self._lock:
+            build_lock = self._build_locks.setdefault(name, threading.Lock())
+        with build_lock:
+            cached = self._derived.get(name)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            value = build(parks)
+            self._derived[name] = (version, value)
+        return value
+
+    def encoded(self):
+        """Return the park list pre-serialized by `encode_json`."""
+        return self.derived('encoded', encode_json)
+
+    def reload(self):
+        """Force a re-read of the file regardless of its mtime/size."""
+        return self._refresh(force=True)[1]
+
+
+class LazyCatalog:
+    """Id lookups into a large JSON array / JSON Lines file without loading it.
+
+    Records are read through a memory map using the `<file>.idx` offset index,
+    which is rebuilt automatically when the file is replaced.
+    """
+
+    def __init__(self, path, key='id'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = RecordFile(path, key=key)
+
+    def get(self, record_id):
+        """Return the record with the given id, or None."""
+        with self._lock:
+            return self._file.get(record_id)
+
+    def __iter__(self):
+        """Stream every record; the file is scanned, never loaded whole."""
+        return iter(RecordFile(self.path, key=self._file.key))
@@ -0,0 +1,79 @@
+"""Build data/nps_enrichment.json from the NPS API ahead of time.
+
+The Flask app serves park details straight from this snapshot and only falls
+back to a live NPS request for parks that are missing from it.
+
+Usage:
+  python enrich_parks.py                 # uses NPS_API_KEY from the environment
+  python enrich_parks.py --workers 8 --page-size 100
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import nps
+
+BASE_DIR = os.path.dirname(__file__)
+PARKS_PATH = os.path.join(BASE_DIR, 'data', 'parks.json')
+ENRICHMENT_PATH = os.path.join(BASE_DIR, 'data', 'nps_enrichment.json')
+
+
+def build_snapshot(parks, nps_key, url=nps.NPS_API_URL, page_size=100, workers=4):
+    """Return a list of {'id', 'nps'} records, one per park in `parks`."""
+    items = nps.fetch_all_parks(nps_key, url=url, page_size=page_size, workers=workers)
+    matched = nps.match_parks(parks, items)
+
+    # Parks not found in the bulk listing get one targeted search each.
+    missing = [p for p in parks if p.get('id') not in matched]
+
+    def search(park):
+        try:
+            return park['id'], nps.search_park(park, nps_key, url=url, fallback_first=False)
+        except requests.RequestException:
+            return park['id'], None
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for park_id, details in pool.map(search, missing):
+            if details:
+                matched[park_id] = details
+
+    return [{'id': p['id'], 'nps': matched.get(p['id'])} for p in parks if p.get('id')]
+
+
+def write_snapshot(records, path=ENRICHMENT_PATH):
+    # write through a temp file so the running server never reads a partial snapshot
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(records, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fetch NPS details for every park in data/parks.json')
+    parser.add_argument('--parks', default=PARKS_PATH, help='parks JSON to enrich')
+    parser.add_argument('--out', default=ENRICHMENT_PATH, help='snapshot file to write')
+    parser.add_argument('--workers', type=int, default=4, help='concurrent NPS requests')
+    parser.add_argument('--page-size', type=int, default=100, help='NPS records per page')
+    args = parser.parse_args(argv)
+
+    nps_key = os.environ.get('NPS_API_KEY')
+    if not nps_key:
+        parser.error('NPS_API_KEY is not set')
+
+    with open(args.parks, 'r', encoding='utf-8') as f:
+        parks = json.load(f)
+
+    started = time.perf_counter()
+    records = build_snapshot(parks, nps_key, page_size=args.page_size, workers=args.workers)
+    write_snapshot(records, args.out)
+    matched = sum(1 for r in records if r['nps'])
+    print(f"Enriched {matched}/{len(records)} parks in {time.perf_counter() - started:.1f}s -> {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Benchmark intent routing for the chat fallback and the agent rules.
+
+Usage:
+  python -m finalproject.bench_intents
+  python -m finalproject.bench_intents --count 500000
+
+Routes a mix of realistic messages through `intents.CHAT_ROUTER` and
+`intents.AGENT_ROUTER` and, for comparison, through the if/elif substring
+chains they replaced. Reports messages per second; the target is 100k/s.
+"""
+
+import argparse
+import itertools
+import time
+
+from finalproject.intents import AGENT_ROUTER, CHAT_ROUTER
+
+MESSAGES = [
+    'hello!',
+    'tell me about yellowstone',
+    'how big is the grand canyon?',
+    'I want to plan a visit next summer',
+    'which state is zion located in',
+    'what wildlife can I see in the everglades',
+    'what are the best trails for a long weekend with kids and a dog',
+    'find parks in CA',
+    'plan visit to Grand Teton on 2025-07-10 for 3',
+    'import parks',
+    'list parks',
+    'add park Great Basin NV',
+    'add visit to Rocky Mountain party 4',
+    'what is the weather like',
+]
+
+
+def old_chat(m):
+    if 'hello' in m or 'hi' in m:
+        return 'greeting'
+    elif 'yellowstone' in m:
+        return 'yellowstone'
+    elif 'grand canyon' in m:
+        return 'grand_canyon'
+    elif 'visit' in m or 'plan' in m:
+        return 'visit'
+    elif 'state' in m or 'location' in m:
+        return 'location'
+    elif 'animal' in m or 'wildlife' in m:
+        return 'wildlife'
+    return 'unknown'
+
+
+def old_agent(t):
+    if ('find' in t or 'parks' in t) and ' in ' in t:
+        t.split(' in ', 1)[1].strip()
+        return 'find_parks'
+    if 'plan' in t and 'visit' in t and ' to ' in t:
+        return 'plan_visit'
+    if 'import' in t and 'park' in t:
+        return 'import_parks'
+    if 'list' in t and 'park' in t:
+        return 'list_parks'
+    if t.startswith('add park'):
+        return 'add_park'
+    if t.startswith('add visit') or ('add' in t and 'visit' in t):
+        return 'add_visit'
+    return 'unknown'
+
+
+def rate(route, messages):
+    t0 = time.perf_counter()
+    for m in messages:
+        route(m)
+    return len(messages) / (time.perf_counter() - t0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    messages = [m.lower() for m in itertools.islice(itertools.cycle(MESSAGES), args.count)]
+    print(f"{args.count} messages")
+    print(f"{'router':<18} {'msgs/s':>12}")
+    for label, route in (('chat if/elif', old_chat), ('chat router', CHAT_ROUTER.route),
+                         ('agent if/elif', old_agent), ('agent router', AGENT_ROUTER.route)):
+        print(f"{label:<18} {rate(route, messages):>12,.0f}")
+
+
+if __name__ == '__main__':
+    main()
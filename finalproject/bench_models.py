@@ -0,0 +1,89 @@
+"""Benchmark Visit row decoding/encoding and memory for a large history.
+
+Usage:
+  python -m finalproject.bench_models
+  python -m finalproject.bench_models --count 200000
+
+Compares the slotted `models.Visit` with its positional `from_row`/`to_row`
+against the previous layout: a plain dataclass (one `__dict__` per object)
+built with keyword arguments and encoded with a getattr dict comprehension.
+Also times parsing the rows from JSON with the stdlib and, if installed, orjson.
+"""
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Optional
+
+from finalproject import models
+
+
+@dataclass
+class DictVisit:
+    id: str
+    park_id: str
+    trail: Optional[str]
+    start: Optional[str]
+    end: Optional[str]
+    party_size: int
+    notes: Optional[str]
+    created_at: str
+
+
+def old_decode(r):
+    return DictVisit(id=r['id'], park_id=r['park_id'], trail=r.get('trail'), start=r.get('start'), end=r.get('end'), party_size=r.get('party_size', 1), notes=r.get('notes'), created_at=r.get('created_at'))
+
+
+def old_encode(v):
+    return {f: getattr(v, f) for f in models.VISIT_FIELDS}
+
+
+def make_rows(n):
+    return [{'id': f'{i:08d}', 'park_id': f'park-{i % 500}', 'trail': None, 'start': None, 'end': None,
+             'party_size': 1 + i % 4, 'notes': None, 'created_at': '2025-01-01T00:00:00'} for i in range(n)]
+
+
+def measure(label, rows, decode, encode):
+    gc.collect()
+    t0 = time.perf_counter()
+    objs = list(map(decode, rows))
+    decode_s = time.perf_counter() - t0
+    del objs
+    gc.collect()
+    tracemalloc.start()
+    objs = list(map(decode, rows))
+    mem = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    t0 = time.perf_counter()
+    for o in objs:
+        encode(o)
+    encode_s = time.perf_counter() - t0
+    print(f"{label:<18} {decode_s:>9.3f} {encode_s:>9.3f} {mem / 1e6:>9.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    rows = make_rows(args.count)
+    print(f"{args.count} visits")
+    print(f"{'model':<18} {'decode s':>9} {'encode s':>9} {'objects MB':>9}")
+    measure('dataclass+kwargs', rows, old_decode, old_encode)
+    measure('slots+positional', rows, models.Visit.from_row, models.Visit.to_row)
+
+    text = json.dumps({'visits': rows}).encode('utf-8')
+    t0 = time.perf_counter()
+    json.loads(text)
+    print(f"json.loads        {time.perf_counter() - t0:>9.3f} s for {len(text) / 1e6:.0f} MB")
+    if models.orjson is not None:
+        t0 = time.perf_counter()
+        models.json_loads(text)
+        print(f"orjson.loads      {time.perf_counter() - t0:>9.3f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Benchmark the park retrieval index on a synthetic corpus.
+
+Usage:
+  python -m finalproject.bench_retrieval
+  python -m finalproject.bench_retrieval --docs 20000 --queries 2000
+
+Builds a `retrieval.VectorIndex` over `--docs` generated park descriptions
+(about 60 words each, Zipf-ish vocabulary), then reports build time, the
+size of the saved .npz, and top-3 query latency. The target is under 5 ms
+per query for thousands of documents.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from finalproject.retrieval import STATE_NAMES, VectorIndex, park_text
+
+
+def corpus(count, rng):
+    vocab = [f'w{i}' for i in range(20_000)]
+    weights = [1.0 / (i + 1) for i in range(len(vocab))]
+    states = list(STATE_NAMES)
+    for i in range(count):
+        words = rng.choices(vocab, weights, k=60)
+        park = {'name': f'park{i} {words[0]}', 'state': rng.choice(states)}
+        yield f'p{i}', park_text(park, {'description': ' '.join(words)})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--docs', type=int, default=5000)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    docs = list(corpus(args.docs, rng))
+    t0 = time.perf_counter()
+    index = VectorIndex.build(docs)
+    build = time.perf_counter() - t0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'vectors.npz')
+        index.save(path)
+        size = os.path.getsize(path)
+        t0 = time.perf_counter()
+        VectorIndex.load(path)
+        load = time.perf_counter() - t0
+
+    queries = [' '.join(rng.choice(text.split()) for _ in range(rng.randint(1, 6))) for _, text in rng.choices(docs, k=args.queries)]
+    samples = []
+    for q in queries:
+        t0 = time.perf_counter()
+        index.search(q, k=3)
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+
+    print(f"{args.docs} docs, {len(index.docs)} nonzeros, {size / 1024:.0f} KiB on disk")
+    print(f"{'step':<18} {'ms':>9}")
+    print(f"{'build':<18} {build * 1000:>9.3f}")
+    print(f"{'load':<18} {load * 1000:>9.3f}")
+    print(f"{'query p50':<18} {samples[len(samples) // 2] * 1000:>9.3f}")
+    print(f"{'query p95':<18} {samples[int(len(samples) * 0.95)] * 1000:>9.3f}")
+    print(f"{'query max':<18} {samples[-1] * 1000:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
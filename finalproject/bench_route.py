@@ -0,0 +1,46 @@
+"""Benchmark the route planner: tour length vs. improvement time budget.
+
+Usage:
+  python -m finalproject.bench_route
+  python -m finalproject.bench_route --sizes 50 500 5000 --budgets 0 0.25 1 4
+
+Stops are random points over the contiguous US (fixed seed). For each size we
+report the greedy nearest-neighbour length and the improved length reached
+within each time budget.
+"""
+
+import argparse
+import random
+import time
+
+from finalproject import route
+
+
+def random_parks(n, seed=0):
+    rng = random.Random(seed)
+    return [{'id': str(i), 'lat': rng.uniform(25.0, 49.0), 'lon': rng.uniform(-124.0, -67.0)} for i in range(n)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50, 500, 5000])
+    parser.add_argument('--budgets', type=float, nargs='+', default=[0.0, 0.25, 1.0, 4.0])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    start = (39.74, -104.99)  # Denver
+    print(f"{'stops':>6} {'matrix s':>9} {'budget s':>9} {'elapsed s':>10} {'greedy km':>11} {'route km':>11} {'gain':>7}")
+    for n in args.sizes:
+        parks = random_parks(n, args.seed)
+        t0 = time.perf_counter()
+        matrix = route.DistanceMatrix(parks)
+        build = time.perf_counter() - t0
+        for budget in args.budgets:
+            plan = route.plan_route(matrix, start, time_budget=budget)
+            gain = 1 - plan.total_km / plan.initial_km if plan.initial_km else 0.0
+            print(f"{n:>6} {build:>9.3f} {budget:>9.2f} {plan.elapsed_s:>10.3f} "
+                  f"{plan.initial_km:>11.0f} {plan.total_km:>11.0f} {gain:>6.1%}")
+
+
+if __name__ == '__main__':
+    main()
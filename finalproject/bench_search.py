@@ -0,0 +1,97 @@
+"""Benchmark the inverted-index task search against a linear substring scan.
+
+Usage:
+  python -m finalproject.bench_search
+  python -m finalproject.bench_search --tasks 100000 --queries 200
+
+Tasks are synthetic (title, description and tags drawn from a Zipf-like
+vocabulary, fixed seed). We report index build/save/load time and the
+median and 95th percentile latency of single- and multi-word queries,
+next to the per-query cost of the old scan in `tasks1_tasks.search_tasks`.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from finalproject.textsearch import SearchIndex
+
+
+def make_vocabulary(n, rng):
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    return [''.join(rng.choice(letters) for _ in range(rng.randint(3, 9))) for _ in range(n)]
+
+
+def make_tasks(n, seed=0):
+    rng = random.Random(seed)
+    vocab = make_vocabulary(20000, rng)
+    weights = [1.0 / (i + 1) for i in range(len(vocab))]
+
+    def words(k):
+        return ' '.join(rng.choices(vocab, weights, k=k))
+
+    tasks = [{'id': i + 1, 'title': words(4), 'description': words(16), 'tags': rng.choices(vocab[:50], k=2)}
+             for i in range(n)]
+    return tasks, vocab
+
+
+def task_text(t):
+    return ' '.join([t['title'], t['description'], ' '.join(t['tags'])])
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tasks', type=int, default=100_000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    tasks, vocab = make_tasks(args.tasks, args.seed)
+    t0 = time.perf_counter()
+    index = SearchIndex.build((t['id'], task_text(t)) for t in tasks)
+    build = time.perf_counter() - t0
+    path = os.path.join(tempfile.mkdtemp(), 'tasks.index.json')
+    t0 = time.perf_counter()
+    index.save(path)
+    save = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    index = SearchIndex.load(path)
+    load = time.perf_counter() - t0
+    print(f"{args.tasks} tasks, {len(index.postings)} terms: build {build:.2f}s, save {save:.2f}s, "
+          f"load {load:.2f}s, file {os.path.getsize(path) / 1e6:.1f} MB")
+
+    rng = random.Random(args.seed + 1)
+    kinds = {
+        'one word': lambda: rng.choice(vocab[:2000]),
+        'two words': lambda: ' '.join(rng.sample(vocab[:200], 2)),
+        'prefix': lambda: rng.choice(vocab[:2000])[:3],
+        'common word': lambda: rng.choice(vocab[:10]),
+    }
+    print(f"{'query':<12} {'p50 ms':>8} {'p95 ms':>8} {'avg hits':>9}")
+    for kind, make in kinds.items():
+        times, hits = [], []
+        for _ in range(args.queries):
+            q = make()
+            t0 = time.perf_counter()
+            res = index.search(q, limit=20)
+            times.append((time.perf_counter() - t0) * 1000)
+            hits.append(len(res))
+        print(f"{kind:<12} {statistics.median(times):>8.2f} {percentile(times, 0.95):>8.2f} "
+              f"{statistics.mean(hits):>9.1f}")
+
+    q = vocab[100]
+    t0 = time.perf_counter()
+    [t for t in tasks if q in task_text(t).lower()]
+    print(f"{'linear scan':<12} {(time.perf_counter() - t0) * 1000:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,151 +1,743 @@
-import json
+import bisect
+import itertools
+import os
 import pathlib
-from typing import List, Optional
-from .models import Park, Visit
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+from . import snapshot
+from .fuzzy import NameIndex
+from .models import Park, Visit, json_dumps, json_loads
 
 DATA_PATH = pathlib.Path(__file__).parent / "data.json"
+SQLITE_PATH = pathlib.Path(__file__).parent / "data.db"
 
+# Storage backend: "json" (data.json, the default), "journal" (data.json plus an
+# append-only data.journal, see journal_store.py) or "sqlite" (data.db).
+STORE = os.environ.get('TRACKER_STORE', 'json')
+
+# File format written to DATA_PATH: "json" (indented JSON) or "snapshot" (the
+# columnar binary layout in snapshot.py). Either format is read back.
+DATA_FORMAT = os.environ.get('TRACKER_FORMAT', 'json')
 
 def _read_data() -> dict:
     if not DATA_PATH.exists():
         return {"parks": [], "visits": []}
-    with open(DATA_PATH, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    if snapshot.is_snapshot(DATA_PATH):
+        return snapshot.load(DATA_PATH)
+    with open(DATA_PATH, 'rb') as f:
+        return json_loads(f.read())
 
 
 def _write_data(data: dict):
     DATA_PATH.parent.mkdir(parents=True, exist_ok=True)
     tmp = DATA_PATH.with_suffix('.tmp')
-    with open(tmp, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2)
+    with open(tmp, 'wb') as f:
+        f.write(snapshot.dumps(data) if DATA_FORMAT == 'snapshot' else json_dumps(data, indent=True))
+        f.flush()
+        os.fsync(f.fileno())
     tmp.replace(DATA_PATH)
+    _fsync_dir(DATA_PATH.parent)
+
+
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def _fsync_dir(path):
+    """Make a rename in `path` durable; not every platform can open a directory."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _split_states(value) -> List[str]:
+    """'CA, nv' -> ['CA', 'NV']; parks spanning several states list them with commas."""
+    return [t.strip().upper() for t in str(value).split(',') if t.strip()]
+
+
+class ParkIndexes:
+    """Secondary indexes over park rows, kept up to date by the stores.
+
+    - state -> park ids (a park listed as "CA,NV" is filed under both)
+    - case-folded name -> first park row with that name
+    - a character trie over case-folded names for prefix search
+    - visit count per park id
+    - all park ids ordered by (name, id), the `list_parks` order
+    - a fuzzy name/park-code index (`fuzzy`), built on first use after a change
+    """
+
+    def __init__(self, parks, visit_counts):
+        self.rows = {}
+        self.by_state = {}
+        self.by_casefold = {}
+        self.trie = {}
+        self.order = []
+        self.visit_counts = Counter(visit_counts)
+        self._fuzzy = None
+        for r in parks:
+            self.add_park(r)
+
+    @staticmethod
+    def _sort_key(row):
+        return (row.get('name') or '', row.get('id'))
+
+    def add_park(self, row: dict):
+        pid = row['id']
+        self.rows[pid] = row
+        self._fuzzy = None
+        for code in _split_states(row.get('state') or ''):
+            self.by_state.setdefault(code, set()).add(pid)
+        folded = (row.get('name') or '').casefold()
+        self.by_casefold.setdefault(folded, row)
+        node = self.trie
+        for ch in folded:
+            node = node.setdefault(ch, {})
+        node.setdefault(None, set()).add(pid)
+        bisect.insort(self.order, self._sort_key(row))
+
+    def remove_park(self, row: dict):
+        """Drop a row; call before changing its name or state in place."""
+        pid = row['id']
+        if self.rows.pop(pid, None) is None:
+            return
+        self._fuzzy = None
+        for code in _split_states(row.get('state') or ''):
+            self.by_state.get(code, set()).discard(pid)
+        folded = (row.get('name') or '').casefold()
+        if self.by_casefold.get(folded) is row:
+            del self.by_casefold[folded]
+            other = next((r for r in self.rows.values() if (r.get('name') or '').casefold() == folded), None)
+            if other is not None:
+                self.by_casefold[folded] = other
+        node = self.trie
+        for ch in folded:
+            node = node.get(ch, {})
+        node.get(None, set()).discard(pid)
+        key = self._sort_key(row)
+        i = bisect.bisect_left(self.order, key)
+        if i < len(self.order) and self.order[i] == key:
+            del self.order[i]
+
+    def add_visit(self, park_id: str):
+        self.visit_counts[park_id] += 1
+
+    @property
+    def fuzzy(self) -> NameIndex:
+        """Fuzzy index of park names and NPS codes (source_id) -> park id."""
+        if self._fuzzy is None:
+            index = NameIndex()
+            for _, pid in self.order:
+                r = self.rows[pid]
+                index.add([r.get('name') or ''] + ([r['source_id']] if r.get('source_id') else []), pid)
+            self._fuzzy = index
+        return self._fuzzy
+
+    def prefix_ids(self, prefix: str) -> set:
+        node = self.trie
+        for ch in prefix.casefold():
+            node = node.get(ch)
+            if node is None:
+                return set()
+        ids = set()
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for ch, child in node.items():
+                if ch is None:
+                    ids |= child
+                else:
+                    stack.append(child)
+        return ids
+
+    def query(self, state=None, visited: Optional[bool] = None, prefix: Optional[str] = None,
+              limit: Optional[int] = None, offset: int = 0) -> List[dict]:
+        candidates = None
+        if state:
+            candidates = set()
+            for code in _split_states(state):
+                candidates |= self.by_state.get(code, set())
+        if prefix:
+            ids = self.prefix_ids(prefix)
+            candidates = ids if candidates is None else candidates & ids
+        if visited:
+            ids = {pid for pid, n in self.visit_counts.items() if n and pid in self.rows}
+            candidates = ids if candidates is None else candidates & ids
+        if candidates is None:
+            ordered = (pid for _, pid in self.order)
+        else:
+            ordered = (pid for _, pid in sorted(self._sort_key(self.rows[pid]) for pid in candidates))
+        if visited is False:
+            ordered = (pid for pid in ordered if not self.visit_counts.get(pid))
+        stop = None if limit is None else offset + limit
+        return [self.rows[pid] for pid in itertools.islice(ordered, offset, stop)]
+
+
+class JsonStore:
+    """Row-level store over the whole-file data.json (see `_read_data`/`_write_data`)."""
+
+    _query_cache = None  # (file stamp, ParkIndexes)
+
+    def insert_park(self, row: dict):
+        data = _read_data()
+        data['parks'].append(row)
+        _write_data(data)
+
+    def update_park(self, park_id: str, fields: dict) -> bool:
+        data = _read_data()
+        changed = False
+        for r in data.get('parks', []):
+            if r.get('id') == park_id:
+                for k, v in fields.items():
+                    if k in ('name', 'state', 'lat', 'lon', 'source_id', 'notes'):
+                        r[k] = v
+                        changed = True
+                break
+        if changed:
+            _write_data(data)
+        return changed
+
+    def park_rows(self) -> List[dict]:
+        return sorted(_read_data().get('parks', []), key=lambda x: x.get('name', ''))
+
+    def park_by_name(self, name: str) -> Optional[dict]:
+        if snapshot.is_snapshot(DATA_PATH):
+            return self._snapshot_park('name', name)
+        return next((r for r in _read_data().get('parks', []) if r.get('name') == name), None)
+
+    def park_by_id(self, park_id: str) -> Optional[dict]:
+        if snapshot.is_snapshot(DATA_PATH):
+            return self._snapshot_park('id', park_id)
+        return next((r for r in _read_data().get('parks', []) if r.get('id') == park_id), None)
+
+    @staticmethod
+    def _snapshot_park(column: str, value) -> Optional[dict]:
+        with snapshot.SnapshotReader(DATA_PATH) as reader:
+            return next(iter(reader.find_rows('parks', column, value)), None)
+
+    def insert_visit(self, row: dict):
+        data = _read_data()
+        data['visits'].append(row)
+        _write_data(data)
+
+    def visit_rows(self, park_id: Optional[str] = None) -> List[dict]:
+        if park_id and snapshot.is_snapshot(DATA_PATH):
+            with snapshot.SnapshotReader(DATA_PATH) as reader:
+                return reader.visit_rows(park_id)
+        rows = _read_data().get('visits', [])
+        if park_id:
+            rows = [r for r in rows if r.get('park_id') == park_id]
+        return sorted(rows, key=lambda x: x.get('created_at', ''), reverse=True)
+
+    def visited_park_ids(self) -> set:
+        if snapshot.is_snapshot(DATA_PATH):
+            with snapshot.SnapshotReader(DATA_PATH) as reader:
+                return reader.visited_park_ids()
+        return {v.get('park_id') for v in _read_data().get('visits', []) if v.get('park_id')}
+
+    def visit_rows_with_parks(self, park_id: Optional[str] = None) -> List[tuple]:
+        if park_id and snapshot.is_snapshot(DATA_PATH):
+            with snapshot.SnapshotReader(DATA_PATH) as reader:
+                park = next(iter(reader.find_rows('parks', 'id', park_id)), None)
+                return [(r, park) for r in reader.visit_rows(park_id)]
+        data = _read_data()
+        parks = {r.get('id'): r for r in data.get('parks', [])}
+        rows = data.get('visits', [])
+        if park_id:
+            rows = [r for r in rows if r.get('park_id') == park_id]
+        rows = sorted(rows, key=lambda x: x.get('created_at', ''), reverse=True)
+        return [(r, parks.get(r.get('park_id'))) for r in rows]
+
+    def upsert_parks(self, plan) -> dict:
+        data = _read_data()
+        new_rows, updated, counts = plan(data.setdefault('parks', []))
+        if new_rows or updated:
+            data['parks'].extend(new_rows)
+            _write_data(data)
+        return counts
+
+    def clear_visits(self):
+        data = _read_data()
+        if 'visits' in data:
+            data['visits'] = []
+            _write_data(data)
+
+    def clear_parks(self):
+        data = _read_data()
+        data['parks'] = []
+        data['visits'] = []
+        _write_data(data)
+
+    def clear_all(self):
+        _write_data({"parks": [], "visits": []})
+
+    def park_indexes(self) -> ParkIndexes:
+        """Indexes over the current file, rebuilt only after it changes."""
+        stamp = _file_stamp(DATA_PATH)
+        if stamp is None or self._query_cache is None or self._query_cache[0] != stamp:
+            data = _read_data()
+            counts = Counter(v.get('park_id') for v in data.get('visits', []))
+            self._query_cache = (stamp, ParkIndexes(data.get('parks', []), counts))
+        return self._query_cache[1]
+
+    def dump(self) -> dict:
+        return _read_data()
+
+
+class SessionStore(JsonStore):
+    """Unit of work over data.json for one CLI invocation or interactive session.
+
+    The file is parsed once and kept in memory with id and name indexes, so
+    reads between writes do no file I/O (just a stat to notice other writers).
+    Changed records are tracked as dirty and written back by `commit()`.
+    If data.json was replaced by someone else (inode/mtime/size changed), the
+    file is re-read and our dirty records are re-applied on top of it.
+    Until something forces a full load, per-park visit queries on a snapshot
+    file are answered from its mapped columns instead.
+    """
+
+    _snapshot_reads = True
+
+    def __init__(self):
+        self._data = None
+        self._stamp = None
+        self._parks_by_id = {}
+        self._parks_by_name = {}
+        self._dirty_parks = set()
+        self._dirty_visits = set()
+        self._cleared = None  # None, 'visits' or 'parks' (parks + visits)
+        self._query = None  # ParkIndexes, built on first query and then kept current
+
+    @staticmethod
+    def _disk_stamp():
+        return _file_stamp(DATA_PATH)
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._dirty_parks or self._dirty_visits or self._cleared)
+
+    def _index(self):
+        self._parks_by_id = {}
+        self._parks_by_name = {}
+        for r in self._data['parks']:
+            self._parks_by_id[r.get('id')] = r
+            self._parks_by_name.setdefault(r.get('name'), r)
+
+    def _column_reads(self, key) -> bool:
+        return bool(key) and self._snapshot_reads and self._data is None and snapshot.is_snapshot(DATA_PATH)
+
+    def _load(self):
+        stamp = self._disk_stamp()
+        if self._data is not None and stamp == self._stamp:
+            return self._data
+        if self._data is None or not self.dirty:
+            data = _read_data()
+        else:
+            data = self._merge(_read_data())
+        data.setdefault('parks', [])
+        data.setdefault('visits', [])
+        self._data = data
+        self._stamp = stamp
+        self._index()
+        self._query = None
+        return data
+
+    def _merge(self, disk: dict) -> dict:
+        """Re-apply our pending changes on top of a freshly read file."""
+        if self._cleared == 'parks':
+            disk['parks'] = []
+        if self._cleared in ('parks', 'visits'):
+            disk['visits'] = []
+        for key, dirty_ids in (('parks', self._dirty_parks), ('visits', self._dirty_visits)):
+            if not dirty_ids:
+                continue
+            ours = {r.get('id'): r for r in self._data[key] if r.get('id') in dirty_ids}
+            rows = [ours.pop(r.get('id'), r) for r in disk.get(key, [])]
+            rows.extend(ours.values())
+            disk[key] = rows
+        return disk
+
+    def commit(self):
+        """Write dirty records back to data.json (no-op when nothing changed)."""
+        if not self.dirty:
+            return
+        data = self._load()  # merges first if the file changed underneath us
+        _write_data(data)
+        self._stamp = self._disk_stamp()
+        self._dirty_parks.clear()
+        self._dirty_visits.clear()
+        self._cleared = None
+
+    def insert_park(self, row: dict):
+        self._load()['parks'].append(row)
+        self._parks_by_id[row['id']] = row
+        self._parks_by_name.setdefault(row.get('name'), row)
+        self._dirty_parks.add(row['id'])
+        if self._query is not None:
+            self._query.add_park(row)
+
+    def update_park(self, park_id: str, fields: dict) -> bool:
+        self._load()
+        r = self._parks_by_id.get(park_id)
+        changed = False
+        reindex = r is not None and self._query is not None and ('name' in fields or 'state' in fields)
+        if reindex:
+            self._query.remove_park(r)
+        if r is not None:
+            for k, v in fields.items():
+                if k in ('name', 'state', 'lat', 'lon', 'source_id', 'notes'):
+                    r[k] = v
+                    changed = True
+        if reindex:
+            self._query.add_park(r)
+        elif changed and self._query is not None and 'source_id' in fields:
+            self._query._fuzzy = None
+        if changed:
+            self._dirty_parks.add(park_id)
+            if 'name' in fields:
+                self._index()
+        return changed
+
+    def park_rows(self) -> List[dict]:
+        return sorted(self._load()['parks'], key=lambda x: x.get('name', ''))
+
+    def park_by_name(self, name: str) -> Optional[dict]:
+        if self._column_reads(name):
+            return JsonStore.park_by_name(self, name)
+        self._load()
+        return self._parks_by_name.get(name)
+
+    def park_by_id(self, park_id: str) -> Optional[dict]:
+        if self._column_reads(park_id):
+            return JsonStore.park_by_id(self, park_id)
+        self._load()
+        return self._parks_by_id.get(park_id)
+
+    def insert_visit(self, row: dict):
+        self._load()['visits'].append(row)
+        self._dirty_visits.add(row['id'])
+        if self._query is not None:
+            self._query.add_visit(row.get('park_id'))
+
+    def visit_rows(self, park_id: Optional[str] = None) -> List[dict]:
+        if self._column_reads(park_id):
+            return JsonStore.visit_rows(self, park_id)
+        rows = self._load()['visits']
+        if park_id:
+            rows = [r for r in rows if r.get('park_id') == park_id]
+        return sorted(rows, key=lambda x: x.get('created_at', ''), reverse=True)
+
+    def visited_park_ids(self) -> set:
+        return {v.get('park_id') for v in self._load()['visits'] if v.get('park_id')}
+
+    def visit_rows_with_parks(self, park_id: Optional[str] = None) -> List[tuple]:
+        if self._column_reads(park_id):
+            return JsonStore.visit_rows_with_parks(self, park_id)
+        rows = self.visit_rows(park_id)
+        return [(r, self._parks_by_id.get(r.get('park_id'))) for r in rows]
+
+    def upsert_parks(self, plan) -> dict:
+        parks = self._load()['parks']
+        new_rows, updated, counts = plan(parks)
+        parks.extend(new_rows)
+        for r in new_rows:
+            self._parks_by_id[r['id']] = r
+            self._parks_by_name.setdefault(r.get('name'), r)
+            if self._query is not None:
+                self._query.add_park(r)
+        if updated and self._query is not None:
+            self._query._fuzzy = None  # filled-in source_ids are fuzzy keys
+        self._dirty_parks.update(r['id'] for r in new_rows)
+        self._dirty_parks.update(r['id'] for r in updated)
+        return counts
+
+    def clear_visits(self):
+        self._load()['visits'] = []
+        self._dirty_visits.clear()
+        if self._query is not None:
+            self._query.visit_counts.clear()
+        if self._cleared != 'parks':
+            self._cleared = 'visits'
+
+    def clear_parks(self):
+        data = self._load()
+        data['parks'] = []
+        data['visits'] = []
+        self._index()
+        self._query = None
+        self._dirty_parks.clear()
+        self._dirty_visits.clear()
+        self._cleared = 'parks'
+
+    def clear_all(self):
+        self.clear_parks()
+
+    def park_indexes(self) -> ParkIndexes:
+        data = self._load()
+        if self._query is None:
+            self._query = ParkIndexes(data['parks'], Counter(v.get('park_id') for v in data['visits']))
+        return self._query
+
+    def dump(self) -> dict:
+        return self._load()
+
+
+_stores = {}
+_session = None
+
+
+def _store():
+    """Return the backend selected by STORE (instances are cached per path).
+
+    Inside `session()` the JSON backend is replaced by the session's in-memory store.
+    """
+    if STORE == 'sqlite':
+        key = ('sqlite', str(SQLITE_PATH))
+        if key not in _stores:
+            from .sqlite_store import SqliteStore
+            _stores[key] = SqliteStore(SQLITE_PATH)
+        return _stores[key]
+    if STORE == 'journal':
+        key = ('journal', str(DATA_PATH))
+        if key not in _stores:
+            from .journal_store import JournalStore
+            _stores[key] = JournalStore()
+        return _stores[key]
+    if STORE != 'json':
+        raise ValueError(f"Unknown TRACKER_STORE '{STORE}'; expected 'json', 'journal' or 'sqlite'")
+    if _session is not None:
+        return _session
+    return _stores.setdefault(('json',), JsonStore())
+
+
+@contextmanager
+def session():
+    """Load the JSON store once for a block of work and write it back on exit.
+
+    Call `commit()` inside the block to persist changes early (e.g. after each
+    interactive command). Nested calls share the outer session. The journal
+    backend buffers its ops for the block and appends them as one group. With
+    the SQLite backend this is a no-op, since every call is already an indexed query.
+    """
+    global _session
+    if _session is not None or STORE == 'sqlite':
+        yield _store()
+        return
+    _session = _store() if STORE == 'journal' else SessionStore()
+    try:
+        yield _session
+    finally:
+        try:
+            _session.commit()
+        finally:
+            _session = None
+
+
+def in_session() -> bool:
+    return _session is not None
+
+
+def commit():
+    """Persist pending changes of the active session, if any."""
+    if _session is not None:
+        _session.commit()
+
+
+_park_from_row = Park.from_row
+_visit_from_row = Visit.from_row
 
 
 def init_db():
     # create file if missing
-    if not DATA_PATH.exists():
+    if STORE == 'sqlite':
+        _store()
+    elif not DATA_PATH.exists():
         _write_data({"parks": [], "visits": []})
 
 
 def add_park(name: str, state: Optional[str] = None, lat: Optional[float] = None, lon: Optional[float] = None, source_id: Optional[str] = None, notes: Optional[str] = None) -> Park:
     p = Park.create(name=name, state=state, lat=lat, lon=lon, source_id=source_id, notes=notes)
-    data = _read_data()
-    data['parks'].append({
-        'id': p.id,
-        'name': p.name,
-        'state': p.state,
-        'lat': p.lat,
-        'lon': p.lon,
-        'source_id': p.source_id,
-        'notes': getattr(p, 'notes', None),
-        'created_at': p.created_at,
-    })
-    _write_data(data)
+    _store().insert_park(p.to_row())
     return p
 
 
 def update_park(park_id: str, **fields) -> Optional[Park]:
-    data = _read_data()
-    changed = False
-    for r in data.get('parks', []):
-        if r.get('id') == park_id:
-            for k, v in fields.items():
-                if k in ('name', 'state', 'lat', 'lon', 'source_id', 'notes'):
-                    r[k] = v
-                    changed = True
-            break
-    if changed:
-        _write_data(data)
+    if _store().update_park(park_id, fields):
         return find_park_by_id(park_id)
     return None
 
 
+def _plan_upserts(records):
+    """Build the merge step for `upsert_parks`.
+
+    The returned callable takes the current park rows, matches records by exact,
+    case-sensitive name through a dict index (first row wins) and
+    returns (new rows, updated existing rows, counts). Existing rows only get
+    lat/lon/source_id filled in where they are empty; matched rows are edited in place.
+    """
+    def plan(rows):
+        by_name = {}
+        for r in rows:
+            by_name.setdefault(r.get('name'), r)
+        new_rows = []
+        new_ids = set()
+        updated = {}
+        counts = {'added': 0, 'updated': 0, 'skipped': 0}
+        for rec in records:
+            name = rec.get('name')
+            if not name:
+                continue
+            existing = by_name.get(name)
+            if existing is None:
+                p = Park.create(name=name, state=rec.get('state'), lat=rec.get('lat'), lon=rec.get('lon'), source_id=rec.get('source_id'), notes=rec.get('notes'))
+                row = p.to_row()
+                by_name[name] = row
+                new_rows.append(row)
+                new_ids.add(row['id'])
+                counts['added'] += 1
+                continue
+            upd = {k: rec[k] for k in ('lat', 'lon', 'source_id')
+                   if existing.get(k) in (None, '') and rec.get(k) is not None}
+            if upd:
+                existing.update(upd)
+                if existing['id'] not in new_ids:
+                    updated[existing['id']] = existing
+                counts['updated'] += 1
+            else:
+                counts['skipped'] += 1
+        return new_rows, list(updated.values()), counts
+    return plan
+
+
+def upsert_parks(records) -> dict:
+    """Insert or fill in many parks with one read and one atomic write.
+
+    `records` are dicts with name and optional state/lat/lon/source_id/notes.
+    Returns counts {'added', 'updated', 'skipped'}.
+    """
+    return _store().upsert_parks(_plan_upserts(list(records)))
+
+
 def list_parks() -> List[Park]:
-    data = _read_data()
-    parks = []
-    for r in sorted(data.get('parks', []), key=lambda x: x.get('name', '')):
-        parks.append(Park(id=r['id'], name=r['name'], state=r.get('state'), lat=r.get('lat'), lon=r.get('lon'), source_id=r.get('source_id'), notes=r.get('notes'), created_at=r.get('created_at')))
-    return parks
-
-
-def find_park_by_name(name: str) -> Optional[Park]:
-    data = _read_data()
-    for r in data.get('parks', []):
-        if r.get('name') == name:
-            return Park(id=r['id'], name=r['name'], state=r.get('state'), lat=r.get('lat'), lon=r.get('lon'), source_id=r.get('source_id'), notes=r.get('notes'), created_at=r.get('created_at'))
-    return None
+    return list(map(_park_from_row, _store().park_rows()))
+
+
+def find_park_by_name(name: str, fuzzy: bool = False) -> Optional[Park]:
+    """Exact name match first, then a case-insensitive one ("zion" finds "Zion").
+
+    With `fuzzy` (the interactive CLI lookups), a name that still did not
+    match is resolved through the fuzzy name index ("yellowstone np", "Grnd
+    Teton", or an NPS code like "grsm"), but only when one park is a clear
+    best match.
+    """
+    store = _store()
+    r = store.park_by_name(name)
+    if r is None and name:
+        indexes = store.park_indexes()
+        r = indexes.by_casefold.get(name.casefold())
+        if r is None and fuzzy:
+            r = indexes.rows.get(indexes.fuzzy.resolve(name))
+    return _park_from_row(r) if r else None
+
+
+def suggest_park_names(name: str, limit: int = 3) -> List[str]:
+    """Names of the parks closest to `name`, for "did you mean" hints."""
+    indexes = _store().park_indexes()
+    return [indexes.rows[pid].get('name') for pid, score in indexes.fuzzy.suggest(name, limit) if score >= 0.5]
+
+
+def query_parks(state: Optional[str] = None, visited: Optional[bool] = None, prefix: Optional[str] = None,
+                limit: Optional[int] = None, offset: int = 0) -> List[Park]:
+    """Return parks matching every given filter, ordered by name like `list_parks`.
+
+    `state` is one or more comma-separated codes ("CA,NV" matches parks in
+    either); `visited` True/False keeps parks with/without visits; `prefix`
+    matches the start of the name case-insensitively. `offset`/`limit` page
+    through the results. Filters are answered from maintained indexes, not a
+    scan of every park.
+    """
+    rows = _store().park_indexes().query(state=state, visited=visited, prefix=prefix, limit=limit, offset=offset)
+    return list(map(_park_from_row, rows))
+
+
+def visit_counts() -> Dict[str, int]:
+    """Return {park id: number of visits} for parks with at least one visit."""
+    return {pid: n for pid, n in _store().park_indexes().visit_counts.items() if n}
 
 
 def find_park_by_id(park_id: str) -> Optional[Park]:
-    data = _read_data()
-    for r in data.get('parks', []):
-        if r.get('id') == park_id:
-            return Park(id=r['id'], name=r['name'], state=r.get('state'), lat=r.get('lat'), lon=r.get('lon'), source_id=r.get('source_id'), notes=r.get('notes'), created_at=r.get('created_at'))
-    return None
+    r = _store().park_by_id(park_id)
+    return _park_from_row(r) if r else None
 
 
 def add_visit(park_id: str, trail: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None, party_size: int = 1, notes: Optional[str] = None) -> Visit:
     v = Visit.create(park_id=park_id, trail=trail, start=start, end=end, party_size=party_size, notes=notes)
-    data = _read_data()
-    data['visits'].append({
-        'id': v.id,
-        'park_id': v.park_id,
-        'trail': v.trail,
-        'start': v.start,
-        'end': v.end,
-        'party_size': v.party_size,
-        'notes': v.notes,
-        'created_at': v.created_at,
-    })
-    _write_data(data)
+    _store().insert_visit(v.to_row())
     return v
 
 
 def list_visits(park_id: Optional[str] = None) -> List[Visit]:
-    data = _read_data()
-    visits = []
-    rows = data.get('visits', [])
-    if park_id:
-        rows = [r for r in rows if r.get('park_id') == park_id]
-    rows = sorted(rows, key=lambda x: x.get('created_at', ''), reverse=True)
-    for r in rows:
-        visits.append(Visit(id=r['id'], park_id=r['park_id'], trail=r.get('trail'), start=r.get('start'), end=r.get('end'), party_size=r.get('party_size', 1), notes=r.get('notes'), created_at=r.get('created_at')))
-    return visits
+    return list(map(_visit_from_row, _store().visit_rows(park_id)))
+
+
+def list_visits_with_parks(park_id: Optional[str] = None) -> List[Tuple[Visit, Optional[Park]]]:
+    """Return (visit, park) pairs, newest visit first, in a single read of the store.
+
+    The park is None when a visit points at a park that no longer exists.
+    """
+    return [(_visit_from_row(v), _park_from_row(p) if p else None)
+            for v, p in _store().visit_rows_with_parks(park_id)]
+
+
+def park_map() -> Dict[str, Park]:
+    """Return all parks keyed by id."""
+    return {p.id: p for p in list_parks()}
 
 
 def get_visited_park_ids() -> set:
     """Return a set of park IDs that have at least one visit recorded."""
-    data = _read_data()
-    ids = set()
-    for v in data.get('visits', []):
-        pid = v.get('park_id')
-        if pid:
-            ids.add(pid)
-    return ids
+    return _store().visited_park_ids()
 
 
 def clear_visits():
     """Remove all visit records from the store."""
-    data = _read_data()
-    if 'visits' in data:
-        data['visits'] = []
-        _write_data(data)
+    _store().clear_visits()
 
 
 def clear_parks():
     """Remove all parks and visits from the store (complete park reset)."""
-    data = _read_data()
-    data['parks'] = []
-    data['visits'] = []
-    _write_data(data)
+    _store().clear_parks()
 
 
 def clear_all():
     """Remove all stored data (parks, visits) and recreate empty structure."""
-    _write_data({"parks": [], "visits": []})
+    _store().clear_all()
+
+
+def export_json(path: str, fmt: Optional[str] = None):
+    """Write the whole store to `path` as "json" or "snapshot" (default: by suffix, .snap is a snapshot)."""
+    data = _store().dump()
+    if fmt is None:
+        fmt = 'snapshot' if str(path).endswith('.snap') else 'json'
+    with open(path, 'wb') as f:
+        f.write(snapshot.dumps(data) if fmt == 'snapshot' else json_dumps(data, indent=True))
 
 
-def export_json(path: str):
-    data = _read_data()
-    with open(path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2)
+def migrate_to_sqlite(json_path=None, sqlite_path=None) -> tuple:
+    """One-shot copy of data.json into data.db; returns (parks, visits) copied."""
+    commit()
+    if STORE == 'journal':
+        _store().compact()  # fold data.journal into data.json first
+    from .sqlite_store import migrate_from_json
+    return migrate_from_json(json_path or DATA_PATH, sqlite_path or SQLITE_PATH)
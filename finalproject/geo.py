@@ -0,0 +1,238 @@
+"""Geographic helpers: haversine distance and spatial indexes over parks.
+
+`CoordinateArray` keeps park coordinates in contiguous float arrays and
+evaluates haversine distances in batch (NumPy when installed, a pure-Python
+loop over `array('d')` otherwise) for radius searches and distance matrices.
+
+For k-nearest queries, `ParkIndex` stores parks as points on the unit sphere
+(x, y, z). Straight-line (chord) distance between unit vectors grows
+monotonically with great-circle distance, so an ordinary k-d tree on 3D
+points answers nearest-neighbour queries exactly, without the longitude
+wrap-around and pole problems of a lat/lon grid.
+"""
+
+import heapq
+import math
+from array import array
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional; pure-Python fallback below
+    np = None
+
+EARTH_RADIUS_KM = 6371.0
+
+# Upper bound on query-points x parks evaluated per NumPy chunk (~32 MB of float64).
+BATCH_CELLS = 4_000_000
+
+# Points per leaf; scanning a small bucket is cheaper than more tree levels in Python.
+LEAF_SIZE = 8
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in kilometers."""
+    p1 = math.radians(lat1)
+    p2 = math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def to_unit_vector(lat: float, lon: float) -> Tuple[float, float, float]:
+    phi = math.radians(lat)
+    lam = math.radians(lon)
+    cos_phi = math.cos(phi)
+    return (cos_phi * math.cos(lam), cos_phi * math.sin(lam), math.sin(phi))
+
+
+def chord_to_km(chord: float) -> float:
+    """Convert a unit-sphere chord length to a great-circle distance in km."""
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+def km_to_chord(km: float) -> float:
+    """Inverse of `chord_to_km`; distances beyond half the globe clamp to the diameter."""
+    return 2 * math.sin(min(math.pi / 2, km / (2 * EARTH_RADIUS_KM)))
+
+
+def coordinates(park) -> Optional[Tuple[float, float]]:
+    """Return (lat, lon) as floats for a park dict or object, or None if missing."""
+    if isinstance(park, dict):
+        lat, lon = park.get('lat'), park.get('lon')
+    else:
+        lat, lon = getattr(park, 'lat', None), getattr(park, 'lon', None)
+    try:
+        return (float(lat), float(lon))
+    except (TypeError, ValueError):
+        return None
+
+
+def park_id(park):
+    return park.get('id') if isinstance(park, dict) else getattr(park, 'id', None)
+
+
+class ParkIndex:
+    """k-d tree over park locations for k-nearest queries.
+
+    Built once per catalog version; queries are read-only and thread-safe.
+    Parks without usable coordinates are skipped.
+    """
+
+    def __init__(self, parks: Iterable):
+        self.parks = []
+        points = []
+        for park in parks:
+            coords = coordinates(park)
+            if coords is None:
+                continue
+            self.parks.append(park)
+            points.append(to_unit_vector(*coords))
+        self._points = points
+        self._ids = [park_id(p) for p in self.parks]
+        self._root = self._build(list(range(len(points)))) if points else None
+
+    def __len__(self):
+        return len(self.parks)
+
+    def _build(self, idxs):
+        if len(idxs) <= LEAF_SIZE:
+            return (None, idxs)
+        pts = self._points
+        # split on the axis with the widest spread
+        spreads = []
+        for axis in range(3):
+            values = [pts[i][axis] for i in idxs]
+            spreads.append(max(values) - min(values))
+        axis = spreads.index(max(spreads))
+        idxs.sort(key=lambda i: pts[i][axis])
+        mid = len(idxs) // 2
+        split = pts[idxs[mid]][axis]
+        return (axis, split, self._build(idxs[:mid]), self._build(idxs[mid:]))
+
+    def nearest(self, lat: float, lon: float, k: int = 1, exclude: Optional[set] = None) -> List[Tuple[object, float]]:
+        """Return up to `k` (park, distance_km) pairs, closest first.
+
+        Parks whose id is in `exclude` (e.g. already visited) are skipped.
+        """
+        if self._root is None or k <= 0:
+            return []
+        q = to_unit_vector(lat, lon)
+        pts = self._points
+        ids = self._ids
+        heap = []  # max-heap on squared chord distance via negation: (-d2, index)
+
+        def visit(node):
+            axis = node[0]
+            if axis is None:
+                for i in node[1]:
+                    if exclude and ids[i] in exclude:
+                        continue
+                    p = pts[i]
+                    d2 = (p[0] - q[0]) ** 2 + (p[1] - q[1]) ** 2 + (p[2] - q[2]) ** 2
+                    if len(heap) < k:
+                        heapq.heappush(heap, (-d2, i))
+                    elif d2 < -heap[0][0]:
+                        heapq.heapreplace(heap, (-d2, i))
+                return
+            diff = q[axis] - node[1]
+            near, far = (node[2], node[3]) if diff < 0 else (node[3], node[2])
+            visit(near)
+            if len(heap) < k or diff * diff < -heap[0][0]:
+                visit(far)
+
+        visit(self._root)
+        found = sorted((-neg, i) for neg, i in heap)
+        return [(self.parks[i], chord_to_km(math.sqrt(d2))) for d2, i in found]
+
+
+class CoordinateArray:
+    """Park coordinates as contiguous float arrays for batch distance queries.
+
+    Latitudes/longitudes are stored in radians along with cos(lat), so each
+    distance evaluation is a handful of vectorized operations.
+    Parks without usable coordinates are skipped.
+    """
+
+    def __init__(self, parks: Iterable, use_numpy: Optional[bool] = None):
+        self.parks = []
+        lats, lons = [], []
+        for park in parks:
+            coords = coordinates(park)
+            if coords is None:
+                continue
+            self.parks.append(park)
+            lats.append(math.radians(coords[0]))
+            lons.append(math.radians(coords[1]))
+        self.use_numpy = (np is not None) if use_numpy is None else (use_numpy and np is not None)
+        if self.use_numpy:
+            self.lat = np.array(lats, dtype=np.float64)
+            self.lon = np.array(lons, dtype=np.float64)
+            self.cos_lat = np.cos(self.lat)
+        else:
+            self.lat = array('d', lats)
+            self.lon = array('d', lons)
+            self.cos_lat = array('d', (math.cos(v) for v in lats))
+
+    def __len__(self):
+        return len(self.parks)
+
+    def _np_distances(self, lats, lons):
+        """Distances (km) from each query point to every park; shape (len(lats), len(self))."""
+        lat = lats[:, None]
+        a = (np.sin((self.lat - lat) / 2) ** 2
+             + np.cos(lat) * self.cos_lat * np.sin((self.lon - lons[:, None]) / 2) ** 2)
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    def _py_distances(self, lat, lon):
+        cos_q = math.cos(lat)
+        sin, asin, sqrt = math.sin, math.asin, math.sqrt
+        out = array('d')
+        for plat, plon, pcos in zip(self.lat, self.lon, self.cos_lat):
+            a = sin((plat - lat) / 2) ** 2 + cos_q * pcos * sin((plon - lon) / 2) ** 2
+            out.append(2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(a))))
+        return out
+
+    def distances_from(self, lat: float, lon: float):
+        """Distances in km from one point to every park, in `self.parks` order."""
+        if self.use_numpy:
+            return self._np_distances(np.radians([lat]), np.radians([lon]))[0]
+        return self._py_distances(math.radians(lat), math.radians(lon))
+
+    def within(self, points: Sequence[Tuple[float, float]], radius_km: float) -> List[List[Tuple[object, float]]]:
+        """For each (lat, lon) in `points`, return the parks within `radius_km`, closest first."""
+        results = []
+        if not self.parks:
+            return [[] for _ in points]
+        if self.use_numpy:
+            pts = np.radians(np.asarray(points, dtype=np.float64).reshape(-1, 2))
+            step = max(1, BATCH_CELLS // len(self.parks))
+            for start in range(0, len(pts), step):
+                chunk = pts[start:start + step]
+                dist = self._np_distances(chunk[:, 0], chunk[:, 1])
+                for row in dist:
+                    hits = np.flatnonzero(row <= radius_km)
+                    hits = hits[np.argsort(row[hits], kind='stable')]
+                    results.append([(self.parks[i], float(row[i])) for i in hits])
+            return results
+        for lat, lon in points:
+            row = self._py_distances(math.radians(lat), math.radians(lon))
+            hits = sorted((d, i) for i, d in enumerate(row) if d <= radius_km)
+            results.append([(self.parks[i], d) for d, i in hits])
+        return results
+
+    def distance_matrix(self):
+        """Full park-to-park distance matrix in km.
+
+        Returns a 2D NumPy array, or a list of `array('d')` rows without NumPy.
+        """
+        if self.use_numpy:
+            n = len(self.parks)
+            out = np.empty((n, n), dtype=np.float64)
+            step = max(1, BATCH_CELLS // max(1, n))
+            for start in range(0, n, step):
+                stop = min(n, start + step)
+                out[start:stop] = self._np_distances(self.lat[start:stop], self.lon[start:stop])
+            return out
+        return [self._py_distances(lat, lon) for lat, lon in zip(self.lat, self.lon)]
@@ -0,0 +1,104 @@
+"""Declarative intent routing for the rule-based chat fallback and the CLI agent.
+
+An `IntentRouter` is built from a table of keywords (name -> regex for one
+word, matched on word boundaries) and an ordered list of `Intent` rules. All
+keywords are compiled into one alternation, so routing a message is a single
+`finditer` pass that collects a bitmask of the keywords present; each rule is
+then two integer tests against that mask, and the first rule that matches
+wins. Adding an intent adds a row, not another substring scan.
+
+`CHAT_ROUTER` serves the web app's fallback answers (main.chat_fallback) and
+`AGENT_ROUTER` the terminal agent's local rules (finalproject.main).
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, Sequence, Tuple
+
+
+@dataclass(frozen=True)
+class Intent:
+    """Route to `name` when every keyword in `all_of` and at least one in `any_of` (if given) occurs."""
+    name: str
+    all_of: Tuple[str, ...] = ()
+    any_of: Tuple[str, ...] = ()
+
+
+class IntentRouter:
+    def __init__(self, keywords: Dict[str, str], intents: Sequence[Intent], default: str = 'unknown'):
+        self.default = default
+        self.intents = tuple(intents)
+        self._bits = {name: 1 << i for i, name in enumerate(keywords)}
+        alternation = '|'.join(f'(?P<{name}>{pattern})' for name, pattern in keywords.items())
+        self._scan = re.compile(rf'\b(?:{alternation})\b', re.IGNORECASE)
+        self._rules = []
+        for intent in self.intents:
+            unknown = set(intent.all_of + intent.any_of) - self._bits.keys()
+            if unknown:
+                raise ValueError(f'intent {intent.name!r} uses undefined keywords {sorted(unknown)}')
+            need = sum(self._bits[k] for k in intent.all_of)
+            some = sum(self._bits[k] for k in intent.any_of)
+            self._rules.append((need, some, intent.name))
+
+    def keyword_mask(self, text: str) -> int:
+        bits = self._bits
+        mask = 0
+        for m in self._scan.finditer(text):
+            mask |= bits[m.lastgroup]
+        return mask
+
+    def route(self, text: str) -> str:
+        """Name of the first intent matching `text`, or the default."""
+        mask = self.keyword_mask(text)
+        for need, some, name in self._rules:
+            if mask & need == need and (not some or mask & some):
+                return name
+        return self.default
+
+
+CHAT_ROUTER = IntentRouter(
+    keywords={
+        'hello': 'hello',
+        'hi': 'hi',
+        'yellowstone': 'yellowstone',
+        'grand': 'grand',
+        'canyon': 'canyon',
+        'visit': r'visit(?:s|ed|ing)?',
+        'plan': r'plan(?:s|ned|ning)?',
+        'state': r'states?',
+        'location': r'locations?',
+        'animal': r'animals?',
+        'wildlife': 'wildlife',
+    },
+    intents=[
+        Intent('greeting', any_of=('hello', 'hi')),
+        Intent('yellowstone', all_of=('yellowstone',)),
+        Intent('grand_canyon', all_of=('grand', 'canyon')),
+        Intent('visit', any_of=('visit', 'plan')),
+        Intent('location', any_of=('state', 'location')),
+        Intent('wildlife', any_of=('animal', 'wildlife')),
+    ],
+)
+
+AGENT_ROUTER = IntentRouter(
+    keywords={
+        'find': 'find',
+        'park': 'park',
+        'parks': 'parks',
+        'in': 'in',
+        'to': 'to',
+        'plan': r'plan\w*',
+        'visit': r'visits?',
+        'import': 'import',
+        'list': 'list',
+        'add': 'add',
+    },
+    intents=[
+        Intent('find_parks', all_of=('in',), any_of=('find', 'parks')),
+        Intent('plan_visit', all_of=('plan', 'visit', 'to')),
+        Intent('import_parks', all_of=('import',), any_of=('park', 'parks')),
+        Intent('list_parks', all_of=('list',), any_of=('park', 'parks')),
+        Intent('add_visit', all_of=('add', 'visit')),
+        Intent('add_park', all_of=('add',), any_of=('park', 'parks')),
+    ],
+)
@@ -0,0 +1,225 @@
+"""Append-only journal mode for the JSON store.
+
+Selected with `TRACKER_STORE=journal`. The store is `data.json` (the
+snapshot) plus `data.journal`, a file of compact JSON lines, one per mutation:
+
+  {"op": "add_park", "row": {...}}
+  {"op": "update_park", "id": "...", "fields": {...}}
+  {"op": "add_visit", "row": {...}}
+  {"op": "clear_visits"}
+  {"op": "clear_parks"}
+
+A mutation costs one appended line instead of rewriting the whole file.
+Lines are buffered and written + fsync'd in groups: on `commit()`, when the
+buffer reaches JOURNAL_GROUP lines, or right away outside a `db.session()`.
+
+On load the snapshot is read and the journal replayed over it. Every op is
+an assignment keyed by id, so replaying a journal over a snapshot that already
+contains it gives the same state; this makes compaction crash-safe. Once the
+journal holds more ops than the snapshot has records (and at least
+COMPACT_MIN_OPS), compaction writes a new snapshot with the same fsync'd
+tmp-and-replace as before and only then truncates the journal. A torn line
+from a crash mid-append is skipped on replay.
+"""
+
+import os
+from typing import List, Optional
+
+from . import db
+from .models import json_dumps, json_loads
+
+# Max buffered ops inside a session before they are written and fsync'd.
+JOURNAL_GROUP = int(os.environ.get('TRACKER_JOURNAL_GROUP', '64'))
+
+# Journals shorter than this are never compacted.
+COMPACT_MIN_OPS = 1000
+
+
+def journal_path():
+    return db.DATA_PATH.with_suffix('.journal')
+
+
+def read_journal(path) -> List[dict]:
+    """Return the ops in a journal file, skipping torn lines."""
+    if not os.path.exists(path):
+        return []
+    ops = []
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                break  # partial write at the very end
+            try:
+                ops.append(json_loads(line))
+            except ValueError:
+                continue  # partial write that a later append was put after
+    return ops
+
+
+def apply_ops(data: dict, ops: List[dict]) -> dict:
+    """Replay journal ops over a snapshot dict in place and return it."""
+    parks = data.setdefault('parks', [])
+    visits = data.setdefault('visits', [])
+    park_pos = {r.get('id'): i for i, r in enumerate(parks)}
+    visit_pos = {r.get('id'): i for i, r in enumerate(visits)}
+    for op in ops:
+        kind = op.get('op')
+        if kind == 'add_park':
+            row = op['row']
+            if row['id'] in park_pos:
+                parks[park_pos[row['id']]] = row
+            else:
+                park_pos[row['id']] = len(parks)
+                parks.append(row)
+        elif kind == 'update_park':
+            i = park_pos.get(op['id'])
+            if i is not None:
+                parks[i].update(op['fields'])
+        elif kind == 'add_visit':
+            row = op['row']
+            if row['id'] in visit_pos:
+                visits[visit_pos[row['id']]] = row
+            else:
+                visit_pos[row['id']] = len(visits)
+                visits.append(row)
+        elif kind == 'clear_visits':
+            visits.clear()
+            visit_pos.clear()
+        elif kind == 'clear_parks':
+            parks.clear()
+            visits.clear()
+            park_pos.clear()
+            visit_pos.clear()
+    return data
+
+
+class JournalStore(db.SessionStore):
+    """In-memory store whose mutations are persisted as journal lines."""
+
+    _snapshot_reads = False  # the snapshot alone misses journalled changes
+
+    def __init__(self):
+        super().__init__()
+        self._pending = []      # ops not yet written to the journal
+        self._journal_ops = 0   # ops currently in the journal file
+
+    def _disk_stamp(self):
+        stamps = []
+        for path in (db.DATA_PATH, journal_path()):
+            try:
+                st = os.stat(path)
+                stamps.append((st.st_ino, st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    def _load(self):
+        stamp = self._disk_stamp()
+        if self._data is not None and stamp == self._stamp:
+            return self._data
+        ops = read_journal(journal_path())
+        data = apply_ops(db._read_data(), ops)
+        # another process changed the files: keep our unflushed ops on top
+        apply_ops(data, self._pending)
+        self._data = data
+        self._stamp = stamp
+        self._journal_ops = len(ops)
+        self._index()
+        self._query = None
+        return data
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._pending)
+
+    def _log(self, *ops: dict):
+        self._pending.extend(ops)
+        if not db.in_session() or len(self._pending) >= JOURNAL_GROUP:
+            self.commit()
+
+    def _append(self):
+        """Append pending ops to the journal with a single write and fsync."""
+        if not self._pending:
+            return
+        self._load()
+        payload = b''.join(json_dumps(op) + b'\n' for op in self._pending)
+        path = journal_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'a+b') as f:
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    payload = b'\n' + payload  # fence off a torn line from an earlier crash
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_ops += len(self._pending)
+        self._pending = []
+        self._dirty_parks.clear()
+        self._dirty_visits.clear()
+        self._cleared = None
+        self._stamp = self._disk_stamp()
+
+    def commit(self):
+        """Write pending ops to the journal, compacting it once it outgrows the snapshot."""
+        self._append()
+        data = self._data or {}
+        records = len(data.get('parks', [])) + len(data.get('visits', []))
+        if self._journal_ops >= max(COMPACT_MIN_OPS, records):
+            self.compact()
+
+    def compact(self):
+        """Fold the journal into a fresh data.json snapshot and truncate the journal."""
+        self._append()
+        data = self._load()
+        db._write_data(data)  # fsync'd tmp-and-replace
+        with open(journal_path(), 'wb') as f:
+            os.fsync(f.fileno())
+        self._journal_ops = 0
+        self._stamp = self._disk_stamp()
+
+    # mutations: update memory through SessionStore, then log the op
+
+    def insert_park(self, row: dict):
+        super().insert_park(row)
+        self._log({'op': 'add_park', 'row': row})
+
+    def update_park(self, park_id: str, fields: dict) -> bool:
+        changed = super().update_park(park_id, fields)
+        if changed:
+            allowed = {k: v for k, v in fields.items() if k in ('name', 'state', 'lat', 'lon', 'source_id', 'notes')}
+            self._log({'op': 'update_park', 'id': park_id, 'fields': allowed})
+        return changed
+
+    def insert_visit(self, row: dict):
+        super().insert_visit(row)
+        self._log({'op': 'add_visit', 'row': row})
+
+    def upsert_parks(self, plan) -> dict:
+        captured = {}
+
+        def logged_plan(rows):
+            new_rows, updated, counts = plan(rows)
+            captured['new'], captured['updated'] = new_rows, updated
+            return new_rows, updated, counts
+
+        counts = super().upsert_parks(logged_plan)
+        ops = [{'op': 'add_park', 'row': r} for r in captured['new']]
+        ops += [{'op': 'update_park', 'id': r['id'], 'fields': {k: r.get(k) for k in ('lat', 'lon', 'source_id')}}
+                for r in captured['updated']]
+        if ops:
+            self._log(*ops)
+        return counts
+
+    def clear_visits(self):
+        super().clear_visits()
+        self._log({'op': 'clear_visits'})
+
+    def clear_parks(self):
+        super().clear_parks()
+        self._log({'op': 'clear_parks'})
+
+    def clear_all(self):
+        self.clear_parks()
+
+    def dump(self) -> Optional[dict]:
+        return self._load()
@@ -6,13 +6,19 @@ Usage examples:
   python main.py add-visit --park "Yellowstone" --trail "Upper Loop" --party 3
   python main.py list-visits --park "Yellowstone"
   python main.py export --path export.json
+  python main.py parks-within --point 44.6,-110.5 --radius 300
+  python main.py plan-route --start 39.74,-104.99 --budget 2
 """
 
 import argparse
+import re
+import time
 from datetime import datetime
 from rich.console import Console
 from rich.table import Table
-from finalproject import db
+from finalproject import db, geo, outbound, route
+from finalproject.intents import AGENT_ROUTER
+from finalproject.recordfile import RecordFile
 
 console = Console()
 
@@ -23,14 +29,14 @@ def cmd_add_park(args):
 
 
 def cmd_list_parks(args):
-    parks = db.list_parks()
-    # filter by visited/unvisited if requested
-    if getattr(args, 'visited', False) or getattr(args, 'unvisited', False):
-        visited_ids = db.get_visited_park_ids()
-        if getattr(args, 'visited', False):
-            parks = [p for p in parks if p.id in visited_ids]
-        else:
-            parks = [p for p in parks if p.id not in visited_ids]
+    # filter by visited/unvisited, state and name prefix through the store's indexes
+    visited = None
+    if getattr(args, 'visited', False):
+        visited = True
+    elif getattr(args, 'unvisited', False):
+        visited = False
+    parks = db.query_parks(state=getattr(args, 'state', None), visited=visited, prefix=getattr(args, 'prefix', None),
+                           limit=getattr(args, 'limit', None), offset=getattr(args, 'offset', 0) or 0)
 
     # Show notes column if requested, or automatically if any park has notes
     show_notes = getattr(args, 'show_notes', False)
@@ -57,10 +63,18 @@ def cmd_list_parks(args):
     console.print(table)
 
 
+def park_not_found(name, hint='create it first.'):
+    suggestions = db.suggest_park_names(name)
+    if suggestions:
+        console.print(f"Park '{name}' not found; did you mean: {', '.join(suggestions)}?")
+    else:
+        console.print(f"Park '{name}' not found; {hint}")
+
+
 def cmd_add_visit(args):
-    park = db.find_park_by_name(args.park)
+    park = db.find_park_by_name(args.park, fuzzy=True)
     if not park:
-        console.print(f"Park '{args.park}' not found; create it first.")
+        park_not_found(args.park)
         return
     v = db.add_visit(park_id=park.id, trail=args.trail, start=args.start, end=args.end, party_size=args.party, notes=getattr(args, 'notes', None))
     console.print(f"Added visit: {v.id} to park {park.name}")
@@ -69,15 +83,15 @@ def cmd_add_visit(args):
 def cmd_list_visits(args):
     park = None
     if args.park:
-        park = db.find_park_by_name(args.park)
+        park = db.find_park_by_name(args.park, fuzzy=True)
         if not park:
-            console.print(f"Park '{args.park}' not found.")
+            park_not_found(args.park, hint='no such park.')
             return
-    visits = db.list_visits(park_id=park.id if park else None)
+    # visits come back already paired with their park (one read, no per-visit lookup)
+    visits = db.list_visits_with_parks(park_id=park.id if park else None)
     # Include notes column for visits
     table = Table("ID", "Park", "Trail", "Start", "End", "Party", "Created", "Notes")
-    for v in visits:
-        park_rec = db.find_park_by_id(v.park_id)
+    for v, park_rec in visits:
         park_name = park_rec.name if park_rec else "Unknown"
         note = v.notes or ""
         # truncate long notes to 60 chars
@@ -88,18 +102,18 @@ def cmd_list_visits(args):
 
 
 def cmd_visit_park(args):
-    park = db.find_park_by_name(args.park)
+    park = db.find_park_by_name(args.park, fuzzy=True)
     if not park:
-        console.print(f"Park '{args.park}' not found; create it first.")
+        park_not_found(args.park)
         return
     v = db.add_visit(park_id=park.id, trail=None, start=args.date, end=None, party_size=args.party, notes=args.notes)
     console.print(f"Marked visit to {park.name} (visit id={v.id})")
 
 
 def cmd_note_park(args):
-    park = db.find_park_by_name(args.park)
+    park = db.find_park_by_name(args.park, fuzzy=True)
     if not park:
-        console.print(f"Park '{args.park}' not found; create it first.")
+        park_not_found(args.park)
         return
     db.update_park(park.id, notes=args.note)
     console.print(f"Saved note for {park.name}")
@@ -135,15 +149,59 @@ def cmd_reset_data(args):
 
 
 def cmd_export(args):
-    db.export_json(args.path)
+    db.export_json(args.path, fmt=args.format)
     console.print(f"Exported data to {args.path}")
 
 
+def cmd_migrate_sqlite(args):
+    """Copy data.json into the SQLite store (use with TRACKER_STORE=sqlite)."""
+    parks, visits = db.migrate_to_sqlite(args.source, args.dest)
+    console.print(f"Migrated {parks} parks and {visits} visits to {args.dest or db.SQLITE_PATH}")
+    console.print("Set TRACKER_STORE=sqlite to use the SQLite store.")
+
+
+def _import_record(rec):
+    """Map one source record to the fields `db.upsert_parks` takes, or None without a name."""
+    name = rec.get('name') or rec.get('NAME')
+    state = rec.get('state') or rec.get('STATES')
+    lat = None
+    lon = None
+    source_id = None
+    # try common keys for latitude/longitude and source id
+    for k in ('lat', 'latitude', 'LATITUDE'):
+        if rec.get(k) is not None:
+            try:
+                lat = float(rec.get(k))
+            except Exception:
+                lat = None
+            break
+    for k in ('lon', 'lng', 'longitude', 'LONGITUDE'):
+        if rec.get(k) is not None:
+            try:
+                lon = float(rec.get(k))
+            except Exception:
+                lon = None
+            break
+    for k in ('id', 'PARK_CODE', 'park_code'):
+        if rec.get(k) is not None:
+            source_id = rec.get(k)
+            break
+    if not name:
+        return None
+    return {'name': name, 'state': state, 'lat': lat, 'lon': lon, 'source_id': source_id}
+
+
 def cmd_import_parks(args):
     src = args.source
+    # records are streamed from the mapped file (JSON array or JSON Lines)
+    # instead of json.load-ing the whole source first
+    records = []
     try:
-        with open(src, 'r', encoding='utf-8') as f:
-            parks = __import__('json').load(f)
+        with RecordFile(src) as source:
+            for rec in source:
+                record = _import_record(rec)
+                if record is not None:
+                    records.append(record)
     except FileNotFoundError:
         console.print(f"Source file not found: {src}")
         return
@@ -151,59 +209,76 @@ def cmd_import_parks(args):
         console.print(f"Failed to read source: {e}")
         return
 
-    added = 0
-    skipped = 0
-    for rec in parks:
-        name = rec.get('name') or rec.get('NAME')
-        state = rec.get('state') or rec.get('STATES')
-        lat = None
-        lon = None
-        source_id = None
-        # try common keys for latitude/longitude and source id
-        for k in ('lat', 'latitude', 'LATITUDE'):
-            if rec.get(k) is not None:
-                try:
-                    lat = float(rec.get(k))
-                except Exception:
-                    lat = None
-                break
-        for k in ('lon', 'lng', 'longitude', 'LONGITUDE'):
-            if rec.get(k) is not None:
-                try:
-                    lon = float(rec.get(k))
-                except Exception:
-                    lon = None
-                break
-        for k in ('id', 'PARK_CODE', 'park_code'):
-            if rec.get(k) is not None:
-                source_id = rec.get(k)
-                break
-        if not name:
-            continue
-        existing = db.find_park_by_name(name)
-        if existing:
-            # if existing record lacks lat/lon/source_id but source has them, update
-            need_update = False
-            upd = {}
-            if (existing.lat is None or existing.lat == '') and lat is not None:
-                upd['lat'] = lat
-                need_update = True
-            if (existing.lon is None or existing.lon == '') and lon is not None:
-                upd['lon'] = lon
-                need_update = True
-            if (existing.source_id is None or existing.source_id == '') and source_id is not None:
-                upd['source_id'] = source_id
-                need_update = True
-            if need_update:
-                db.update_park(existing.id, **upd)
-                added += 1
-            else:
-                skipped += 1
-            continue
-        db.add_park(name=name, state=state, lat=lat, lon=lon, source_id=source_id)
-        added += 1
+    # one read + one atomic write for the whole batch; existing parks only get
+    # missing lat/lon/source_id filled in
+    started = time.perf_counter()
+    counts = db.upsert_parks(records)
+    elapsed = time.perf_counter() - started
+    rate = len(records) / elapsed if elapsed > 0 else float('inf')
+    console.print(f"Imported parks: added={counts['added']}, updated={counts['updated']}, skipped={counts['skipped']} "
+                  f"({len(records)} records in {elapsed:.3f}s, {rate:,.0f} records/s)")
 
-    console.print(f"Imported parks: added={added}, skipped={skipped}")
+
+def cmd_parks_within(args):
+    """List parks within --radius km of each --point (lat,lon)."""
+    points = []
+    for raw in args.point:
+        try:
+            lat, lon = (float(x) for x in raw.split(','))
+        except ValueError:
+            console.print(f"Invalid point '{raw}'; expected LAT,LON")
+            return
+        points.append((lat, lon))
+    coords = geo.CoordinateArray(db.list_parks())
+    for (lat, lon), hits in zip(points, coords.within(points, args.radius)):
+        table = Table("Name", "State", "Distance (km)", title=f"Parks within {args.radius:g} km of {lat:.4f}, {lon:.4f}")
+        for p, d in hits:
+            table.add_row(p.name, p.state or "", f"{d:.1f}")
+        console.print(table)
+
+
+def cmd_plan_route(args):
+    """Plan a road trip from --start (or --from-park) through unvisited parks."""
+    start = None
+    if args.start:
+        try:
+            start = tuple(float(x) for x in args.start.split(','))
+            if len(start) != 2:
+                raise ValueError
+        except ValueError:
+            console.print(f"Invalid start '{args.start}'; expected LAT,LON")
+            return
+    elif args.from_park:
+        park = db.find_park_by_name(args.from_park, fuzzy=True)
+        if not park:
+            park_not_found(args.from_park, hint='no such park.')
+            return
+        if geo.coordinates(park) is None:
+            console.print(f"Park '{park.name}' has no coordinates.")
+            return
+        start = geo.coordinates(park)
+    else:
+        console.print('Provide --start LAT,LON or --from-park NAME')
+        return
+
+    parks = db.list_parks()
+    if not args.all:
+        visited_ids = db.get_visited_park_ids()
+        parks = [p for p in parks if p.id not in visited_ids]
+    matrix = route.DistanceMatrix(parks)
+    if not len(matrix):
+        console.print('No parks with coordinates to visit.')
+        return
+    plan = route.plan_route(matrix, start, time_budget=args.budget)
+
+    table = Table("#", "Park", "State", "Leg (km)", "Total (km)")
+    total = 0.0
+    for i, (p, leg) in enumerate(zip(plan.stops, plan.legs), start=1):
+        total += leg
+        table.add_row(str(i), p.name, p.state or "", f"{leg:.1f}", f"{total:.1f}")
+    console.print(table)
+    console.print(f"{len(plan.stops)} stops, {plan.total_km:.1f} km "
+                  f"(greedy start {plan.initial_km:.1f} km, planned in {plan.elapsed_s:.2f}s)")
 
 
 def cmd_menu(args):
@@ -279,6 +354,104 @@ def cmd_menu(args):
                 console.print('Unknown option; cancelled')
         else:
             console.print('Unknown option')
+        db.commit()
+
+
+# Parsers for the agent's local rules, applied only to the intent that matched.
+_STATE_QUERY = re.compile(r'\bin\s+(.+)$', re.I | re.S)
+_PLAN_VISIT = re.compile(r'\bto\s+(?P<park>.+?)(?:\s+on\s+(?P<date>.+?))?(?:\s+for\s+(?P<party>\d+)\b.*)?$', re.I | re.S)
+_ADD_VISIT = re.compile(r'\bto\s+(?P<park>.+?)(?:\s+party\b.*)?$', re.I | re.S)
+_PARTY = re.compile(r'party\s+(\d+)', re.I)
+_ADD_PARK = re.compile(r'\badd\s+parks?\b(.*)$', re.I | re.S)
+
+
+def agent_find_parks(text):
+    """find parks in CA / parks in CA,NV"""
+    m = _STATE_QUERY.search(text.strip())
+    if not m:
+        console.print('Agent: could not parse state query')
+        return
+    parks = db.query_parks(state=m.group(1).strip())
+    table = Table("Name", "State", "Lat", "Lon")
+    for p in parks:
+        lat = f"{p.lat:.6f}" if p.lat is not None else ""
+        lon = f"{p.lon:.6f}" if p.lon is not None else ""
+        table.add_row(p.name, p.state or "", lat, lon)
+    console.print(table)
+
+
+def agent_plan_visit(text):
+    """plan visit to Yellowstone on 2025-07-10 for 3"""
+    m = _PLAN_VISIT.search(text.strip())
+    park_name = m.group('park').strip() if m else ''
+    if not park_name:
+        console.print('Agent: could not parse park name for plan visit')
+        return
+    party = int(m.group('party')) if m.group('party') else 1
+    start_date = None
+    if m.group('date'):
+        try:
+            from dateutil import parser as dateparser
+            start_date = dateparser.parse(m.group('date')).date().isoformat()
+        except Exception:
+            start_date = None
+    cmd_add_visit(argparse.Namespace(park=park_name, trail=None, start=start_date, end=None, party=party))
+    console.print(f'Agent: planned visit to {park_name} on {start_date or "(no date)"} for {party} people')
+
+
+def agent_import_parks(text):
+    console.print('Agent: importing parks from data/parks.json')
+    cmd_import_parks(argparse.Namespace(source='data/parks.json'))
+
+
+def agent_list_parks(text):
+    console.print('Agent: listing parks')
+    cmd_list_parks(argparse.Namespace())
+
+
+def agent_add_park(text):
+    """add park <name> [state]"""
+    m = _ADD_PARK.search(text)
+    rest = m.group(1).strip() if m else ''
+    if not rest:
+        console.print('Agent: please provide a park name after "add park"')
+        return
+    parts = [p.strip().strip(',') for p in rest.replace(',', ' ').split()]
+    state = None
+    name = rest
+    if len(parts) >= 2 and len(parts[-1]) <= 3:
+        state = parts[-1]
+        name = ' '.join(parts[:-1])
+    db.add_park(name=name, state=state)
+    console.print(f'Agent: added park {name} ({state or ""})')
+
+
+def agent_add_visit(text):
+    """add visit to <park> [party N]; the whole phrase up to "party N" names the park"""
+    m = _ADD_VISIT.search(text.strip())
+    park = m.group('park').strip() if m else None
+    if not park:
+        console.print('Agent: could not parse park name for visit. Try "add visit to <park> party N"')
+        return
+    party_m = _PARTY.search(text)
+    party = int(party_m.group(1)) if party_m else 1
+    cmd_add_visit(argparse.Namespace(park=park, trail=None, start=None, end=None, party=party))
+    console.print(f'Agent: added visit to {park} (party {party})')
+
+
+def agent_unknown(text):
+    console.print('Agent: I did not understand that. Try: "import parks", "list parks", "add park <name>", or "add visit to <park> party N"')
+
+
+AGENT_HANDLERS = {
+    'find_parks': agent_find_parks,
+    'plan_visit': agent_plan_visit,
+    'import_parks': agent_import_parks,
+    'list_parks': agent_list_parks,
+    'add_visit': agent_add_visit,
+    'add_park': agent_add_park,
+    'unknown': agent_unknown,
+}
 
 
 def cmd_agent(args):
@@ -299,15 +472,10 @@ def cmd_agent(args):
         Returns a dict with keys: action, params, explanation if successful, or None on any failure
         (including missing API key or missing `openai` package).
         """
-        import os, json, re
-        key = os.environ.get('OPENAI_API_KEY')
-        if not key:
+        import json
+        client = outbound.llm_client()
+        if client is None:
             return None
-        try:
-            from openai import OpenAI
-        except Exception:
-            return None
-        client = OpenAI(api_key=key)
         system = (
             "You are a safe assistant for a terminal-based National Park Tracker. "
             "When given a user prompt, output a single JSON object (no surrounding commentary) describing at most one allowed action. "
@@ -341,15 +509,9 @@ def cmd_agent(args):
 
     def call_llm_text(prompt: str) -> str:
         """Call OpenAI for a plain-text response; returns text or empty string on failure."""
-        import os
-        key = os.environ.get('OPENAI_API_KEY')
-        if not key:
+        client = outbound.llm_client()
+        if client is None:
             return ""
-        try:
-            from openai import OpenAI
-        except Exception:
-            return ""
-        client = OpenAI(api_key=key)
         try:
             resp = client.chat.completions.create(
                 model="gpt-3.5-turbo",
@@ -425,101 +587,8 @@ def cmd_agent(args):
                         return True
                     console.print('Agent: action not recognized or not allowed')
                     return True
-        # find parks by state: "find parks in CA" or "parks in California"
-        if ('find' in t or 'parks' in t) and ' in ' in t:
-            # extract state token after ' in '
-            try:
-                state_q = t.split(' in ', 1)[1].strip()
-                # list parks and filter by state substring
-                parks = [p for p in db.list_parks() if p.state and state_q.upper() in p.state.upper()]
-                table = Table("Name", "State", "Lat", "Lon")
-                for p in parks:
-                    lat = f"{p.lat:.6f}" if p.lat is not None else ""
-                    lon = f"{p.lon:.6f}" if p.lon is not None else ""
-                    table.add_row(p.name, p.state or "", lat, lon)
-                console.print(table)
-            except Exception:
-                console.print('Agent: could not parse state query')
-            return True
-
-        # plan visit: "plan visit to Yellowstone on 2025-07-10 for 3"
-        if 'plan' in t and 'visit' in t and ' to ' in t:
-            try:
-                rest = text.split(' to ', 1)[1]
-                park_part = rest
-                date_part = None
-                party = 1
-                if ' on ' in rest:
-                    park_part, after = rest.split(' on ', 1)
-                    park_part = park_part.strip()
-                    if ' for ' in after:
-                        date_str, after2 = after.split(' for ', 1)
-                        date_part = date_str.strip()
-                        try:
-                            party = int(after2.strip().split()[0])
-                        except Exception:
-                            party = 1
-                    else:
-                        date_part = after.strip()
-                park_name = park_part.strip()
-                start_date = None
-                if date_part:
-                    try:
-                        from dateutil import parser as dateparser
-                        start_date = dateparser.parse(date_part).date().isoformat()
-                    except Exception:
-                        start_date = None
-                if park_name:
-                    cmd_add_visit(argparse.Namespace(park=park_name, trail=None, start=start_date, end=None, party=party))
-                    console.print(f'Agent: planned visit to {park_name} on {start_date or "(no date)"} for {party} people')
-                else:
-                    console.print('Agent: could not parse park name for plan visit')
-            except Exception:
-                console.print('Agent: error parsing plan visit command')
-            return True
-
-        if 'import' in t and 'park' in t:
-            console.print('Agent: importing parks from data/parks.json')
-            cmd_import_parks(argparse.Namespace(source='data/parks.json'))
-            return True
-        if 'list' in t and 'park' in t:
-            console.print('Agent: listing parks')
-            cmd_list_parks(argparse.Namespace())
-            return True
-        if t.startswith('add park'):
-            rest = text[len('add park'):].strip()
-            if not rest:
-                console.print('Agent: please provide a park name after "add park"')
-                return True
-            parts = [p.strip().strip(',') for p in rest.replace(',', ' ').split()]
-            state = None
-            name = rest
-            if len(parts) >= 2 and len(parts[-1]) <= 3:
-                state = parts[-1]
-                name = ' '.join(parts[:-1])
-            db.add_park(name=name, state=state)
-            console.print(f'Agent: added park {name} ({state or ""})')
-            return True
-        if t.startswith('add visit') or ('add' in t and 'visit' in t):
-            park = None
-            party = 1
-            if ' to ' in t:
-                park = text.split(' to ', 1)[1].split()[0]
-            import re
-            m = re.search(r'party\s+(\d+)', t)
-            if m:
-                try:
-                    party = int(m.group(1))
-                except Exception:
-                    party = 1
-            if park:
-                cmd_add_visit(argparse.Namespace(park=park, trail=None, start=None, end=None, party=party))
-                console.print(f'Agent: added visit to {park} (party {party})')
-            else:
-                console.print('Agent: could not parse park name for visit. Try "add visit to <park> party N"')
-            return True
-
-        console.print('Agent: I did not understand that. Try: "import parks", "list parks", "add park <name>", or "add visit to <park> party N"')
+        # local rules: one keyword scan picks the intent, then only its handler parses
+        AGENT_HANDLERS[AGENT_ROUTER.route(t)](text)
         return True
 
     if args.prompt:
@@ -533,6 +602,7 @@ def cmd_agent(args):
             console.print('\nAgent session closed')
             return
         cont = handle_prompt(text)
+        db.commit()
         if cont is False:
             console.print('Agent: exiting')
             return
@@ -553,6 +623,10 @@ def build_parser():
     group.add_argument('--visited', action='store_true', help='show only parks you have visited')
     group.add_argument('--unvisited', action='store_true', help='show only parks you have not visited')
     p_list_parks.add_argument('--show-notes', action='store_true', help='display personal notes column')
+    p_list_parks.add_argument('--state', help='state code(s), e.g. CA or CA,NV')
+    p_list_parks.add_argument('--prefix', help='name starts with (case-insensitive)')
+    p_list_parks.add_argument('--limit', type=int, help='show at most this many parks')
+    p_list_parks.add_argument('--offset', type=int, default=0, help='skip this many parks (for paging)')
     p_list_parks.set_defaults(func=cmd_list_parks)
 
     p_add_visit = sub.add_parser('add-visit')
@@ -582,12 +656,30 @@ def build_parser():
 
     p_export = sub.add_parser('export')
     p_export.add_argument('--path', required=True)
+    p_export.add_argument('--format', choices=['json', 'snapshot'], help='Default: snapshot for a .snap path, else json')
     p_export.set_defaults(func=cmd_export)
 
     p_import = sub.add_parser('import-parks')
     p_import.add_argument('--source', required=False, default='data/parks.json', help='path to parks JSON (default: data/parks.json)')
     p_import.set_defaults(func=cmd_import_parks)
 
+    p_within = sub.add_parser('parks-within')
+    p_within.add_argument('--point', action='append', required=True, help='LAT,LON to search around (repeatable)')
+    p_within.add_argument('--radius', type=float, required=True, help='search radius in km')
+    p_within.set_defaults(func=cmd_parks_within)
+
+    p_route = sub.add_parser('plan-route')
+    p_route.add_argument('--start', required=False, help='starting point as LAT,LON')
+    p_route.add_argument('--from-park', required=False, help='start at this park instead of --start')
+    p_route.add_argument('--all', action='store_true', help='include parks you have already visited')
+    p_route.add_argument('--budget', type=float, default=1.0, help='seconds to spend improving the route')
+    p_route.set_defaults(func=cmd_plan_route)
+
+    p_migrate = sub.add_parser('migrate-sqlite')
+    p_migrate.add_argument('--source', required=False, help='data.json to copy (default: finalproject/data.json)')
+    p_migrate.add_argument('--dest', required=False, help='SQLite file to write (default: finalproject/data.db)')
+    p_migrate.set_defaults(func=cmd_migrate_sqlite)
+
     p_menu = sub.add_parser('menu')
     p_menu.set_defaults(func=cmd_menu)
 
@@ -615,7 +707,9 @@ def main(argv=None):
     if not hasattr(args, 'func'):
         parser.print_help()
         return
-    args.func(args)
+    # one in-memory unit of work per invocation; written back on exit
+    with db.session():
+        args.func(args)
 
 
 if __name__ == '__main__':
@@ -1,14 +1,25 @@
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from typing import Optional
 from datetime import datetime
+import json
 import uuid
 
+try:  # optional fast JSON codec
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
 
 def new_id() -> str:
     return str(uuid.uuid4())
 
 
-@dataclass
+# Row layout shared by the stores; also the positional order of the model fields.
+PARK_FIELDS = ('id', 'name', 'state', 'lat', 'lon', 'source_id', 'notes', 'created_at')
+VISIT_FIELDS = ('id', 'park_id', 'trail', 'start', 'end', 'party_size', 'notes', 'created_at')
+
+
+@dataclass(slots=True)
 class Park:
     id: str
     name: str
@@ -21,10 +32,19 @@ class Park:
 
     @staticmethod
     def create(name: str, state: Optional[str] = None, lat: Optional[float] = None, lon: Optional[float] = None, source_id: Optional[str] = None, notes: Optional[str] = None) -> 'Park':
-        return Park(id=new_id(), name=name, state=state, lat=lat, lon=lon, source_id=source_id, notes=notes, created_at=datetime.utcnow().isoformat())
+        return Park(new_id(), name, state, lat, lon, source_id, notes, datetime.utcnow().isoformat())
 
+    @staticmethod
+    def from_row(r: dict) -> 'Park':
+        g = r.get
+        return Park(r['id'], r['name'], g('state'), g('lat'), g('lon'), g('source_id'), g('notes'), g('created_at'))
 
-@dataclass
+    def to_row(self) -> dict:
+        return {'id': self.id, 'name': self.name, 'state': self.state, 'lat': self.lat, 'lon': self.lon,
+                'source_id': self.source_id, 'notes': self.notes, 'created_at': self.created_at}
+
+
+@dataclass(slots=True)
 class Visit:
     id: str
     park_id: str
@@ -37,4 +57,29 @@ class Visit:
 
     @staticmethod
     def create(park_id: str, trail: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None, party_size: int = 1, notes: Optional[str] = None) -> 'Visit':
-        return Visit(id=new_id(), park_id=park_id, trail=trail, start=start, end=end, party_size=party_size, notes=notes, created_at=datetime.utcnow().isoformat())
+        return Visit(new_id(), park_id, trail, start, end, party_size, notes, datetime.utcnow().isoformat())
+
+    @staticmethod
+    def from_row(r: dict) -> 'Visit':
+        g = r.get
+        return Visit(r['id'], r['park_id'], g('trail'), g('start'), g('end'), g('party_size', 1), g('notes'), g('created_at'))
+
+    def to_row(self) -> dict:
+        return {'id': self.id, 'park_id': self.park_id, 'trail': self.trail, 'start': self.start, 'end': self.end,
+                'party_size': self.party_size, 'notes': self.notes, 'created_at': self.created_at}
+
+
+def json_loads(data):
+    """Parse JSON text or bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj, indent: bool = False) -> bytes:
+    """Serialize to UTF-8 JSON bytes: compact, or 2-space indented like data.json."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    if indent:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
@@ -0,0 +1,202 @@
+"""Shared outbound clients for the web app and the CLI.
+
+All HTTP calls go through one `requests.Session` with a keep-alive connection
+pool, a per-host connection limit, and retries with exponential backoff plus
+full jitter (429/5xx, honoring Retry-After). The OpenAI client is created
+lazily once and reused, so repeated prompts do not pay new TCP/TLS handshakes.
+
+The async app (asgi.py) gets the same from `async_http()` / `async_llm_client()`:
+an httpx.AsyncClient with a bounded connection pool and an AsyncOpenAI client
+sharing it, one pair per event loop.
+
+Tunable through environment variables:
+  OUTBOUND_POOL_HOSTS     number of hosts to keep pools for (default 10)
+  OUTBOUND_POOL_PER_HOST  max connections per host (default 10)
+  OUTBOUND_RETRIES        retry attempts for idempotent requests (default 3)
+  OUTBOUND_BACKOFF        backoff factor in seconds (default 0.5)
+  OUTBOUND_ASYNC_CONNECTIONS  max connections of the async client (default 200)
+"""
+
+import asyncio
+import os
+import random
+import threading
+import weakref
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import httpx
+except ImportError:  # openai>=1.0 depends on httpx; some builds ship it as httpx2
+    try:
+        import httpx2 as httpx
+    except ImportError:
+        httpx = None
+
+DEFAULT_TIMEOUT = 10
+
+_lock = threading.Lock()
+_session = None
+_llm_client = None
+_llm_key = None
+_counters = {'requests': 0, 'errors': 0}
+# event loop -> {'http': AsyncClient, 'llm': AsyncOpenAI or None, 'llm_key': str}
+_async_clients = weakref.WeakKeyDictionary()
+
+
+class JitterRetry(Retry):
+    """urllib3 Retry with full jitter: sleep a random time up to the backoff."""
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        return random.uniform(0, backoff) if backoff > 0 else 0
+
+
+def _count_response(resp, *args, **kwargs):
+    with _lock:
+        _counters['requests'] += 1
+        if resp.status_code >= 400:
+            _counters['errors'] += 1
+
+
+def session() -> requests.Session:
+    """Return the process-wide pooled session, creating it on first use."""
+    global _session
+    if _session is not None:
+        return _session
+    with _lock:
+        if _session is None:
+            retry = JitterRetry(
+                total=int(os.environ.get('OUTBOUND_RETRIES', '3')),
+                backoff_factor=float(os.environ.get('OUTBOUND_BACKOFF', '0.5')),
+                status_forcelist=(429, 500, 502, 503, 504),
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=int(os.environ.get('OUTBOUND_POOL_HOSTS', '10')),
+                pool_maxsize=int(os.environ.get('OUTBOUND_POOL_PER_HOST', '10')),
+                pool_block=True,
+                max_retries=retry,
+            )
+            s = requests.Session()
+            s.mount('https://', adapter)
+            s.mount('http://', adapter)
+            s.hooks['response'].append(_count_response)
+            _session = s
+    return _session
+
+
+def get(url, **kwargs) -> requests.Response:
+    """GET through the pooled session with a default timeout."""
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+    return session().get(url, **kwargs)
+
+
+def llm_client():
+    """Return the shared OpenAI client, or None if no OPENAI_API_KEY or no `openai` package.
+
+    The client is rebuilt only if the API key in the environment changes.
+    """
+    global _llm_client, _llm_key
+    key = os.environ.get('OPENAI_API_KEY')
+    if not key:
+        return None
+    if _llm_client is not None and _llm_key == key:
+        return _llm_client
+    try:
+        from openai import OpenAI
+    except Exception:
+        return None
+    with _lock:
+        if _llm_client is None or _llm_key != key:
+            _llm_client = OpenAI(api_key=key)
+            _llm_key = key
+    return _llm_client
+
+
+async def _count_async_response(resp):
+    _count_response(resp)
+
+
+def _async_state() -> dict:
+    loop = asyncio.get_running_loop()
+    state = _async_clients.get(loop)
+    if state is None:
+        retries = int(os.environ.get('OUTBOUND_RETRIES', '3'))
+        limit = int(os.environ.get('OUTBOUND_ASYNC_CONNECTIONS', '200'))
+        limits = httpx.Limits(max_connections=limit, max_keepalive_connections=limit)
+        client = httpx.AsyncClient(
+            # retries here cover connection failures; 429/5xx are left to the caller
+            transport=httpx.AsyncHTTPTransport(retries=retries, limits=limits),
+            timeout=DEFAULT_TIMEOUT,
+            event_hooks={'response': [_count_async_response]},
+        )
+        state = _async_clients[loop] = {'http': client, 'llm': None, 'llm_key': None}
+    return state
+
+
+def async_http():
+    """Return the pooled httpx.AsyncClient for the running event loop.
+
+    Must be called from a coroutine. Raises RuntimeError if httpx is not installed.
+    """
+    if httpx is None:
+        raise RuntimeError('the async app needs httpx (pip install httpx)')
+    return _async_state()['http']
+
+
+def async_llm_client():
+    """Return the AsyncOpenAI client for the running event loop, or None (see `llm_client`)."""
+    key = os.environ.get('OPENAI_API_KEY')
+    if not key or httpx is None:
+        return None
+    state = _async_state()
+    if state['llm'] is None or state['llm_key'] != key:
+        try:
+            from openai import AsyncOpenAI
+        except Exception:
+            return None
+        state['llm'] = AsyncOpenAI(api_key=key, http_client=state['http'])
+        state['llm_key'] = key
+    return state['llm']
+
+
+async def aclose():
+    """Close the async clients of the running event loop (ASGI lifespan shutdown)."""
+    state = _async_clients.pop(asyncio.get_running_loop(), None)
+    if state is not None:
+        await state['http'].aclose()
+
+
+def stats() -> dict:
+    """Request counters and per-host connection pool usage for monitoring."""
+    pools = []
+    s = _session
+    if s is not None:
+        seen = set()
+        for adapter in s.adapters.values():
+            if id(adapter) in seen:
+                continue
+            seen.add(id(adapter))
+            manager = adapter.poolmanager
+            for key in manager.pools.keys():
+                pool = manager.pools.get(key)
+                if pool is None:
+                    continue
+                pools.append({
+                    'host': f"{pool.scheme}://{pool.host}:{pool.port}",
+                    'connections_opened': pool.num_connections,
+                    'requests': pool.num_requests,
+                    'idle': pool.pool.qsize() if pool.pool is not None else 0,
+                    'maxsize': adapter._pool_maxsize,
+                })
+    with _lock:
+        counters = dict(_counters)
+    return {
+        'http': dict(counters, pools=pools),
+        'llm_client_ready': _llm_client is not None,
+        'async_clients': len(_async_clients),
+    }
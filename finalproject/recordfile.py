@@ -0,0 +1,169 @@
+"""Lazy, memory-mapped reader for large JSON record files.
+
+`RecordFile` iterates the objects of a JSON array (`[{...}, {...}]`) or a
+JSON Lines file one at a time. The file is mmap'd and record boundaries are
+found with a regex over the raw bytes (strings are matched whole, so braces
+inside them are ignored), so only the record being yielded is ever decoded;
+the full list is never built.
+
+For lookups by key, `get()` uses an offset index {key: (start, end)} that is
+built on first use and saved next to the file as `<file>.idx`. The saved
+index carries the file's inode/mtime/size and is rebuilt when they change.
+"""
+
+import mmap
+import os
+import re
+from typing import Iterator, Optional, Tuple
+
+from .models import json_dumps, json_loads
+
+# A complete JSON string, or one structural bracket.
+_TOKEN = re.compile(rb'"(?:[^"\\]|\\.)*"|[\[\]{}]', re.S)
+_NON_SPACE = re.compile(rb'\S')
+
+_OPEN = frozenset(b'[{')
+_QUOTE = ord('"')
+
+
+class RecordFile:
+    """Iterate or index the records of a JSON array / JSON Lines file."""
+
+    def __init__(self, path, key: str = 'id', index_path=None):
+        self.path = str(path)
+        self.key = key
+        self.index_path = str(index_path) if index_path is not None else self.path + '.idx'
+        self._mm = None
+        self._stamp = None
+        self._index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._mm = None
+        self._stamp = None
+        self._index = None
+
+    def _map(self):
+        """Map the file, remapping (and dropping the index) if it was replaced."""
+        st = os.stat(self.path)
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if self._mm is None or stamp != self._stamp:
+            if st.st_size == 0:
+                mm = b''  # mmap cannot map an empty file
+            else:
+                with open(self.path, 'rb') as f:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            # an older map may still back a running iterator; it is closed when collected
+            self._mm, self._stamp, self._index = mm, stamp, None
+        return self._mm
+
+    def spans(self) -> Iterator[Tuple[int, int]]:
+        """Yield the (start, end) byte range of every record."""
+        mm = self._map()
+        first = _NON_SPACE.search(mm)
+        if first is None:
+            return
+        if mm[first.start()] != ord('['):
+            yield from self._line_spans(mm)
+            return
+        depth = 0
+        start = None
+        for tok in _TOKEN.finditer(mm, first.end()):
+            c = mm[tok.start()]
+            if c == _QUOTE:
+                continue
+            if c in _OPEN:
+                if depth == 0:
+                    start = tok.start()
+                depth += 1
+                continue
+            depth -= 1
+            if depth == 0:
+                yield start, tok.end()
+            elif depth < 0:
+                return  # closing bracket of the array
+        raise ValueError(f'{self.path}: truncated JSON array')
+
+    @staticmethod
+    def _line_spans(mm):
+        pos, size = 0, len(mm)
+        while pos < size:
+            nl = mm.find(b'\n', pos)
+            end = size if nl == -1 else nl
+            if mm[pos:end].strip():
+                yield pos, end
+            pos = end + 1
+
+    def __iter__(self):
+        mm = self._map()
+        for start, end in self.spans():
+            yield json_loads(mm[start:end])
+
+    def index(self) -> dict:
+        """Return {key: (start, end)}, loading or rebuilding `<file>.idx` as needed."""
+        self._map()
+        if self._index is None:
+            self._index = self._read_index()
+        if self._index is None:
+            self._index = self._build_index()
+        return self._index
+
+    def _read_index(self) -> Optional[dict]:
+        try:
+            with open(self.index_path, 'rb') as f:
+                saved = json_loads(f.read())
+        except (OSError, ValueError):
+            return None
+        if saved.get('stamp') != list(self._stamp) or saved.get('key') != self.key:
+            return None
+        return {k: (s, e) for k, s, e in saved['offsets']}
+
+    def _build_index(self) -> dict:
+        mm = self._mm
+        index = {}
+        for start, end in self.spans():
+            value = json_loads(mm[start:end]).get(self.key)
+            if value is not None:
+                index.setdefault(value, (start, end))
+        saved = {'key': self.key, 'stamp': list(self._stamp), 'offsets': [[k, s, e] for k, (s, e) in index.items()]}
+        tmp = self.index_path + '.tmp'
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(json_dumps(saved))
+            os.replace(tmp, self.index_path)
+        except OSError:
+            pass  # read-only location: keep the index in memory only
+        return index
+
+    def get(self, key) -> Optional[dict]:
+        """Return the record whose key field equals `key`, decoding only that record."""
+        span = self.index().get(key)
+        if span is None:
+            return None
+        return json_loads(self._mm[span[0]:span[1]])
+
+
+def read_records(path) -> list:
+    """Load every record of a JSON array / JSON Lines file into a list.
+
+    When the whole list is wanted anyway, one parse of a JSON array is faster
+    than scanning it record by record, so only JSON Lines go through the scanner.
+    """
+    with open(path, 'rb') as f:
+        head = b''
+        while not head.strip():
+            chunk = f.read(4096)
+            if not chunk:
+                return []
+            head += chunk
+        if head.lstrip()[:1] == b'[':
+            return json_loads(head + f.read())
+    with RecordFile(path) as source:
+        return list(source)
@@ -0,0 +1,162 @@
+"""Offline vector retrieval over park descriptions (TF-IDF, cosine, top-k).
+
+Each document becomes a sparse TF-IDF vector over hashed unigram and bigram
+features (`DIM` buckets, crc32 so vectors are stable across processes),
+L2-normalized so a dot product is the cosine similarity. The matrix is kept
+term-major (CSC) in three NumPy arrays:
+
+  indptr   int32 [DIM + 1]  bucket b's entries are indptr[b]:indptr[b + 1]
+  docs     int32 [nnz]      document row of each entry
+  weights  float32 [nnz]    normalized TF-IDF weight of each entry
+
+A query only touches the columns of its own features, so top-k search is a
+`bincount` over a few short slices plus an `argpartition`, well under a
+millisecond for thousands of documents. Document frequencies are the column
+lengths, so the IDF needs no separate table. `save()`/`load()` store the
+arrays as one .npz file with a caller-supplied stamp of the source data.
+
+NumPy is required; without it `available()` is False and callers skip retrieval.
+"""
+
+import math
+import os
+import zlib
+from collections import Counter
+from typing import Iterable, List, Optional, Tuple
+
+from .textsearch import tokenize
+
+try:
+    import numpy as np
+except ImportError:  # optional; retrieval is disabled without it
+    np = None
+
+DIM = 1 << 18
+
+# Question words and fillers that would otherwise dominate short queries.
+STOPWORDS = frozenset(
+    'a about an and are as at be best by can do does for from how i in is it its me my of on or '
+    'park parks national tell the there this to visit was what when where which who why with you'.split()
+)
+
+STATE_NAMES = {
+    'AK': 'Alaska', 'AL': 'Alabama', 'AR': 'Arkansas', 'AS': 'American Samoa', 'AZ': 'Arizona',
+    'CA': 'California', 'CO': 'Colorado', 'CT': 'Connecticut', 'DE': 'Delaware', 'FL': 'Florida',
+    'GA': 'Georgia', 'HI': 'Hawaii', 'IA': 'Iowa', 'ID': 'Idaho', 'IL': 'Illinois', 'IN': 'Indiana',
+    'KS': 'Kansas', 'KY': 'Kentucky', 'LA': 'Louisiana', 'MA': 'Massachusetts', 'MD': 'Maryland',
+    'ME': 'Maine', 'MI': 'Michigan', 'MN': 'Minnesota', 'MO': 'Missouri', 'MS': 'Mississippi',
+    'MT': 'Montana', 'NC': 'North Carolina', 'ND': 'North Dakota', 'NE': 'Nebraska', 'NH': 'New Hampshire',
+    'NJ': 'New Jersey', 'NM': 'New Mexico', 'NV': 'Nevada', 'NY': 'New York', 'OH': 'Ohio',
+    'OK': 'Oklahoma', 'OR': 'Oregon', 'PA': 'Pennsylvania', 'RI': 'Rhode Island', 'SC': 'South Carolina',
+    'SD': 'South Dakota', 'TN': 'Tennessee', 'TX': 'Texas', 'UT': 'Utah', 'VA': 'Virginia',
+    'VI': 'US Virgin Islands', 'VT': 'Vermont', 'WA': 'Washington', 'WI': 'Wisconsin', 'WV': 'West Virginia',
+    'WY': 'Wyoming',
+}
+
+
+def available() -> bool:
+    return np is not None
+
+
+def terms(text: str) -> List[str]:
+    """The words of `text` that carry meaning for retrieval (stopwords removed)."""
+    return [w for w in tokenize(text) if w not in STOPWORDS]
+
+
+def features(text: str, dim: int = DIM) -> Counter:
+    """Hashed unigram + bigram counts of `text`, stopwords removed."""
+    words = terms(text)
+    grams = words + [f'{a} {b}' for a, b in zip(words, words[1:])]
+    return Counter(zlib.crc32(g.encode('utf-8')) & (dim - 1) for g in grams)
+
+
+def park_text(park: dict, details: Optional[dict] = None) -> str:
+    """The searchable text of one park: name, states, and NPS name/description when known."""
+    states = [s.strip().upper() for s in (park.get('state') or '').split(',') if s.strip()]
+    parts = [park.get('name') or '', ' '.join(STATE_NAMES.get(s, s) for s in states)]
+    if details:
+        parts += [details.get('fullName') or '', details.get('description') or '']
+    return '. '.join(p for p in parts if p)
+
+
+class VectorIndex:
+    """TF-IDF cosine index over documents identified by string ids."""
+
+    def __init__(self, ids, indptr, docs, weights, stamp=None):
+        self.ids = list(ids)
+        self.indptr = indptr
+        self.docs = docs
+        self.weights = weights
+        self.dim = len(indptr) - 1
+        self.stamp = stamp
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _idf(self, df):
+        return math.log((1 + len(self.ids)) / (1 + df)) + 1.0
+
+    @classmethod
+    def build(cls, docs: Iterable[Tuple[str, str]], dim: int = DIM, stamp=None) -> 'VectorIndex':
+        ids, counts = [], []
+        for doc_id, text in docs:
+            ids.append(doc_id)
+            counts.append(features(text, dim))
+        df = Counter(b for c in counts for b in c)
+        n = len(ids)
+        rows, cols, vals = [], [], []
+        for row, c in enumerate(counts):
+            w = {b: (1.0 + math.log(tf)) * (math.log((1 + n) / (1 + df[b])) + 1.0) for b, tf in c.items()}
+            norm = math.sqrt(sum(v * v for v in w.values())) or 1.0
+            for b, v in w.items():
+                rows.append(row)
+                cols.append(b)
+                vals.append(v / norm)
+        cols = np.asarray(cols, dtype=np.int64)
+        order = np.argsort(cols, kind='stable')
+        indptr = np.zeros(dim + 1, dtype=np.int32)
+        np.cumsum(np.bincount(cols, minlength=dim), out=indptr[1:])
+        return cls(ids, indptr, np.asarray(rows, dtype=np.int32)[order],
+                   np.asarray(vals, dtype=np.float32)[order], stamp)
+
+    def search(self, query: str, k: int = 3) -> List[Tuple[str, float]]:
+        """Return up to `k` (doc id, cosine score) pairs with a positive score, best first."""
+        q = {}
+        for b, tf in features(query, self.dim).items():
+            start, end = int(self.indptr[b]), int(self.indptr[b + 1])
+            if end > start:
+                q[b] = (start, end, (1.0 + math.log(tf)) * self._idf(end - start))
+        if not q or not self.ids:
+            return []
+        norm = math.sqrt(sum(w * w for _, _, w in q.values()))
+        spans = list(q.values())
+        if len(spans) == 1:
+            start, end, w = spans[0]
+            docs, weights = self.docs[start:end], self.weights[start:end] * (w / norm)
+        else:
+            docs = np.concatenate([self.docs[s:e] for s, e, _ in spans])
+            weights = np.concatenate([self.weights[s:e] * (w / norm) for s, e, w in spans])
+        scores = np.bincount(docs, weights=weights, minlength=len(self.ids))
+        k = min(k, len(self.ids))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(self.ids) else np.arange(len(self.ids))
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(self.ids[i], float(scores[i])) for i in top if scores[i] > 0]
+
+    # persistence
+
+    def save(self, path):
+        """Write the index as one .npz file (written to a temp file, then renamed)."""
+        tmp = f'{path}.tmp.npz'
+        np.savez_compressed(tmp, ids=np.asarray(self.ids, dtype=str), indptr=self.indptr, docs=self.docs,
+                 weights=self.weights, stamp=np.asarray(self.stamp if self.stamp is not None else [], dtype=np.int64))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path) -> Optional['VectorIndex']:
+        """Load a saved index, or None if it is missing or unreadable."""
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                stamp = data['stamp'].tolist()
+                return cls(data['ids'].tolist(), data['indptr'], data['docs'], data['weights'], stamp or None)
+        except (OSError, ValueError, KeyError):
+            return None
@@ -0,0 +1,244 @@
+"""Road-trip route planner over parks.
+
+`plan_route` orders a set of parks into a short open path starting from the
+traveler's location:
+
+1. nearest-neighbour construction,
+2. 2-opt (segment reversal) and Or-opt (move a run of 1-3 stops) improvement,
+   both restricted to each stop's nearest neighbours so a pass is O(n * K)
+   instead of O(n^2), until no move helps or the time budget runs out.
+
+Distances come from a `DistanceMatrix` that is precomputed once for a catalog
+and can be reused for any subset of its parks.
+"""
+
+import math
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Tuple
+
+from . import geo
+
+# Catalogs up to this size keep a full n x n matrix (8 bytes per cell);
+# larger ones compute haversine distances on demand.
+MAX_FULL_MATRIX = 2000
+
+# Candidate neighbours considered per stop by the improvement moves.
+NEIGHBOURS = 10
+
+
+class DistanceMatrix:
+    """Park-to-park distances in km, indexed by position in `self.parks`."""
+
+    def __init__(self, parks, max_full: int = MAX_FULL_MATRIX):
+        coords = geo.CoordinateArray(parks)
+        self.parks = coords.parks
+        n = len(self.parks)
+        self._n = n
+        self._lat = [float(v) for v in coords.lat]
+        self._lon = [float(v) for v in coords.lon]
+        self._cos = [float(v) for v in coords.cos_lat]
+        self._flat = None
+        if n <= max_full:
+            flat = array('d')
+            m = coords.distance_matrix()
+            if geo.np is not None and coords.use_numpy:
+                flat.frombytes(m.astype('float64').tobytes())
+            else:
+                for row in m:
+                    flat.extend(row)
+            self._flat = flat
+
+    def __len__(self):
+        return self._n
+
+    @property
+    def is_full(self) -> bool:
+        return self._flat is not None
+
+    def distance(self, i: int, j: int) -> float:
+        if self._flat is not None:
+            return self._flat[i * self._n + j]
+        return self._haversine(self._lat[i], self._lon[i], self._cos[i], j)
+
+    def _haversine(self, lat, lon, cos_lat, j):
+        a = (math.sin((self._lat[j] - lat) / 2) ** 2
+             + cos_lat * self._cos[j] * math.sin((self._lon[j] - lon) / 2) ** 2)
+        return 2 * geo.EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+    def distances_from(self, lat: float, lon: float, indices: Sequence[int]) -> List[float]:
+        """Distances from an arbitrary point to the parks at `indices`."""
+        rlat, rlon = math.radians(lat), math.radians(lon)
+        cos_lat = math.cos(rlat)
+        return [self._haversine(rlat, rlon, cos_lat, j) for j in indices]
+
+    def index_of(self, ids) -> List[int]:
+        """Matrix positions of the parks whose id is in `ids`, in matrix order."""
+        wanted = set(ids)
+        return [i for i, p in enumerate(self.parks) if geo.park_id(p) in wanted]
+
+
+@dataclass
+class Route:
+    stops: list
+    legs: List[float]
+    total_km: float
+    initial_km: float
+    elapsed_s: float
+    improved: bool = field(default=False)
+
+
+def plan_route(matrix: DistanceMatrix, start: Tuple[float, float], indices: Optional[Sequence[int]] = None,
+               time_budget: float = 1.0, neighbours: int = NEIGHBOURS) -> Route:
+    """Plan an open tour from `start` (lat, lon) through the parks at `indices`.
+
+    `indices` are positions in `matrix` (default: every park). The improvement
+    phase stops after `time_budget` seconds; construction always completes.
+    """
+    started = time.perf_counter()
+    deadline = started + max(0.0, time_budget)
+    stops = list(range(len(matrix))) if indices is None else list(indices)
+    m = len(stops) + 1  # local node 0 is the start location
+    if m == 1:
+        return Route(stops=[], legs=[], total_km=0.0, initial_km=0.0, elapsed_s=0.0)
+
+    start_d = [0.0] + matrix.distances_from(start[0], start[1], stops)
+    mdist = matrix.distance
+
+    def dist(a, b):
+        if a == 0:
+            return start_d[b]
+        if b == 0:
+            return start_d[a]
+        return mdist(stops[a - 1], stops[b - 1])
+
+    # K nearest neighbours of every local node, closest first
+    points = [{'id': 0, 'lat': start[0], 'lon': start[1]}]
+    for local, i in enumerate(stops, start=1):
+        lat, lon = geo.coordinates(matrix.parks[i])
+        points.append({'id': local, 'lat': lat, 'lon': lon})
+    index = geo.ParkIndex(points)
+    near = [[p['id'] for p, _ in index.nearest(pt['lat'], pt['lon'], k=neighbours + 1) if p['id'] != pt['id']]
+            for pt in points]
+
+    tour = _nearest_neighbour(m, near, index, points)
+    initial = _length(tour, dist)
+
+    pos = [0] * m
+    for k, node in enumerate(tour):
+        pos[node] = k
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = _two_opt(tour, pos, near, dist, deadline)
+        improved = _or_opt(tour, pos, near, dist, deadline) or improved
+
+    legs = [dist(tour[k], tour[k + 1]) for k in range(m - 1)]
+    total = sum(legs)
+    return Route(
+        stops=[matrix.parks[stops[node - 1]] for node in tour[1:]],
+        legs=legs,
+        total_km=total,
+        initial_km=initial,
+        elapsed_s=time.perf_counter() - started,
+        improved=total < initial - 1e-9,
+    )
+
+
+def _length(tour, dist) -> float:
+    return sum(dist(tour[k], tour[k + 1]) for k in range(len(tour) - 1))
+
+
+def _nearest_neighbour(m, near, index, points) -> List[int]:
+    """Greedy tour from node 0.
+
+    The first unvisited entry of a node's sorted neighbour list is its exact
+    nearest unvisited node; only when all neighbours are used do we fall back
+    to a k-d tree query that skips visited nodes.
+    """
+    visited = {0}
+    tour = [0]
+    current = 0
+    while len(tour) < m:
+        nxt = next((c for c in near[current] if c not in visited), None)
+        if nxt is None:
+            pt = points[current]
+            nxt = index.nearest(pt['lat'], pt['lon'], k=1, exclude=visited)[0][0]['id']
+        visited.add(nxt)
+        tour.append(nxt)
+        current = nxt
+    return tour
+
+
+def _two_opt(tour, pos, near, dist, deadline) -> bool:
+    """One pass of neighbour-list 2-opt on an open path with a fixed first node."""
+    m = len(tour)
+    any_gain = False
+    for a in range(m):
+        if (a & 63) == 0 and time.perf_counter() >= deadline:
+            break
+        for c in near[a]:
+            p, q = pos[a], pos[c]
+            # two variants: new edge (a, c) replaces a's outgoing or incoming edge
+            for i, j in ((min(p, q), max(p, q)), (min(p, q) - 1, max(p, q) - 1)):
+                if i < 0 or j - i < 2:
+                    continue
+                ti, ti1, tj = tour[i], tour[i + 1], tour[j]
+                delta = dist(ti, tj) - dist(ti, ti1)
+                if j + 1 < m:
+                    tj1 = tour[j + 1]
+                    delta += dist(ti1, tj1) - dist(tj, tj1)
+                if delta < -1e-9:
+                    tour[i + 1:j + 1] = tour[j:i:-1]
+                    for k in range(i + 1, j + 1):
+                        pos[tour[k]] = k
+                    any_gain = True
+                    break
+    return any_gain
+
+
+def _or_opt(tour, pos, near, dist, deadline) -> bool:
+    """One pass of Or-opt: move runs of 1-3 stops next to a nearby stop, either orientation."""
+    m = len(tour)
+    any_gain = False
+    for seg_len in (1, 2, 3):
+        k = 1
+        while k + seg_len <= m:
+            if (k & 63) == 0 and time.perf_counter() >= deadline:
+                return any_gain
+            first, last = tour[k], tour[k + seg_len - 1]
+            prev = tour[k - 1]
+            nxt = tour[k + seg_len] if k + seg_len < m else None
+            removed = dist(prev, first)
+            if nxt is not None:
+                removed += dist(last, nxt) - dist(prev, nxt)
+            best = None
+            for c in set(near[first]) | set(near[last]):
+                q = pos[c]
+                if k - 1 <= q < k + seg_len:
+                    continue
+                cn = tour[q + 1] if q + 1 < m else None
+                if cn is not None and k <= pos[cn] < k + seg_len:
+                    continue
+                # insert between c and its successor, forward or reversed
+                for head, tail, rev in ((first, last, False), (last, first, True)):
+                    added = dist(c, head)
+                    if cn is not None:
+                        added += dist(tail, cn) - dist(c, cn)
+                    gain = removed - added
+                    if gain > 1e-9 and (best is None or gain > best[0]):
+                        best = (gain, c, rev)
+            if best is None:
+                k += 1
+                continue
+            _, c, rev = best
+            segment = tour[k:k + seg_len]
+            if rev:
+                segment.reverse()
+            del tour[k:k + seg_len]
+            at = pos[c] + 1 if pos[c] < k else pos[c] - seg_len + 1
+            tour[at:at] = segment
+            for idx in range(min(k, at), max(k, at) + seg_len):
+                pos[tour[idx]] = idx
+            any_gain = True
+    return any_gain
@@ -0,0 +1,307 @@
+"""Columnar binary snapshot of the store (the "snapshot" data format).
+
+Layout (all integers little-endian):
+
+  8 bytes   magic b'PTSNAP01'
+  u64       header length H
+  H bytes   header: UTF-8 JSON, padded with spaces to a multiple of 8
+  ...       column data; every section starts on an 8-byte boundary
+
+The header describes each table as {"rows": n, "columns": [...]}; a column is
+{"name", "type", "codes": [offset, bytes]} plus, for dictionary-encoded
+types, "dict": [offset, count] and "blob": [offset, bytes]. Offsets are
+relative to the first byte after the header. Column types:
+
+  str   u32 code per row into the column's own dictionary (0xFFFFFFFF = None);
+        the dictionary is `count` u64 end offsets into a UTF-8 blob
+  json  like str, but dictionary entries are JSON (for mixed-type columns)
+  ts    i64 microseconds since 1970-01-01 for naive ISO timestamps (INT64_MIN = None)
+  i64   i64 per row (INT64_MIN = None)
+  f64   f64 per row (NaN = None)
+
+`SnapshotReader` memory-maps the file and exposes each column as a zero-copy
+memoryview, so a query such as visits for one park reads the park_id column
+and only the matching rows, never the whole history.
+"""
+
+import json
+import math
+import mmap
+import sys
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from .models import PARK_FIELDS, VISIT_FIELDS
+
+try:
+    import numpy as np
+except ImportError:  # optional; pure-Python column scans below
+    np = None
+
+MAGIC = b'PTSNAP01'
+VERSION = 1
+
+NULL_CODE = 0xFFFFFFFF
+NULL_INT = -(1 << 63)
+
+_EPOCH = datetime(1970, 1, 1)
+_US = timedelta(microseconds=1)
+_TABLE_FIELDS = {'parks': PARK_FIELDS, 'visits': VISIT_FIELDS}
+_CODE_FORMAT = {'str': 'I', 'json': 'I', 'ts': 'q', 'i64': 'q', 'f64': 'd'}
+
+if sys.byteorder != 'little':  # pragma: no cover - the format is little-endian only
+    raise ImportError('finalproject.snapshot requires a little-endian platform')
+
+
+def is_snapshot(path) -> bool:
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except FileNotFoundError:
+        return False
+
+
+# writing
+
+def _to_micros(value: str) -> Optional[int]:
+    """Microseconds since the epoch, or None if `value` would not round-trip exactly."""
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if dt.tzinfo is not None or dt.isoformat() != value:
+        return None
+    return (dt - _EPOCH) // _US
+
+
+def _column_type(name: str, values: list) -> str:
+    kinds = {type(v) for v in values if v is not None}
+    if not kinds or kinds == {str}:
+        if kinds and name.endswith('_at') and all(v is None or _to_micros(v) is not None for v in values):
+            return 'ts'
+        return 'str'
+    if kinds == {int}:
+        return 'i64' if all(v is None or NULL_INT < v < -NULL_INT for v in values) else 'json'
+    if kinds <= {int, float}:
+        return 'f64'
+    return 'json'
+
+
+def _encode_dictionary(values: list, as_json: bool):
+    codes = array('I')
+    index: Dict = {}
+    entries = []
+    for v in values:
+        if v is None:
+            codes.append(NULL_CODE)
+            continue
+        key = json.dumps(v, sort_keys=True) if as_json else v
+        code = index.get(key)
+        if code is None:
+            code = index[key] = len(entries)
+            entries.append(key.encode('utf-8'))
+        codes.append(code)
+    ends = array('Q')
+    total = 0
+    for e in entries:
+        total += len(e)
+        ends.append(total)
+    return codes, ends, b''.join(entries)
+
+
+def dumps(data: dict) -> bytes:
+    """Encode {'parks': [...], 'visits': [...]} rows as a snapshot file."""
+    sections = []
+    size = 0
+
+    def add(buf) -> list:
+        nonlocal size
+        raw = bytes(buf)
+        at = size
+        pad = -len(raw) % 8
+        sections.append(raw + b'\0' * pad)
+        size += len(raw) + pad
+        return [at, len(raw)]
+
+    tables = {}
+    for table, rows in data.items():
+        if not isinstance(rows, list):
+            continue
+        names = list(_TABLE_FIELDS.get(table, ()))
+        seen = set(names)
+        for r in rows:
+            for k in r:
+                if k not in seen:
+                    seen.add(k)
+                    names.append(k)
+        columns = []
+        for name in names:
+            values = [r.get(name) for r in rows]
+            kind = _column_type(name, values)
+            col = {'name': name, 'type': kind}
+            if kind in ('str', 'json'):
+                codes, ends, blob = _encode_dictionary(values, kind == 'json')
+                col['codes'] = add(codes)
+                col['dict'] = [add(ends)[0], len(ends)]
+                col['blob'] = add(blob)
+            elif kind == 'ts':
+                col['codes'] = add(array('q', (NULL_INT if v is None else _to_micros(v) for v in values)))
+            elif kind == 'i64':
+                col['codes'] = add(array('q', (NULL_INT if v is None else v for v in values)))
+            else:
+                col['codes'] = add(array('d', (math.nan if v is None else v for v in values)))
+            columns.append(col)
+        tables[table] = {'rows': len(rows), 'columns': columns}
+
+    header = json.dumps({'version': VERSION, 'tables': tables}, separators=(',', ':')).encode('utf-8')
+    header += b' ' * (-len(header) % 8)
+    return b''.join([MAGIC, len(header).to_bytes(8, 'little'), header] + sections)
+
+
+# reading
+
+class Column:
+    """One column of a mapped snapshot; values are decoded on access."""
+
+    def __init__(self, buf: memoryview, spec: dict):
+        self.name = spec['name']
+        self.type = spec['type']
+        at, nbytes = spec['codes']
+        self.codes = buf[at:at + nbytes].cast(_CODE_FORMAT[self.type])
+        self._entries = None
+        if self.type in ('str', 'json'):
+            dict_at, count = spec['dict']
+            self._ends = buf[dict_at:dict_at + 8 * count].cast('Q')
+            blob_at, blob_len = spec['blob']
+            self._blob = buf[blob_at:blob_at + blob_len]
+
+    def __len__(self):
+        return len(self.codes)
+
+    def release(self):
+        for view in (self.codes, getattr(self, '_ends', None), getattr(self, '_blob', None)):
+            if view is not None:
+                view.release()
+
+    def _entry(self, code: int):
+        start = self._ends[code - 1] if code else 0
+        text = str(self._blob[start:self._ends[code]], 'utf-8')
+        return json.loads(text) if self.type == 'json' else text
+
+    def dictionary(self) -> list:
+        """All distinct values of a dictionary-encoded column (decoded once)."""
+        if self._entries is None:
+            self._entries = [self._entry(c) for c in range(len(self._ends))]
+        return self._entries
+
+    def value(self, i: int):
+        c = self.codes[i]
+        if self.type in ('str', 'json'):
+            return None if c == NULL_CODE else (self._entries[c] if self._entries is not None else self._entry(c))
+        if self.type == 'f64':
+            return None if c != c else c
+        if c == NULL_INT:
+            return None
+        return (_EPOCH + c * _US).isoformat() if self.type == 'ts' else c
+
+    def values(self) -> list:
+        if self.type in ('str', 'json'):
+            entries = self.dictionary()
+            return [None if c == NULL_CODE else entries[c] for c in self.codes]
+        return [self.value(i) for i in range(len(self.codes))]
+
+    def find(self, code) -> List[int]:
+        """Row positions whose stored code equals `code`."""
+        if np is not None:
+            arr = np.frombuffer(self.codes, dtype=np.dtype(self.codes.format).newbyteorder('<'))
+            return np.flatnonzero(arr == code).tolist()
+        return [i for i, c in enumerate(self.codes) if c == code]
+
+    def code_of(self, value) -> Optional[int]:
+        try:
+            return self.dictionary().index(value)
+        except ValueError:
+            return None
+
+
+class SnapshotReader:
+    """Read-only, memory-mapped view of a snapshot file."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mm)
+        if buf[:len(MAGIC)] != MAGIC:
+            buf.release()
+            self._mm.close()
+            raise ValueError(f'{path} is not a snapshot file')
+        hlen = int.from_bytes(buf[8:16], 'little')
+        header = json.loads(str(buf[16:16 + hlen], 'utf-8'))
+        if header.get('version') != VERSION:
+            raise ValueError(f"Unsupported snapshot version {header.get('version')}")
+        self._buf = buf
+        self._data = buf[16 + hlen:]
+        self.tables = header['tables']
+        self._columns = {}
+
+    def close(self):
+        for cols in self._columns.values():
+            for c in cols:
+                c.release()
+        self._columns.clear()
+        self._data.release()
+        self._buf.release()
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def rows(self, table: str) -> int:
+        return self.tables.get(table, {}).get('rows', 0)
+
+    def columns(self, table: str) -> List[Column]:
+        if table not in self._columns:
+            specs = self.tables.get(table, {}).get('columns', [])
+            self._columns[table] = [Column(self._data, s) for s in specs]
+        return self._columns[table]
+
+    def column(self, table: str, name: str) -> Optional[Column]:
+        return next((c for c in self.columns(table) if c.name == name), None)
+
+    def row(self, table: str, i: int) -> dict:
+        return {c.name: c.value(i) for c in self.columns(table)}
+
+    def table(self, table: str) -> List[dict]:
+        cols = self.columns(table)
+        names = [c.name for c in cols]
+        return [dict(zip(names, vals)) for vals in zip(*(c.values() for c in cols))]
+
+    def to_dict(self) -> dict:
+        return {name: self.table(name) for name in self.tables}
+
+    def find_rows(self, table: str, name: str, value) -> List[dict]:
+        """Rows whose dictionary-encoded column `name` equals `value`, scanning only that column."""
+        col = self.column(table, name)
+        code = col.code_of(value) if col is not None and col.type == 'str' else None
+        if code is None:
+            return []
+        return [self.row(table, i) for i in col.find(code)]
+
+    def visit_rows(self, park_id: str) -> List[dict]:
+        """Visits of one park, newest first."""
+        rows = self.find_rows('visits', 'park_id', park_id)
+        return sorted(rows, key=lambda x: x.get('created_at') or '', reverse=True)
+
+    def visited_park_ids(self) -> set:
+        col = self.column('visits', 'park_id')
+        return {v for v in col.dictionary() if v} if col is not None else set()
+
+
+def load(path) -> dict:
+    """Read a whole snapshot file back into the data.json layout."""
+    with SnapshotReader(path) as reader:
+        return reader.to_dict()
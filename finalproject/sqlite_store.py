@@ -0,0 +1,221 @@
+"""SQLite storage backend for the finalproject store.
+
+Selected with `TRACKER_STORE=sqlite`. Rows live in `parks` and `visits`
+tables with indexes on park name, visit park_id and created_at, so single
+inserts and lookups no longer touch the whole data set. The database runs in
+WAL mode, and every query is a constant parameterized statement so sqlite3's
+statement cache reuses the prepared form.
+
+`migrate_from_json` copies an existing `data.json` into the database once.
+"""
+
+import json
+import sqlite3
+import threading
+from typing import Iterable, List, Optional
+
+from . import snapshot
+
+PARK_COLUMNS = ('id', 'name', 'state', 'lat', 'lon', 'source_id', 'notes', 'created_at')
+VISIT_COLUMNS = ('id', 'park_id', 'trail', 'start', 'end', 'party_size', 'notes', 'created_at')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS parks (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    state TEXT,
+    lat REAL,
+    lon REAL,
+    source_id TEXT,
+    notes TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS visits (
+    id TEXT PRIMARY KEY,
+    park_id TEXT NOT NULL,
+    trail TEXT,
+    start TEXT,
+    "end" TEXT,
+    party_size INTEGER,
+    notes TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_parks_name ON parks(name);
+CREATE INDEX IF NOT EXISTS idx_visits_park_id ON visits(park_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_visits_created_at ON visits(created_at);
+"""
+
+# Columns added after the first version of data.db; older files are upgraded in place.
+LATE_PARK_COLUMNS = {'lat': 'REAL', 'lon': 'REAL', 'source_id': 'TEXT', 'notes': 'TEXT'}
+
+_PARK_SELECT = 'SELECT id, name, state, lat, lon, source_id, notes, created_at FROM parks'
+_VISIT_SELECT = 'SELECT id, park_id, trail, start, "end", party_size, notes, created_at FROM visits'
+_INSERT_PARK = ('INSERT OR REPLACE INTO parks (id, name, state, lat, lon, source_id, notes, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)')
+_INSERT_VISIT = ('INSERT OR REPLACE INTO visits (id, park_id, trail, start, "end", party_size, notes, created_at) '
+                 'VALUES (?, ?, ?, ?, ?, ?, ?, ?)')
+
+
+def _park_values(row: dict) -> tuple:
+    return tuple(row.get(c) for c in PARK_COLUMNS)
+
+
+def _visit_values(row: dict) -> tuple:
+    return tuple(row.get(c) for c in VISIT_COLUMNS)
+
+
+class SqliteStore:
+    """Row-level store backed by one SQLite connection (serialized by a lock)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._query = None  # (change version, db.ParkIndexes)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, cached_statements=64)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+            existing = {r[1] for r in self._conn.execute('PRAGMA table_info(parks)')}
+            for col, kind in LATE_PARK_COLUMNS.items():
+                if col not in existing:
+                    self._conn.execute(f'ALTER TABLE parks ADD COLUMN {col} {kind}')
+
+    def close(self):
+        self._conn.close()
+
+    def _rows(self, sql, params, columns) -> List[dict]:
+        with self._lock:
+            return [dict(zip(columns, r)) for r in self._conn.execute(sql, params)]
+
+    def _one(self, sql, params, columns) -> Optional[dict]:
+        with self._lock:
+            r = self._conn.execute(sql, params).fetchone()
+        return dict(zip(columns, r)) if r else None
+
+    # parks
+
+    def insert_park(self, row: dict):
+        with self._lock, self._conn:
+            self._conn.execute(_INSERT_PARK, _park_values(row))
+
+    def update_park(self, park_id: str, fields: dict) -> bool:
+        cols = [c for c in fields if c in PARK_COLUMNS and c not in ('id', 'created_at')]
+        if not cols:
+            return False
+        sets = ', '.join(f'{c} = ?' for c in cols)
+        with self._lock, self._conn:
+            cur = self._conn.execute(f'UPDATE parks SET {sets} WHERE id = ?', [fields[c] for c in cols] + [park_id])
+        return cur.rowcount > 0
+
+    def park_rows(self) -> List[dict]:
+        return self._rows(_PARK_SELECT + ' ORDER BY name', (), PARK_COLUMNS)
+
+    def park_by_name(self, name: str) -> Optional[dict]:
+        return self._one(_PARK_SELECT + ' WHERE name = ? LIMIT 1', (name,), PARK_COLUMNS)
+
+    def park_by_id(self, park_id: str) -> Optional[dict]:
+        return self._one(_PARK_SELECT + ' WHERE id = ?', (park_id,), PARK_COLUMNS)
+
+    # visits
+
+    def insert_visit(self, row: dict):
+        with self._lock, self._conn:
+            self._conn.execute(_INSERT_VISIT, _visit_values(row))
+
+    def visit_rows(self, park_id: Optional[str] = None) -> List[dict]:
+        if park_id:
+            return self._rows(_VISIT_SELECT + ' WHERE park_id = ? ORDER BY created_at DESC', (park_id,), VISIT_COLUMNS)
+        return self._rows(_VISIT_SELECT + ' ORDER BY created_at DESC', (), VISIT_COLUMNS)
+
+    def visit_rows_with_parks(self, park_id: Optional[str] = None) -> List[tuple]:
+        """Visits LEFT JOINed to their park, newest first."""
+        sql = ('SELECT v.id, v.park_id, v.trail, v.start, v."end", v.party_size, v.notes, v.created_at, '
+               'p.id, p.name, p.state, p.lat, p.lon, p.source_id, p.notes, p.created_at '
+               'FROM visits v LEFT JOIN parks p ON p.id = v.park_id')
+        params = ()
+        if park_id:
+            sql += ' WHERE v.park_id = ?'
+            params = (park_id,)
+        sql += ' ORDER BY v.created_at DESC'
+        n = len(VISIT_COLUMNS)
+        with self._lock:
+            return [(dict(zip(VISIT_COLUMNS, r[:n])), dict(zip(PARK_COLUMNS, r[n:])) if r[n] is not None else None)
+                    for r in self._conn.execute(sql, params)]
+
+    def visited_park_ids(self) -> set:
+        with self._lock:
+            return {r[0] for r in self._conn.execute('SELECT DISTINCT park_id FROM visits') if r[0]}
+
+    # bulk
+
+    def clear_visits(self):
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM visits')
+
+    def clear_parks(self):
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM visits')
+            self._conn.execute('DELETE FROM parks')
+
+    def clear_all(self):
+        self.clear_parks()
+
+    def upsert_parks(self, plan) -> dict:
+        """Apply a `db._plan_upserts` merge in one transaction."""
+        with self._lock, self._conn:
+            rows = [dict(zip(PARK_COLUMNS, r)) for r in self._conn.execute(_PARK_SELECT + ' ORDER BY rowid')]
+            new_rows, updated, counts = plan(rows)
+            self._conn.executemany(_INSERT_PARK, (_park_values(r) for r in new_rows))
+            self._conn.executemany('UPDATE parks SET lat = ?, lon = ?, source_id = ? WHERE id = ?',
+                                   ((r.get('lat'), r.get('lon'), r.get('source_id'), r['id']) for r in updated))
+        return counts
+
+    def park_indexes(self):
+        """Query indexes (see `db.ParkIndexes`), rebuilt only after the data changed.
+
+        `total_changes` counts our own writes and `PRAGMA data_version` changes
+        when another connection commits, so together they detect any change.
+        """
+        from .db import ParkIndexes
+        with self._lock:
+            version = (self._conn.execute('PRAGMA data_version').fetchone()[0], self._conn.total_changes)
+            if self._query is None or self._query[0] != version:
+                parks = [dict(zip(PARK_COLUMNS, r)) for r in self._conn.execute(_PARK_SELECT)]
+                counts = dict(self._conn.execute('SELECT park_id, COUNT(*) FROM visits GROUP BY park_id'))
+                self._query = (version, ParkIndexes(parks, counts))
+            return self._query[1]
+
+    def load(self, parks: Iterable[dict], visits: Iterable[dict]):
+        """Insert many rows in a single transaction."""
+        with self._lock, self._conn:
+            self._conn.executemany(_INSERT_PARK, (_park_values(r) for r in parks))
+            self._conn.executemany(_INSERT_VISIT, (_visit_values(r) for r in visits))
+
+    def dump(self) -> dict:
+        """Return the whole store in the data.json layout."""
+        return {
+            'parks': self._rows(_PARK_SELECT + ' ORDER BY rowid', (), PARK_COLUMNS),
+            'visits': self._rows(_VISIT_SELECT + ' ORDER BY rowid', (), VISIT_COLUMNS),
+        }
+
+
+def migrate_from_json(json_path, sqlite_path) -> tuple:
+    """Copy parks and visits from a data.json file into the SQLite database.
+
+    Existing rows with the same id are replaced, so re-running is safe.
+    Returns (parks copied, visits copied).
+    """
+    if snapshot.is_snapshot(json_path):
+        data = snapshot.load(json_path)
+    else:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    parks = data.get('parks', [])
+    visits = data.get('visits', [])
+    store = SqliteStore(sqlite_path)
+    try:
+        store.load(parks, visits)
+    finally:
+        store.close()
+    return len(parks), len(visits)
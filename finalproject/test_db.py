@@ -0,0 +1,288 @@
+import json
+import time
+
+import pytest
+
+from finalproject import db
+
+
+@pytest.fixture(params=['json', 'journal', 'sqlite'])
+def store(request, tmp_path, monkeypatch):
+    """Point the store at a temporary data.json / data.db for each backend."""
+    monkeypatch.setattr(db, 'DATA_PATH', tmp_path / 'data.json')
+    monkeypatch.setattr(db, 'SQLITE_PATH', tmp_path / 'data.db')
+    monkeypatch.setattr(db, 'STORE', request.param)
+    db._stores.clear()
+    db.init_db()
+    yield request.param
+    for s in db._stores.values():
+        if hasattr(s, 'close'):
+            s.close()
+    db._stores.clear()
+
+
+# Test adding, finding and updating parks on both backends
+def test_parks_roundtrip(store):
+    db.add_park(name="Zion", state="UT", lat=37.3, lon=-113.0)
+    p = db.add_park(name="Acadia", state="ME", notes="coast")
+    assert [x.name for x in db.list_parks()] == ["Acadia", "Zion"]
+    assert db.find_park_by_name("Acadia") == p
+    assert db.find_park_by_id(p.id).notes == "coast"
+    updated = db.update_park(p.id, notes="rocky coast", bogus=1)
+    assert updated.notes == "rocky coast"
+    assert db.update_park("missing", notes="x") is None
+
+
+# Test visits ordering, filtering and clearing on both backends
+def test_visits_roundtrip(store):
+    a = db.add_park(name="Arches")
+    b = db.add_park(name="Badlands")
+    v1 = db.add_visit(park_id=a.id, trail="Delicate Arch", party_size=2)
+    v2 = db.add_visit(park_id=b.id, end="2025-01-02")
+    assert [v.id for v in db.list_visits()] == [v2.id, v1.id]
+    assert db.list_visits(park_id=a.id) == [v1]
+    assert db.get_visited_park_ids() == {a.id, b.id}
+    db.clear_visits()
+    assert db.list_visits() == []
+    db.clear_parks()
+    assert db.list_parks() == []
+
+
+# Test the one-shot migration from data.json into SQLite
+def test_migrate_to_sqlite(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DATA_PATH', tmp_path / 'data.json')
+    monkeypatch.setattr(db, 'SQLITE_PATH', tmp_path / 'data.db')
+    monkeypatch.setattr(db, 'STORE', 'json')
+    db._stores.clear()
+    p = db.add_park(name="Yosemite", state="CA")
+    db.add_visit(park_id=p.id, party_size=4)
+    assert db.migrate_to_sqlite() == (1, 1)
+    assert db.migrate_to_sqlite() == (1, 1)  # idempotent
+
+    monkeypatch.setattr(db, 'STORE', 'sqlite')
+    assert db.find_park_by_name("Yosemite") == p
+    assert db.list_visits()[0].party_size == 4
+    out = tmp_path / 'export.json'
+    db.export_json(str(out))
+    assert json.loads(out.read_text())['parks'][0]['name'] == "Yosemite"
+    for s in db._stores.values():
+        if hasattr(s, 'close'):
+            s.close()
+    db._stores.clear()
+
+
+# Test bulk upserts add new parks, fill missing fields and skip the rest
+def test_upsert_parks(store):
+    p = db.add_park(name="Arches", state="UT")
+    counts = db.upsert_parks([
+        {'name': "Arches", 'lat': 38.7, 'lon': -109.6, 'source_id': 'arch'},
+        {'name': "Zion", 'state': "UT"},
+        {'name': "Zion", 'lat': 37.3},
+        {'name': "Arches", 'lat': 1.0},
+        {'name': None},
+    ])
+    assert counts == {'added': 1, 'updated': 2, 'skipped': 1}
+    arches = db.find_park_by_id(p.id)
+    assert (arches.lat, arches.source_id) == (38.7, 'arch')
+    assert db.find_park_by_name("Zion").lat == 37.3
+    assert len(db.list_parks()) == 2
+
+
+# Test that importing 10k parks is a single pass, not one rewrite per record
+def test_upsert_parks_10k_is_fast(store):
+    records = [{'name': f"Park {i}", 'state': "CA", 'lat': 1.0, 'lon': 2.0} for i in range(10_000)]
+    started = time.perf_counter()
+    assert db.upsert_parks(records)['added'] == 10_000
+    assert time.perf_counter() - started < 2.0
+    assert db.upsert_parks(records)['skipped'] == 10_000
+
+
+# Test that visits come back paired with their parks in one query
+def test_list_visits_with_parks(store):
+    a = db.add_park(name="Arches")
+    b = db.add_park(name="Badlands")
+    db.add_visit(park_id=a.id)
+    v2 = db.add_visit(park_id=b.id)
+    orphan = db.add_visit(park_id="gone")
+    pairs = db.list_visits_with_parks()
+    assert [(v.id, p.name if p else None) for v, p in pairs][:2] == [(orphan.id, None), (v2.id, "Badlands")]
+    assert [p.name for _, p in db.list_visits_with_parks(park_id=a.id)] == ["Arches"]
+    assert db.park_map() == {a.id: a, b.id: b}
+
+
+# Test that a session reads data.json once and writes it back on exit
+def test_session_caches_and_flushes(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DATA_PATH', tmp_path / 'data.json')
+    monkeypatch.setattr(db, 'STORE', 'json')
+    db.init_db()
+    reads = []
+    real_read = db._read_data
+    monkeypatch.setattr(db, '_read_data', lambda: reads.append(1) or real_read())
+    with db.session():
+        p = db.add_park(name="Acadia")
+        for _ in range(20):
+            assert db.find_park_by_name("Acadia") == p
+            db.list_parks()
+        db.add_visit(park_id=p.id)
+        assert json.loads(db.DATA_PATH.read_text())['parks'] == []  # not flushed yet
+    assert len(reads) == 1
+    assert db.find_park_by_name("Acadia") == p
+    assert len(db.list_visits()) == 1
+
+
+# Test that a session notices another writer and merges its own dirty records
+def test_session_merges_external_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DATA_PATH', tmp_path / 'data.json')
+    monkeypatch.setattr(db, 'STORE', 'json')
+    db.init_db()
+    with db.session() as s:
+        db.add_park(name="Ours")
+        # another process rewrites the file while we hold dirty changes
+        data = db.JsonStore().dump()
+        data['parks'].append({'id': 'theirs', 'name': "Theirs"})
+        db._write_data(data)
+        assert {p.name for p in db.list_parks()} == {"Ours", "Theirs"}
+        db.commit()
+        assert not s.dirty
+    assert {p.name for p in db.list_parks()} == {"Ours", "Theirs"}
+
+
+# Test that journal mode appends one line per change and replays it on load
+def test_journal_appends_and_replays(tmp_path, monkeypatch):
+    from finalproject import journal_store
+    monkeypatch.setattr(db, 'DATA_PATH', tmp_path / 'data.json')
+    monkeypatch.setattr(db, 'STORE', 'journal')
+    db._stores.clear()
+    db.init_db()
+    snapshot = db.DATA_PATH.read_text()
+    with db.session():
+        p = db.add_park(name="Acadia")
+        db.update_park(p.id, notes="coast")
+        db.add_visit(park_id=p.id)
+        assert not journal_store.journal_path().exists()  # buffered until commit
+    lines = journal_store.journal_path().read_text().splitlines()
+    assert [json.loads(line)['op'] for line in lines] == ['add_park', 'update_park', 'add_visit']
+    assert db.DATA_PATH.read_text() == snapshot  # no full rewrite
+
+    # a crash mid-append leaves a torn line; it is skipped on replay and fenced off
+    with open(journal_store.journal_path(), 'a') as f:
+        f.write('{"op":"add_park","row":{"id":"x"')
+    db._stores.clear()
+    assert db.find_park_by_id(p.id).notes == "coast"
+    assert len(db.list_visits()) == 1
+    db.add_park(name="Zion")
+    db._stores.clear()
+    assert [x.name for x in db.list_parks()] == ["Acadia", "Zion"]
+
+
+# Test that the journal is folded into data.json once it grows past the threshold
+def test_journal_compaction(tmp_path, monkeypatch):
+    from finalproject import journal_store
+    monkeypatch.setattr(db, 'DATA_PATH', tmp_path / 'data.json')
+    monkeypatch.setattr(db, 'STORE', 'journal')
+    monkeypatch.setattr(journal_store, 'COMPACT_MIN_OPS', 10)
+    db._stores.clear()
+    db.init_db()
+    p = db.add_park(name="Arches")
+    for _ in range(9):
+        db.add_visit(park_id=p.id)
+    assert journal_store.journal_path().stat().st_size == 0
+    assert len(json.loads(db.DATA_PATH.read_text())['visits']) == 9
+    db._stores.clear()
+    assert len(db.list_visits()) == 9
+
+
+# Test that models are slotted and round-trip through their row codec
+def test_model_row_codec():
+    from finalproject.models import VISIT_FIELDS, Park, Visit
+    p = Park.create(name="Zion", state="UT", lat=37.3)
+    v = Visit.create(park_id=p.id, party_size=3)
+    assert not hasattr(p, '__dict__') and not hasattr(v, '__dict__')
+    assert Park.from_row(p.to_row()) == p
+    assert Visit.from_row(v.to_row()) == v
+    assert tuple(v.to_row()) == VISIT_FIELDS
+    assert Visit.from_row({'id': 'x', 'park_id': 'y'}).party_size == 1
+
+
+# Test the columnar snapshot format as the data file and as an export
+def test_snapshot_format(tmp_path, monkeypatch):
+    from finalproject import snapshot
+    monkeypatch.setattr(db, 'DATA_PATH', tmp_path / 'data.json')
+    monkeypatch.setattr(db, 'STORE', 'json')
+    monkeypatch.setattr(db, 'DATA_FORMAT', 'snapshot')
+    db._stores.clear()
+    db.init_db()
+    a = db.add_park(name="Arches", lat=38.7, lon=-109)
+    b = db.add_park(name="Badlands")
+    v1 = db.add_visit(park_id=a.id, trail="Delicate Arch", party_size=2)
+    v2 = db.add_visit(park_id=a.id, notes="sunset")
+    db.add_visit(park_id=b.id)
+    assert snapshot.is_snapshot(db.DATA_PATH)
+    assert db.list_visits(park_id=a.id) == [v2, v1]
+    assert db.list_visits(park_id="missing") == []
+    assert db.get_visited_park_ids() == {a.id, b.id}
+    assert db.find_park_by_id(a.id) == a
+
+    with snapshot.SnapshotReader(db.DATA_PATH) as reader:
+        types = {c.name: c.type for c in reader.columns('visits')}
+        assert (types['park_id'], types['party_size'], types['created_at']) == ('str', 'i64', 'ts')
+        assert reader.column('visits', 'park_id').dictionary() == [a.id, b.id]
+
+    # a session answers per-park queries from the mapped columns without a full load
+    monkeypatch.setattr(db, '_read_data', lambda: pytest.fail("full load"))
+    with db.session():
+        park = db.find_park_by_name("Arches")
+        assert [v for v, _ in db.list_visits_with_parks(park_id=park.id)] == [v2, v1]
+    monkeypatch.undo()
+    monkeypatch.setattr(db, 'DATA_PATH', tmp_path / 'data.json')
+
+    out = tmp_path / 'export.snap'
+    db.export_json(str(out))
+    assert snapshot.load(out) == db.JsonStore().dump()
+    db.export_json(str(tmp_path / 'export.json'))
+    assert json.loads((tmp_path / 'export.json').read_text())['visits'][0]['trail'] == "Delicate Arch"
+
+
+# Test query_parks filters and paging, kept current as parks and visits change
+def test_query_parks(store):
+    with db.session():
+        zion = db.add_park(name="Zion", state="UT")
+        death = db.add_park(name="Death Valley", state="CA,NV")
+        db.add_park(name="Yosemite", state="CA")
+        db.add_park(name="yellowstone", state="WY, MT, ID")
+        assert [p.name for p in db.query_parks(state="nv,ut")] == ["Death Valley", "Zion"]
+        db.add_visit(park_id=death.id)
+        db.add_visit(park_id=death.id)
+        assert [p.name for p in db.query_parks(visited=True)] == ["Death Valley"]
+        assert db.visit_counts() == {death.id: 2}
+        assert [p.name for p in db.query_parks(state="CA", visited=False)] == ["Yosemite"]
+        assert [p.name for p in db.query_parks(prefix="Y")] == ["Yosemite", "yellowstone"]
+        assert [p.name for p in db.query_parks(state="MT", prefix="yel")] == ["yellowstone"]
+        db.update_park(zion.id, state="NV")
+        assert [p.name for p in db.query_parks(state="UT")] == []
+        assert [p.name for p in db.query_parks(state="NV")] == ["Death Valley", "Zion"]
+    names = [p.name for p in db.list_parks()]
+    assert [p.name for p in db.query_parks(limit=2, offset=1)] == names[1:3]
+    assert [p.name for p in db.query_parks(offset=10)] == []
+    assert db.find_park_by_name("YELLOWSTONE").name == "yellowstone"
+
+
+# Test typo-tolerant park lookups and "did you mean" suggestions
+def test_fuzzy_park_names(store):
+    db.add_park(name="Yellowstone National Park", state="WY", source_id="yell")
+    db.add_park(name="Grand Teton National Park", state="WY", source_id="grte")
+    db.add_park(name="Grand Canyon National Park", state="AZ", source_id="grca")
+    assert db.find_park_by_name("yelowstone", fuzzy=True).source_id == "yell"
+    assert db.find_park_by_name("Grnd Teton", fuzzy=True).source_id == "grte"
+    assert db.find_park_by_name("GRCA", fuzzy=True).source_id == "grca"
+    assert db.find_park_by_name("grand", fuzzy=True) is None  # ambiguous
+    assert db.find_park_by_name("yelowstone") is None  # exact (case-insensitive) by default
+    assert set(db.suggest_park_names("grand")) >= {"Grand Teton National Park", "Grand Canyon National Park"}
+    assert db.suggest_park_names("qqqq") == []
+    db.add_park(name="Zion National Park", state="UT")
+    assert db.find_park_by_name("zion", fuzzy=True).name == "Zion National Park"
+    with db.session():
+        db.add_park(name="Great Smoky Mountains National Park", state="TN")
+        assert db.find_park_by_name("grsm", fuzzy=True) is None  # builds the fuzzy index
+        db.upsert_parks([{"name": "Great Smoky Mountains National Park", "source_id": "grsm"}])
+        assert db.find_park_by_name("grsm", fuzzy=True).name == "Great Smoky Mountains National Park"
@@ -0,0 +1,44 @@
+import argparse
+
+import pytest
+
+from finalproject import db
+from finalproject import main as cli
+from finalproject.intents import AGENT_ROUTER, CHAT_ROUTER, Intent, IntentRouter
+
+
+# Test routing chat fallback messages on whole words, in table order
+def test_chat_router():
+    assert CHAT_ROUTER.route('hello there') == 'greeting'
+    assert CHAT_ROUTER.route('which state is Yellowstone in?') == 'yellowstone'  # "hi" inside "which" is not a greeting
+    assert CHAT_ROUTER.route('tell me about the GRAND canyon') == 'grand_canyon'
+    assert CHAT_ROUTER.route('planning a trip') == 'visit'
+    assert CHAT_ROUTER.route('what animals live there') == 'wildlife'
+    assert CHAT_ROUTER.route('hiking boots') == 'unknown'
+    with pytest.raises(ValueError):
+        IntentRouter({'a': 'a'}, [Intent('x', all_of=('b',))])
+
+
+# Test the agent intents and their parsers against a temporary store
+def test_agent_rules(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(db, 'DATA_PATH', tmp_path / 'data.json')
+    monkeypatch.setattr(db, 'STORE', 'json')
+    db._stores.clear()
+    db.init_db()
+    assert AGENT_ROUTER.route('find parks in CA') == 'find_parks'
+    assert AGENT_ROUTER.route('add visit to grand teton party 3') == 'add_visit'
+    assert AGENT_ROUTER.route('add park Zion UT') == 'add_park'
+    assert AGENT_ROUTER.route('list parks') == 'list_parks'
+    assert AGENT_ROUTER.route('planning a visit to Zion') == 'plan_visit'
+    assert AGENT_ROUTER.route('what is this') == 'unknown'
+
+    agent = argparse.Namespace(prompt=None, chat=False, use_llm=False)
+    for prompt in ('add park Grand Teton National Park WY', 'add visit to Grand Teton party 3',
+                   'plan visit to grand teton on 2025-07-10 for 2'):
+        cli.cmd_agent(argparse.Namespace(**dict(vars(agent), prompt=prompt)))
+    park = db.find_park_by_name('Grand Teton National Park')
+    assert park.state == 'WY'
+    visits = sorted(db.list_visits(), key=lambda v: v.party_size)
+    assert [v.party_size for v in visits] == [2, 3]
+    assert {v.park_id for v in visits} == {park.id}
+    assert 'Agent: added visit to Grand Teton (party 3)' in capsys.readouterr().out
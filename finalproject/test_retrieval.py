@@ -0,0 +1,24 @@
+from finalproject.retrieval import VectorIndex, park_text, terms
+
+
+# Test TF-IDF ranking, stopword-only queries and the .npz round trip
+def test_vector_index(tmp_path):
+    docs = [
+        ('yell', park_text({'name': 'Yellowstone', 'state': 'WY,MT'}, {'description': 'Old Faithful and other geysers.'})),
+        ('grca', park_text({'name': 'Grand Canyon', 'state': 'AZ'}, {'description': 'A mile-deep canyon of the Colorado River.'})),
+        ('brca', park_text({'name': 'Bryce Canyon', 'state': 'UT'})),
+        ('zion', park_text({'name': 'Zion', 'state': 'UT'})),
+    ]
+    index = VectorIndex.build(docs, stamp=[1, 2])
+    assert index.search('where are the geysers?', k=1)[0][0] == 'yell'
+    assert [i for i, _ in index.search('grand canyon hikes')][0] == 'grca'
+    assert {i for i, _ in index.search('parks in utah', k=5)} == {'brca', 'zion'}
+    assert index.search('what is there to do') == []
+    assert terms('Tell me about Zion') == ['zion']
+
+    path = tmp_path / 'vectors.npz'
+    index.save(path)
+    loaded = VectorIndex.load(path)
+    assert loaded.stamp == [1, 2] and loaded.ids == index.ids
+    assert loaded.search('colorado river') == index.search('colorado river')
+    assert VectorIndex.load(tmp_path / 'missing.npz') is None
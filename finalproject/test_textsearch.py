@@ -0,0 +1,54 @@
+from pathlib import Path
+
+from finalproject.textsearch import SearchIndex, tokenize
+
+ROOT = Path(__file__).resolve().parent
+# modules tasks3 vendors verbatim, as it cannot import finalproject
+VENDORED = ["textsearch.py", "files.py", "fuzzy.py"]
+
+
+def build():
+    return SearchIndex.build([
+        (1, "Plan Zion trip: hiking Angels Landing"),
+        (2, "Buy hiking boots and hiking socks"),
+        (3, "Renew park pass"),
+    ])
+
+
+# Test tokenization folds case and drops punctuation
+def test_tokenize():
+    assert tokenize("Zion's TRAIL, day-2") == ["zion", "s", "trail", "day", "2"]
+
+
+# Test AND matching, prefix matching on the last word and BM25 ordering
+def test_search_ranking():
+    index = build()
+    assert [d for d, _ in index.search("hiking")] == [2, 1]
+    assert [d for d, _ in index.search("HIKING zion")] == [1]
+    assert [d for d, _ in index.search("ren")] == [3]
+    assert index.search("ren", prefix=False) == []
+    assert index.search("hiking pass") == []
+    assert len(index.search("hik", limit=1)) == 1
+
+
+# Test incremental updates and a save/load round trip
+def test_update_and_persist(tmp_path):
+    index = build()
+    index.add(4, "Zion shuttle schedule")
+    index.add(3, "Renew annual pass")
+    index.remove(2)
+    assert {d for d, _ in index.search("zion")} == {1, 4}
+    assert index.search("boots") == []
+    index.stamp = [1, 2]
+    index.save(tmp_path / "idx.json")
+    loaded = SearchIndex.load(tmp_path / "idx.json")
+    assert loaded.stamp == [1, 2] and len(loaded) == 3
+    assert loaded.search("annual") == index.search("annual")
+    assert SearchIndex.load(tmp_path / "missing.json") is None
+
+
+# Test that the copies vendored into tasks3 match finalproject
+def test_tasks3_vendored_copies():
+    for name in VENDORED:
+        copy = ROOT.parent / "tasks3" / "src" / "tasks3" / name
+        assert copy.read_bytes() == (ROOT / name).read_bytes(), f"re-copy finalproject/{name} to {copy}"
@@ -0,0 +1,203 @@
+"""Small full-text search engine: inverted index with BM25 ranking.
+
+Text is tokenized into case-folded word tokens. Each term maps to a posting
+dict {doc id: term frequency}, so a query only touches the documents that
+contain its terms instead of re-reading every document. All query tokens must
+match (AND); the last one also matches as a prefix ("hik" finds "hiking")
+while the user is still typing, and results are ranked by BM25.
+
+`SearchIndex.save()`/`load()` persist the index as JSON next to the data it
+covers, together with a caller-supplied stamp of that data so a stale index
+is detected and rebuilt (see `finalproject.files.file_stamp`).
+
+tasks3 ships a verbatim copy of this module (and of files.py) because it is
+packaged on its own; test_textsearch.py fails if the copies drift apart.
+"""
+
+import bisect
+import heapq
+import math
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from .models import json_dumps, json_loads
+except ImportError:  # the verbatim copy vendored into tasks3, which has no models module
+    import json
+
+    def json_loads(data):
+        return json.loads(data)
+
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+TOKEN_RE = re.compile(r'\w+')
+
+# BM25 parameters (the usual defaults).
+K1 = 1.2
+B = 0.75
+
+# At most this many index terms are expanded for a prefix token.
+MAX_PREFIX_TERMS = 64
+
+FORMAT_VERSION = 1
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.casefold())
+
+
+class SearchIndex:
+    """Inverted index over documents identified by hashable, JSON-safe ids."""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict] = {}
+        self.lengths: Dict = {}
+        self.total_length = 0
+        self._terms = None  # sorted term list for prefix lookups, rebuilt lazily
+        self.stamp = None
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def add(self, doc_id, text: str):
+        """Index (or re-index) one document."""
+        if doc_id in self.lengths:
+            self.remove(doc_id)
+        tokens = tokenize(text)
+        counts: Dict[str, int] = {}
+        for t in tokens:
+            counts[t] = counts.get(t, 0) + 1
+        for t, n in counts.items():
+            posting = self.postings.get(t)
+            if posting is None:
+                posting = self.postings[t] = {}
+                if self._terms is not None:
+                    bisect.insort(self._terms, t)
+            posting[doc_id] = n
+        self.lengths[doc_id] = len(tokens)
+        self.total_length += len(tokens)
+
+    def remove(self, doc_id):
+        length = self.lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self.total_length -= length
+        for t in [t for t, posting in self.postings.items() if posting.pop(doc_id, None) is not None and not posting]:
+            del self.postings[t]
+            self._terms = None
+
+    def _expand(self, token: str, prefix: bool) -> List[str]:
+        if not prefix:
+            return [token] if token in self.postings else []
+        if self._terms is None:
+            self._terms = sorted(self.postings)
+        i = bisect.bisect_left(self._terms, token)
+        out = []
+        while i < len(self._terms) and self._terms[i].startswith(token) and len(out) < MAX_PREFIX_TERMS:
+            out.append(self._terms[i])
+            i += 1
+        return out
+
+    def search(self, query: str, limit: Optional[int] = None, prefix: bool = True) -> List[Tuple[object, float]]:
+        """Return [(doc id, score)] best first for documents matching every query token."""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or not self.lengths:
+            return []
+        groups = []
+        for k, token in enumerate(tokens):
+            terms = self._expand(token, prefix and k == len(tokens) - 1)
+            if not terms:
+                return []
+            groups.append(terms)
+
+        # candidates: docs matching the rarest token, filtered by the others
+        def docs_of(terms):
+            if len(terms) == 1:
+                return self.postings[terms[0]].keys()
+            docs = set()
+            for t in terms:
+                docs.update(self.postings[t])
+            return docs
+
+        n_docs = len(self.lengths)
+        lengths = self.lengths
+        # BM25 term weight: idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * len / avg))
+        c1 = K1 * (1.0 - B)
+        c2 = K1 * B / ((self.total_length / n_docs) or 1.0)
+        if len(groups) == 1 and len(groups[0]) == 1:
+            # single term: every posting entry is a hit, score them in one pass
+            posting = self.postings[groups[0][0]]
+            df = len(posting)
+            w = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5)) * (K1 + 1.0)
+            scores = {doc: w * tf / (tf + c1 + c2 * lengths[doc]) for doc, tf in posting.items()}
+            groups = []
+        else:
+            groups.sort(key=lambda terms: sum(len(self.postings[t]) for t in terms))
+            candidates = set(docs_of(groups[0]))
+            for terms in groups[1:]:
+                if not candidates:
+                    return []
+                candidates &= docs_of(terms)
+            scores = dict.fromkeys(candidates, 0.0)
+        for terms in groups:
+            for t in terms:
+                posting = self.postings[t]
+                df = len(posting)
+                w = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5)) * (K1 + 1.0)
+                if df <= len(scores):
+                    for doc, tf in posting.items():
+                        if doc in scores:
+                            scores[doc] += w * tf / (tf + c1 + c2 * lengths[doc])
+                else:
+                    for doc in scores:
+                        tf = posting.get(doc)
+                        if tf:
+                            scores[doc] += w * tf / (tf + c1 + c2 * lengths[doc])
+        if limit is None:
+            return sorted(scores.items(), key=lambda kv: -kv[1])
+        return heapq.nlargest(limit, scores.items(), key=lambda kv: kv[1])
+
+    # persistence
+
+    def to_dict(self) -> dict:
+        return {
+            'version': FORMAT_VERSION,
+            'stamp': self.stamp,
+            'lengths': [[d, n] for d, n in self.lengths.items()],
+            'postings': {t: [[d, n] for d, n in posting.items()] for t, posting in self.postings.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'SearchIndex':
+        if data.get('version') != FORMAT_VERSION:
+            raise ValueError('unsupported search index version')
+        index = cls()
+        index.stamp = data.get('stamp')
+        index.lengths = {d: n for d, n in data['lengths']}
+        index.total_length = sum(index.lengths.values())
+        index.postings = {t: {d: n for d, n in posting} for t, posting in data['postings'].items()}
+        return index
+
+    def save(self, path):
+        tmp = str(path) + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(json_dumps(self.to_dict()))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path) -> Optional['SearchIndex']:
+        """Load a saved index, or None if it is missing or unreadable."""
+        try:
+            with open(path, 'rb') as f:
+                return cls.from_dict(json_loads(f.read()))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    @classmethod
+    def build(cls, docs: Iterable[Tuple[object, str]]) -> 'SearchIndex':
+        index = cls()
+        for doc_id, text in docs:
+            index.add(doc_id, text)
+        return index
@@ -0,0 +1,180 @@
+"""Load test: sync Flask views vs. the async app (asgi.py) against slow stub upstreams.
+
+Usage:
+  python loadtest_async.py
+  python loadtest_async.py --requests 500 --delay 0.5 --threads 32
+
+Starts local stub NPS and OpenAI-compatible servers that answer after
+`--delay` seconds, then fires `--requests` concurrent requests at
+/api/park/<id> and /api/chat:
+
+  sync   the Flask app on a pool of `--threads` worker threads (what a
+         threaded WSGI server gives each process)
+  async  the ASGI app in-process on one event loop
+
+Both modes go through the real upstream clients; the NPS cache is disabled so
+every request reaches the stub. Reported: wall time, requests/s, latency
+percentiles (from the moment the whole batch is submitted, so time spent
+queued for a worker counts) and the peak number of threads in the process.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import asgi
+import main
+from cache import TTLCache
+from finalproject import outbound
+
+
+def start_stub(delay):
+    """HTTP/1.1 keep-alive stub for NPS and chat completions on its own event loop; returns base URL."""
+    nps_body = json.dumps({'data': [{'parkCode': 'stub', 'fullName': 'Stub National Park', 'description': 'stub'}]})
+    chat_body = json.dumps({
+        'id': 'stub', 'object': 'chat.completion', 'created': 0, 'model': 'stub',
+        'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': 'stub answer'}}],
+    })
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b'\r\n\r\n')
+                length = 0
+                for line in head.split(b'\r\n')[1:]:
+                    name, _, value = line.partition(b':')
+                    if name.strip().lower() == b'content-length':
+                        length = int(value)
+                if length:
+                    await reader.readexactly(length)
+                await asyncio.sleep(delay)
+                body = (chat_body if head.startswith(b'POST') else nps_body).encode('utf-8')
+                writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                             b'Content-Length: %d\r\n\r\n%s' % (len(body), body))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    ready = threading.Event()
+    address = []
+
+    def run():
+        loop = asyncio.new_event_loop()
+        server = loop.run_until_complete(asyncio.start_server(handle, '127.0.0.1', 0, backlog=4096))
+        address.append(server.sockets[0].getsockname()[1])
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    return f'http://127.0.0.1:{address[0]}'
+
+
+class ThreadPeak:
+    """Sample the process thread count in the background and keep the maximum."""
+
+    def __init__(self):
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(0.01):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def report(label, wall, latencies, errors, peak):
+    latencies.sort()
+    n = len(latencies)
+    p50 = latencies[n // 2] if n else 0.0
+    p95 = latencies[min(n - 1, int(n * 0.95))] if n else 0.0
+    print(f"{label:<14} {wall:>7.2f} {n / wall:>8.1f} {p50 * 1000:>8.0f} {p95 * 1000:>8.0f} {errors:>6} {peak:>8}")
+
+
+def run_sync(requests_list, threads):
+    client = main.app.test_client()
+
+    def one(req):
+        method, path, body = req
+        if method == 'GET':
+            resp = client.get(path)
+        else:
+            resp = client.post(path, json=body)
+        return time.perf_counter() - t0, resp.status_code
+
+    with ThreadPeak() as peak:
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(one, requests_list))
+        wall = time.perf_counter() - t0
+    return wall, [r[0] for r in results], sum(r[1] != 200 for r in results), peak.peak
+
+
+def run_async(requests_list, concurrency):
+    app = asgi.AsyncApp(nps_concurrency=concurrency, llm_concurrency=concurrency, queue_timeout=600)
+
+    async def one(req):
+        method, path, body = req
+        status, _, _ = await asgi.call(app, method, path, json.dumps(body).encode('utf-8') if body else b'',
+                                       headers=[('Content-Type', 'application/json')])
+        return time.perf_counter() - t0, status
+
+    async def run_all():
+        try:
+            return await asyncio.gather(*(one(r) for r in requests_list))
+        finally:
+            await outbound.aclose()
+
+    with ThreadPeak() as peak:
+        t0 = time.perf_counter()
+        results = asyncio.run(run_all())
+        wall = time.perf_counter() - t0
+    app.pool.shutdown()
+    return wall, [r[0] for r in results], sum(r[1] != 200 for r in results), peak.peak
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=300, help='requests per endpoint and mode')
+    parser.add_argument('--delay', type=float, default=0.5, help='stub upstream latency in seconds')
+    parser.add_argument('--threads', type=int, default=32, help='worker threads for the sync mode')
+    parser.add_argument('--concurrency', type=int, default=1000, help='upstream slots for the async mode')
+    args = parser.parse_args(argv)
+
+    base = start_stub(args.delay)
+    os.environ['NPS_API_KEY'] = 'stub'
+    os.environ['OPENAI_API_KEY'] = 'stub'
+    os.environ['OPENAI_BASE_URL'] = base + '/v1'
+    os.environ['OUTBOUND_POOL_PER_HOST'] = str(args.threads)
+    main.NPS_API_URL = base + '/api/v1/parks'
+    main.NPS_CACHE = TTLCache(ttl=0, negative_ttl=0, stale_ttl=0)  # every request goes upstream
+    main.ENRICHMENT = main.LazyCatalog(os.devnull + '.missing')  # no offline snapshot
+
+    park_ids = [p['id'] for p in main.load_parks()]
+    workloads = {
+        'park': [('GET', f'/api/park/{park_ids[i % len(park_ids)]}', None) for i in range(args.requests)],
+        'chat': [('POST', '/api/chat', {'message': f'tell me about park {i}'}) for i in range(args.requests)],
+    }
+    print(f"{args.requests} concurrent requests per run, upstream delay {args.delay}s")
+    print(f"{'run':<14} {'wall s':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>6} {'threads':>8}")
+    for name, reqs in workloads.items():
+        report(f'{name} sync', *run_sync(reqs, args.threads))
+        report(f'{name} async', *run_async(reqs, args.concurrency))
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -1,18 +1,62 @@
-from flask import Flask, render_template, jsonify, send_from_directory, request
+from flask import Flask, render_template, jsonify, send_from_directory, request, Response, stream_with_context
 import os
 import json
+import math
 import requests
 from urllib.parse import urlencode
-import openai
+import re
+import signal
+import threading
+import time
+
+import nps
+from cache import PromptCache, TTLCache, normalize_prompt
+from catalog import LazyCatalog, ParksCatalog
+from finalproject import geo, outbound, retrieval, route
+from finalproject.files import file_stamp
+from finalproject.intents import CHAT_ROUTER
+from metrics import LatencyStats
 
 app = Flask(__name__, static_folder='static', template_folder='templates')
 
 DATA_PATH = os.path.join(os.path.dirname(__file__), 'data', 'parks.json')
 
+# Process-wide catalog: parsed once, re-read only when parks.json changes.
+CATALOG = ParksCatalog(DATA_PATH)
+
+NPS_API_URL = nps.NPS_API_URL
+
+# Offline NPS details built by enrich_parks.py, looked up by id through an
+# offset index (data/nps_enrichment.json.idx) rather than loaded whole.
+ENRICHMENT_PATH = os.path.join(os.path.dirname(__file__), 'data', 'nps_enrichment.json')
+ENRICHMENT = LazyCatalog(ENRICHMENT_PATH)
+
+# NPS lookups keyed by park id. "No match" answers are cached for a shorter time,
+# and expired entries are served stale while a background refresh runs.
+NPS_CACHE = TTLCache(
+	maxsize=int(os.environ.get('NPS_CACHE_SIZE', '512')),
+	ttl=float(os.environ.get('NPS_CACHE_TTL', '21600')),
+	negative_ttl=float(os.environ.get('NPS_CACHE_NEGATIVE_TTL', '600')),
+)
+
+# Browsers may reuse /api/parks for this long before revalidating with the ETag.
+PARKS_MAX_AGE = int(os.environ.get('PARKS_MAX_AGE', '300'))
+
 
 def load_parks():
-	with open(DATA_PATH, 'r', encoding='utf-8') as f:
-		return json.load(f)
+	return CATALOG.parks()
+
+
+def _reload_on_sighup(signum, frame):
+	CATALOG.reload()
+
+
+if hasattr(signal, 'SIGHUP'):
+	try:
+		signal.signal(signal.SIGHUP, _reload_on_sighup)
+	except ValueError:
+		# signal handlers can only be installed from the main thread
+		pass
 
 
 @app.route('/')
@@ -21,9 +65,191 @@ def index():
 	return render_template('index.html', parks=parks)
 
 
+def cached_json_response(payload, max_age):
+	"""Build a response from an `encode_json` payload.
+
+	Picks the best pre-compressed body for the client's Accept-Encoding and
+	answers If-None-Match with 304 Not Modified. Each coding gets its own
+	strong ETag so caches never mix up compressed and plain bodies.
+	"""
+	coding = 'identity'
+	for candidate in ('br', 'gzip'):
+		if candidate in payload and request.accept_encodings[candidate]:
+			coding = candidate
+			break
+	etag = payload['etag'] if coding == 'identity' else f"{payload['etag']}-{coding}"
+
+	if any(request.if_none_match.contains_weak(tag) for tag in (payload['etag'], etag)):
+		resp = Response(status=304)
+	else:
+		resp = Response(payload[coding], mimetype='application/json')
+		if coding != 'identity':
+			resp.headers['Content-Encoding'] = coding
+	resp.set_etag(etag)
+	resp.headers['Cache-Control'] = f'public, max-age={max_age}'
+	resp.headers['Vary'] = 'Accept-Encoding'
+	return resp
+
+
 @app.route('/api/parks')
 def api_parks():
-	return jsonify(load_parks())
+	return cached_json_response(CATALOG.encoded(), PARKS_MAX_AGE)
+
+
+def fetch_nps_details(park, nps_key):
+	"""Live NPS lookup; returns the useful fields or None if nothing matched."""
+	return nps.search_park(park, nps_key, url=NPS_API_URL)
+
+
+def snapshot_details(park_id):
+	"""Return NPS details from the offline enrichment snapshot, or None."""
+	try:
+		record = ENRICHMENT.get(park_id)
+	except OSError:
+		# no snapshot built yet; see enrich_parks.py
+		return None
+	return record.get('nps') if record else None
+
+
+NO_NPS_KEY_NOTE = 'No NPS API key configured. Set NPS_API_KEY environment variable to get photos and extended info.'
+
+
+def park_detail_payload(park, details):
+	"""The /api/park response body for `park` with NPS `details` (None if nothing matched)."""
+	result = {'park': park}
+	if details:
+		result['nps'] = details
+	else:
+		result['note'] = 'No matching NPS entry found for this park.'
+	result['bestTimeToGo'] = best_time_to_go(park)
+	return result
+
+
+def best_time_to_go(park):
+	"""Compute a simple heuristic for "best time to go" based on latitude."""
+	lat = park.get('lat')
+	best = 'Spring or Fall'
+	try:
+		if lat is not None:
+			lat = float(lat)
+			if lat >= 55:
+				best = 'Summer (short season)'
+			elif lat <= 32:
+				best = 'Fall or Winter (milder)'
+			else:
+				best = 'Spring or Fall'
+	except Exception:
+		pass
+	return best
+
+
+def parse_id_list(value):
+	"""Split a comma-separated query parameter into a set of ids."""
+	return {v.strip() for v in (value or '').split(',') if v.strip()}
+
+
+@app.route('/api/nearest')
+def api_nearest():
+	"""Return the k parks nearest to lat/lon, closest first.
+
+	Query params: lat, lon, k (default 1, max 100). With unvisited=1 the parks
+	listed in visited=<id,id,...> are skipped (visited state lives in the browser).
+	"""
+	try:
+		lat = float(request.args['lat'])
+		lon = float(request.args['lon'])
+		k = int(request.args.get('k', 1))
+	except (KeyError, ValueError):
+		return jsonify({'error': 'lat and lon are required numbers; k must be an integer'}), 400
+	if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+		return jsonify({'error': 'lat/lon out of range'}), 400
+	k = max(1, min(k, 100))
+	exclude = None
+	if request.args.get('unvisited', '').lower() in ('1', 'true', 'yes'):
+		exclude = parse_id_list(request.args.get('visited'))
+
+	index = CATALOG.derived('nearest_index', geo.ParkIndex)
+	results = index.nearest(lat, lon, k=k, exclude=exclude)
+	return jsonify({'results': [{'park': park, 'distance_km': round(d, 3)} for park, d in results]})
+
+
+# Upper bound on query points per /api/parks/within request.
+MAX_WITHIN_POINTS = 1000
+
+
+@app.route('/api/parks/within', methods=['GET', 'POST'])
+def api_parks_within():
+	"""Return the parks within radius_km of each query point, closest first.
+
+	GET takes lat, lon and radius_km. POST takes JSON
+	{"points": [[lat, lon], ...], "radius_km": R} for batch queries.
+	"""
+	try:
+		if request.method == 'POST':
+			body = request.get_json(silent=True) or {}
+			if not isinstance(body, dict):
+				return jsonify({'error': 'expected a JSON object'}), 400
+			points = [(float(lat), float(lon)) for lat, lon in body.get('points', [])]
+			radius = float(body['radius_km'])
+		else:
+			points = [(float(request.args['lat']), float(request.args['lon']))]
+			radius = float(request.args['radius_km'])
+	except (KeyError, TypeError, ValueError):
+		return jsonify({'error': 'expected lat/lon points and a numeric radius_km'}), 400
+	if len(points) > MAX_WITHIN_POINTS:
+		return jsonify({'error': f'at most {MAX_WITHIN_POINTS} points per request'}), 400
+	if not all(-90 <= lat <= 90 and -180 <= lon <= 180 for lat, lon in points):
+		return jsonify({'error': 'lat/lon out of range'}), 400
+	if not (math.isfinite(radius) and radius >= 0):
+		return jsonify({'error': 'radius_km must be a finite, non-negative number'}), 400
+
+	coords = CATALOG.derived('coordinate_array', geo.CoordinateArray)
+	results = coords.within(points, radius)
+	return jsonify({'results': [
+		{'point': list(point), 'parks': [{'park': park, 'distance_km': round(d, 3)} for park, d in hits]}
+		for point, hits in zip(points, results)
+	]})
+
+
+# Longest improvement time a client may request for /api/route, in seconds.
+MAX_ROUTE_BUDGET = 5.0
+
+
+@app.route('/api/route', methods=['POST'])
+def api_route():
+	"""Plan a road trip through parks.
+
+	JSON body: {"start": [lat, lon], "park_ids": [...] (default: all parks),
+	"visited": [...] (skipped), "time_budget": seconds (default 0.5)}.
+	"""
+	body = request.get_json(silent=True) or {}
+	if not isinstance(body, dict):
+		return jsonify({'error': 'expected a JSON object'}), 400
+	try:
+		lat, lon = (float(v) for v in body['start'])
+		budget = min(float(body.get('time_budget', 0.5)), MAX_ROUTE_BUDGET)
+	except (KeyError, TypeError, ValueError):
+		return jsonify({'error': 'start must be [lat, lon] and time_budget a number'}), 400
+	if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+		return jsonify({'error': 'lat/lon out of range'}), 400
+	for field in ('park_ids', 'visited'):
+		ids = body.get(field)
+		if ids is not None and not (isinstance(ids, list) and all(isinstance(i, str) for i in ids)):
+			return jsonify({'error': f'{field} must be a list of park ids'}), 400
+
+	matrix = CATALOG.derived('distance_matrix', route.DistanceMatrix)
+	park_ids = body.get('park_ids')
+	indices = matrix.index_of(park_ids) if park_ids else range(len(matrix))
+	visited = set(body.get('visited') or [])
+	indices = [i for i in indices if matrix.parks[i].get('id') not in visited]
+
+	plan = route.plan_route(matrix, (lat, lon), indices, time_budget=budget)
+	return jsonify({
+		'stops': [{'park': p, 'leg_km': round(leg, 3)} for p, leg in zip(plan.stops, plan.legs)],
+		'total_km': round(plan.total_km, 3),
+		'initial_km': round(plan.initial_km, 3),
+		'elapsed_s': round(plan.elapsed_s, 4),
+	})
 
 
 @app.route('/api/park/<park_id>')
@@ -31,116 +257,354 @@ def api_park_detail(park_id):
 	"""Return richer details for a park. If NPS_API_KEY is set in environment, try to fetch NPS data and images.
 
 	The server will not store your API key; set it in your environment as NPS_API_KEY.
+	Details come from the enrichment snapshot when available; live NPS answers are
+	cached per park (see NPS_CACHE) so repeat opens skip the network.
 	"""
-	parks = load_parks()
-	park = next((p for p in parks if p.get('id') == park_id), None)
+	park = CATALOG.get(park_id)
 	if not park:
 		return jsonify({'error': 'park not found'}), 404
 
+	details = snapshot_details(park_id)
+	if details:
+		return jsonify(park_detail_payload(park, details))
+
 	nps_key = os.environ.get('NPS_API_KEY')
 	if not nps_key:
 		# Return basic info and a helpful message
-		return jsonify({
-			'park': park,
-			'note': 'No NPS API key configured. Set NPS_API_KEY environment variable to get photos and extended info.'
-		})
+		return jsonify({'park': park, 'note': NO_NPS_KEY_NOTE})
 
 	try:
-		# Query the NPS parks endpoint by park name. Note: park JSON ids here may not be NPS park codes,
-		# so we search by name and pick the best match.
-		params = {'q': park.get('name', ''), 'limit': 50, 'api_key': nps_key}
-		resp = requests.get('https://developer.nps.gov/api/v1/parks', params=params, timeout=8)
-		resp.raise_for_status()
-		data = resp.json().get('data', [])
-
-		# Try to find a close match by fullName or name containing the park name
-		match = None
-		name_lower = park.get('name', '').lower()
-		for item in data:
-			if name_lower in (item.get('fullName','') or '').lower() or name_lower in (item.get('name','') or '').lower():
-				match = item
-				break
-		if not match and data:
-			match = data[0]
-
-		result = {'park': park}
-		if match:
-			# pick only useful fields to return
-			result['nps'] = {
-				'fullName': match.get('fullName'),
-				'description': match.get('description'),
-				'directionsInfo': match.get('directionsInfo'),
-				'url': match.get('url'),
-				'images': match.get('images', [])
-			}
-		else:
-			result['note'] = 'No matching NPS entry found for this park.'
-
-		# Compute a simple heuristic for "best time to go" based on latitude
-		lat = park.get('lat')
-		best = 'Spring or Fall'
-		try:
-			if lat is not None:
-				lat = float(lat)
-				if lat >= 55:
-					best = 'Summer (short season)'
-				elif lat <= 32:
-					best = 'Fall or Winter (milder)'
-				else:
-					best = 'Spring or Fall'
-		except Exception:
-			pass
-		result['bestTimeToGo'] = best
-
-		return jsonify(result)
+		details = NPS_CACHE.get_or_load(park_id, lambda: fetch_nps_details(park, nps_key))
 	except requests.RequestException as e:
 		return jsonify({'error': 'failed to fetch NPS data', 'detail': str(e)}), 502
 
+	return jsonify(park_detail_payload(park, details))
+
+
+@app.route('/api/admin/reload', methods=['POST'])
+def api_admin_reload():
+	"""Force the parks catalog to re-read data/parks.json.
+
+	If ADMIN_TOKEN is set the request must send it in the X-Admin-Token header,
+	otherwise only requests from localhost are accepted.
+	"""
+	token = os.environ.get('ADMIN_TOKEN')
+	if token:
+		if request.headers.get('X-Admin-Token') != token:
+			return jsonify({'error': 'forbidden'}), 403
+	elif request.remote_addr not in ('127.0.0.1', '::1'):
+		return jsonify({'error': 'forbidden'}), 403
+	version = CATALOG.reload()
+	return jsonify({'reloaded': True, 'version': version, 'count': len(CATALOG.parks())})
+
+
+@app.route('/api/metrics')
+def api_metrics():
+	"""Cache counters for sizing and monitoring."""
+	return jsonify({
+		'catalog_version': CATALOG.version,
+		'nps_cache': NPS_CACHE.stats(),
+		'chat_cache': CHAT_CACHE.stats(),
+		'chat_latency': CHAT_LATENCY.stats(),
+		'outbound': outbound.stats(),
+	})
+
+
+# Chat completion settings, shared with the async app in asgi.py.
+LLM_MODEL = os.environ.get('LLM_MODEL', 'gpt-3.5-turbo')
+LLM_MAX_TOKENS = 200
+# Replies grounded in retrieved park facts need less room.
+LLM_GROUNDED_MAX_TOKENS = int(os.environ.get('LLM_GROUNDED_MAX_TOKENS', '120'))
+LLM_SYSTEM_PROMPT = "You are a helpful AI assistant for a US National Parks tracker website. Answer questions about national parks, provide facts, and help users plan visits. Keep responses concise and friendly."
+
+
+# LLM answers keyed by normalized prompt; concurrent identical questions share
+# one upstream call. Set CHAT_CACHE_PATH to keep answers across restarts.
+CHAT_CACHE = PromptCache(
+	maxsize=int(os.environ.get('CHAT_CACHE_SIZE', '1024')),
+	ttl=float(os.environ.get('CHAT_CACHE_TTL', '86400')),
+	path=os.environ.get('CHAT_CACHE_PATH') or None,
+)
+
+
+# Chat response timings by path: "fallback", "local" (answered from the park
+# index), "llm" (whole JSON reply, cache hits included), "cached" (cache hits and
+# joined in-flight calls on the streaming path), and for streamed replies
+# "stream_first_byte" (headers sent), "stream_first_token" (first text the user
+# sees) and "stream_total".
+CHAT_LATENCY = LatencyStats()
+
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+
+def chat_cache_key(user_message, max_tokens=LLM_MAX_TOKENS):
+	"""Cache key for a chat message; includes the model settings so a config change starts fresh."""
+	return f'{LLM_MODEL}:{max_tokens}:{normalize_prompt(user_message)}'
+
+
+def llm_messages(user_message, context=()):
+	"""Chat messages for the LLM; `context` lines of park facts are added as a second system message."""
+	messages = [{"role": "system", "content": LLM_SYSTEM_PROMPT}]
+	if context:
+		facts = '\n'.join(f'- {line}' for line in context)
+		messages.append({"role": "system", "content": f"Relevant parks from this site's catalog:\n{facts}"})
+	messages.append({"role": "user", "content": user_message})
+	return messages
+
+
+# Offline TF-IDF index over parks.json plus the NPS enrichment descriptions
+# (finalproject.retrieval), rebuilt when either file changes. A question that
+# just names one park is answered from it directly; otherwise the top matches
+# go to the LLM as a few lines of context. Set RETRIEVAL_INDEX_PATH to keep the
+# built index on disk across restarts.
+RETRIEVAL_INDEX_PATH = os.environ.get('RETRIEVAL_INDEX_PATH') or None
+RETRIEVAL_CONTEXT_SCORE = float(os.environ.get('RETRIEVAL_CONTEXT_SCORE', '0.15'))
+RETRIEVAL_ANSWER_SCORE = float(os.environ.get('RETRIEVAL_ANSWER_SCORE', '0.3'))
+RETRIEVAL_MARGIN = 0.05
+
+_retrieval_lock = threading.Lock()
+_retrieval = None
+
+
+def retrieval_index():
+	"""The park vector index for the current data files, or None without NumPy."""
+	global _retrieval
+	if not retrieval.available():
+		return None
+	stamp = (file_stamp(DATA_PATH) or [0, 0]) + (file_stamp(ENRICHMENT_PATH) or [0, 0])
+	index = _retrieval
+	if index is not None and index.stamp == stamp:
+		return index
+	with _retrieval_lock:
+		if _retrieval is not None and _retrieval.stamp == stamp:
+			return _retrieval
+		index = retrieval.VectorIndex.load(RETRIEVAL_INDEX_PATH) if RETRIEVAL_INDEX_PATH else None
+		if index is None or index.stamp != stamp:
+			docs = [(p['id'], retrieval.park_text(p, snapshot_details(p['id']))) for p in load_parks() if p.get('id')]
+			index = retrieval.VectorIndex.build(docs, stamp=stamp)
+			if RETRIEVAL_INDEX_PATH:
+				try:
+					index.save(RETRIEVAL_INDEX_PATH)
+				except OSError:
+					pass  # read-only location; rebuild next start
+		_retrieval = index
+	return index
+
+
+def retrieve(user_message, k=3):
+	"""Parks matching a chat message as [(park, score)], best first."""
+	index = retrieval_index()
+	if index is None:
+		return []
+	hits = []
+	for park_id, score in index.search(user_message, k):
+		park = CATALOG.get(park_id)
+		if park:
+			hits.append((park, score))
+	return hits
+
+
+def park_summary(park, sentences=2):
+	"""A short plain-text description of `park`: name, states, NPS description and best time to go."""
+	details = snapshot_details(park['id']) or {}
+	states = ', '.join(retrieval.STATE_NAMES.get(s.strip().upper(), s.strip()) for s in (park.get('state') or '').split(',') if s.strip())
+	name = details.get('fullName') or park.get('name')
+	text = f"{name} is in {states}." if states else f"{name}."
+	description = ' '.join(re.split(r'(?<=[.!?])\s+', (details.get('description') or '').strip())[:sentences])
+	if description:
+		text += ' ' + description
+	return f"{text} Best time to go: {best_time_to_go(park)}."
+
+
+def confident_park(hits):
+	"""The top hit's park if it scores well and clearly beats the runner-up, else None."""
+	if not hits or hits[0][1] < RETRIEVAL_ANSWER_SCORE:
+		return None
+	if len(hits) > 1 and hits[0][1] - hits[1][1] < RETRIEVAL_MARGIN:
+		return None
+	return hits[0][0]
+
+
+def local_answer(user_message, hits):
+	"""The top park's summary when the message asks about just that park, else None.
+
+	Besides a confident hit, the park's name and states must cover every
+	meaningful word of the question, so "tell me about yellowstone" is
+	answered here but "wildlife in yellowstone" goes to the LLM.
+	"""
+	park = confident_park(hits)
+	if park is None or not set(retrieval.terms(user_message)) <= set(retrieval.terms(retrieval.park_text(park))):
+		return None
+	return park_summary(park)
+
+
+def llm_request(user_message):
+	"""Ground a chat message in the park index.
+
+	Returns (answer, messages, max_tokens): `answer` is a complete local reply
+	when no LLM call is needed; otherwise `messages` carry the matching parks
+	as context and `max_tokens` is reduced when there is any.
+	"""
+	hits = retrieve(user_message)
+	answer = local_answer(user_message, hits)
+	if answer:
+		return answer, None, None
+	context = [park_summary(park, sentences=1) for park, score in hits if score >= RETRIEVAL_CONTEXT_SCORE]
+	return None, llm_messages(user_message, context), LLM_GROUNDED_MAX_TOKENS if context else LLM_MAX_TOKENS
+
+
+# Canned answers for the intents of finalproject.intents.CHAT_ROUTER.
+CHAT_REPLIES = {
+	'greeting': "Hi! I'm here to help with questions about US National Parks. What would you like to know?",
+	'yellowstone': "Yellowstone National Park is the first national park in the world, famous for its geysers, hot springs, and wildlife like bison and bears.",
+	'grand_canyon': "The Grand Canyon is a massive gorge carved by the Colorado River, offering stunning views and hiking opportunities.",
+	'visit': "To visit a national park, check the official website for entry fees, reservations, and best times to go. Many require permits for activities.",
+	'location': "National parks are located across the US. For example, Yellowstone is in Wyoming, Montana, and Idaho.",
+	'wildlife': "Parks are home to diverse wildlife: bears, wolves, elk, birds, and more. Always keep a safe distance and store food properly.",
+	'unknown': "I'm a simple assistant for national parks. Try asking about specific parks, planning visits, or general facts!",
+}
+
+
+def chat_fallback(user_message):
+	"""Simple rule-based responses for common questions (used when no LLM is available).
+
+	Questions that mainly name one park are answered from the park index;
+	everything else gets the canned reply for its intent.
+	"""
+	intent = CHAT_ROUTER.route(user_message)
+	if intent != 'greeting':
+		park = confident_park(retrieve(user_message, k=2))
+		if park is not None:
+			return park_summary(park)
+	return CHAT_REPLIES[intent]
+
+
+def sse_event(payload, event=None):
+	"""Format one server-sent event carrying a JSON payload."""
+	head = f'event: {event}\n' if event else ''
+	return f'{head}data: {json.dumps(payload)}\n\n'
+
+
+def chunk_text(chunk):
+	"""Text delta of one streamed chat completion chunk, or ''."""
+	return (chunk.choices[0].delta.content or '') if chunk.choices else ''
+
+
+def wants_stream():
+	return 'text/event-stream' in request.headers.get('Accept', '') or request.args.get('stream') == '1'
+
+
+def stream_chat(stream, user_message, key, flight, started):
+	"""Relay an OpenAI completion stream as server-sent events.
+
+	Emits {"delta": text} events as tokens arrive and a final "done" event with
+	the whole {"response"}. The complete answer then lands `flight` (from
+	CHAT_CACHE.claim): it is cached, and requests that joined the flight get it.
+	"""
+	CHAT_LATENCY.record('stream_first_byte', time.perf_counter() - started)
+	parts = []
+	try:
+		for chunk in stream:
+			delta = chunk_text(chunk)
+			if delta:
+				if not parts:
+					CHAT_LATENCY.record('stream_first_token', time.perf_counter() - started)
+				parts.append(delta)
+				yield sse_event({'delta': delta})
+	except Exception as e:
+		stream.close()
+		CHAT_CACHE.land(key, flight, error=e)
+		if parts:
+			yield sse_event({'error': 'the AI response was interrupted', 'detail': str(e)}, event='error')
+			return
+		parts = [chat_fallback(user_message)]  # nothing shown yet: answer from the rules instead
+	except GeneratorExit:
+		stream.close()  # the client went away mid-stream
+		CHAT_CACHE.land(key, flight, error=RuntimeError('the client disconnected mid-stream'))
+		raise
+	else:
+		CHAT_CACHE.land(key, flight, ''.join(parts).strip(), load_s=time.perf_counter() - started)
+	CHAT_LATENCY.record('stream_total', time.perf_counter() - started)
+	yield sse_event({'response': ''.join(parts).strip()}, event='done')
+
 
 @app.route('/api/chat', methods=['POST'])
 def api_chat():
-	"""Handle chat messages with AI assistant for park questions."""
+	"""Handle chat messages with AI assistant for park questions.
+
+	Clients that send `Accept: text/event-stream` (or ?stream=1) get LLM answers
+	streamed token by token as server-sent events (see `stream_chat`). Cached
+	and rule-based answers are always returned at once as plain JSON, as are
+	answers to a question that is already being streamed to someone else:
+	those requests wait for that call instead of making their own.
+	"""
+	started = time.perf_counter()
 	data = request.get_json()
+	if not isinstance(data, dict):
+		return jsonify({'error': 'expected a JSON object'}), 400
 	user_message = data.get('message', '').lower()
 	if not user_message:
 		return jsonify({'response': 'Please ask a question about national parks!'})
 
-	openai_key = os.environ.get('OPENAI_API_KEY')
-	if openai_key:
-		try:
-			client = openai.OpenAI(api_key=openai_key)
+	# shared client: reuses pooled connections across requests
+	client = outbound.llm_client()
+	if client is not None:
+		answer, messages, max_tokens = llm_request(user_message)
+		if answer is not None:
+			CHAT_LATENCY.record('local', time.perf_counter() - started)
+			return jsonify({'response': answer})
+		key = chat_cache_key(user_message, max_tokens)
+		if wants_stream():
+			cached, flight, leader = CHAT_CACHE.claim(key)
+			if not leader:
+				try:
+					answer = cached if flight is None else flight.result()
+				except Exception:
+					return fallback_reply(user_message, started)
+				CHAT_LATENCY.record('cached', time.perf_counter() - started)
+				return jsonify({'response': answer})
+			try:
+				stream = client.chat.completions.create(
+					model=LLM_MODEL,
+					messages=messages,
+					max_tokens=max_tokens,
+					stream=True
+				)
+			except Exception as e:
+				CHAT_CACHE.land(key, flight, error=e)
+				return fallback_reply(user_message, started)
+			response = Response(stream_with_context(stream_chat(stream, user_message, key, flight, started)),
+				mimetype='text/event-stream', headers=SSE_HEADERS)
+			# never leave joined requests waiting, even if the stream is not consumed
+			response.call_on_close(lambda: CHAT_CACHE.land(key, flight, error=RuntimeError('the stream was not completed')))
+			return response
+
+		def ask():
 			response = client.chat.completions.create(
-				model="gpt-3.5-turbo",
-				messages=[
-					{"role": "system", "content": "You are a helpful AI assistant for a US National Parks tracker website. Answer questions about national parks, provide facts, and help users plan visits. Keep responses concise and friendly."},
-					{"role": "user", "content": user_message}
-				],
-				max_tokens=200
+				model=LLM_MODEL,
+				messages=messages,
+				max_tokens=max_tokens
 			)
-			ai_response = response.choices[0].message.content.strip()
+			return response.choices[0].message.content.strip()
+
+		try:
+			ai_response = CHAT_CACHE.get_or_call(key, ask)
+			CHAT_LATENCY.record('llm', time.perf_counter() - started)
 			return jsonify({'response': ai_response})
 		except Exception as e:
 			pass  # Fall back to simple response
 
-	# Fallback: Simple rule-based responses for common questions
-	if 'hello' in user_message or 'hi' in user_message:
-		response = "Hi! I'm here to help with questions about US National Parks. What would you like to know?"
-	elif 'yellowstone' in user_message:
-		response = "Yellowstone National Park is the first national park in the world, famous for its geysers, hot springs, and wildlife like bison and bears."
-	elif 'grand canyon' in user_message:
-		response = "The Grand Canyon is a massive gorge carved by the Colorado River, offering stunning views and hiking opportunities."
-	elif 'visit' in user_message or 'plan' in user_message:
-		response = "To visit a national park, check the official website for entry fees, reservations, and best times to go. Many require permits for activities."
-	elif 'state' in user_message or 'location' in user_message:
-		response = "National parks are located across the US. For example, Yellowstone is in Wyoming, Montana, and Idaho."
-	elif 'animal' in user_message or 'wildlife' in user_message:
-		response = "Parks are home to diverse wildlife: bears, wolves, elk, birds, and more. Always keep a safe distance and store food properly."
-	else:
-		response = "I'm a simple assistant for national parks. Try asking about specific parks, planning visits, or general facts!"
+	return fallback_reply(user_message, started)
+
 
+def fallback_reply(user_message, started):
+	"""JSON response with the rule-based answer."""
+	response = chat_fallback(user_message)
+	CHAT_LATENCY.record('fallback', time.perf_counter() - started)
 	return jsonify({'response': response})
 
 
 if __name__ == '__main__':
-	# For local quick dev. In production use a WSGI server.
+	# For local quick dev. In production use a WSGI server, or an ASGI server
+	# with asgi.py for async NPS/OpenAI calls.
 	app.run(host='0.0.0.0', port=5000, debug=True)
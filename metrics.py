@@ -0,0 +1,40 @@
+"""Thread-safe latency summaries for /api/metrics.
+
+`LatencyStats.record(name, seconds)` keeps a running count and mean per name
+plus the most recent `window` samples, from which p50/p95 are computed when
+the stats are read.
+"""
+
+import threading
+from collections import deque
+
+
+class LatencyStats:
+    def __init__(self, window=1000):
+        self.window = window
+        self._lock = threading.Lock()
+        self._series = {}  # name -> [count, total seconds, max seconds, deque of recent samples]
+
+    def record(self, name, seconds):
+        with self._lock:
+            series = self._series.get(name)
+            if series is None:
+                series = self._series[name] = [0, 0.0, 0.0, deque(maxlen=self.window)]
+            series[0] += 1
+            series[1] += seconds
+            series[2] = max(series[2], seconds)
+            series[3].append(seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            snapshot = {name: (count, total, peak, sorted(recent)) for name, (count, total, peak, recent) in self._series.items()}
+        return {
+            name: {
+                'count': count,
+                'avg_ms': round(total / count * 1000, 2),
+                'p50_ms': round(recent[len(recent) // 2] * 1000, 2),
+                'p95_ms': round(recent[min(len(recent) - 1, int(len(recent) * 0.95))] * 1000, 2),
+                'max_ms': round(peak * 1000, 2),
+            }
+            for name, (count, total, peak, recent) in snapshot.items()
+        }
@@ -0,0 +1,111 @@
+"""Helpers for talking to the National Park Service API.
+
+Shared by the Flask app (live lookups) and `enrich_parks.py` (bulk snapshot).
+Requests go through the pooled session in `finalproject.outbound`.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from finalproject import outbound
+from finalproject.fuzzy import NameIndex
+
+NPS_API_URL = os.environ.get('NPS_API_URL', 'https://developer.nps.gov/api/v1/parks')
+
+
+def summarize(item):
+    """Pick only the fields the frontend uses from an NPS park record."""
+    return {
+        'fullName': item.get('fullName'),
+        'description': item.get('description'),
+        'directionsInfo': item.get('directionsInfo'),
+        'url': item.get('url'),
+        'images': item.get('images', [])
+    }
+
+
+def item_index(items):
+    """Fuzzy index over NPS records by full name, short name and park code (values are list positions)."""
+    return NameIndex(([item.get('fullName') or '', item.get('name') or '', item.get('parkCode') or ''], i)
+                     for i, item in enumerate(items))
+
+
+def name_match(park, items, index=None):
+    """The NPS record whose name best matches `park['name']`, or None if none clearly does."""
+    index = index if index is not None else item_index(items)
+    pos = index.resolve(park.get('name') or '')
+    return items[pos] if pos is not None else None
+
+
+def pick_match(park, data, fallback_first=True):
+    """Choose the NPS record for `park` from search results: park code, then name, then (optionally) the first."""
+    match = next((item for item in data if item.get('parkCode') == park.get('id')), None)
+    if not match:
+        match = name_match(park, data)
+    if not match and data and fallback_first:
+        match = data[0]
+    return match
+
+
+def search_park(park, nps_key, url=NPS_API_URL, timeout=8, fallback_first=True):
+    """Look up one park on the NPS API and return `summarize(match)`, or None if nothing matched.
+
+    Park ids in data/parks.json are usually NPS park codes, but we search by name
+    and pick the best match so hand-added parks work too. With `fallback_first`
+    the first search result is used when nothing matches by code or name.
+    Raises requests.RequestException when the NPS API cannot be reached.
+    """
+    params = {'q': park.get('name', ''), 'limit': 50, 'api_key': nps_key}
+    resp = outbound.get(url, params=params, timeout=timeout)
+    resp.raise_for_status()
+    match = pick_match(park, resp.json().get('data', []), fallback_first)
+    return summarize(match) if match else None
+
+
+async def search_park_async(park, nps_key, url=NPS_API_URL, timeout=8, fallback_first=True):
+    """`search_park` on the event loop through the shared async client (see asgi.py).
+
+    Raises httpx.HTTPError when the NPS API cannot be reached.
+    """
+    params = {'q': park.get('name', ''), 'limit': 50, 'api_key': nps_key}
+    resp = await outbound.async_http().get(url, params=params, timeout=timeout)
+    resp.raise_for_status()
+    match = pick_match(park, resp.json().get('data', []), fallback_first)
+    return summarize(match) if match else None
+
+
+def fetch_all_parks(nps_key, url=NPS_API_URL, page_size=100, workers=4, timeout=30):
+    """Download every NPS park record using paged requests on a bounded thread pool."""
+    def fetch_page(start):
+        params = {'start': start, 'limit': page_size, 'api_key': nps_key}
+        resp = outbound.get(url, params=params, timeout=timeout)
+        resp.raise_for_status()
+        return resp.json()
+
+    first = fetch_page(0)
+    items = list(first.get('data', []))
+    total = int(first.get('total') or len(items))
+    starts = range(page_size, total, page_size)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for page in pool.map(fetch_page, starts):
+            items.extend(page.get('data', []))
+    return items
+
+
+def match_parks(parks, items):
+    """Match our parks to NPS records once: by park code first, then by fuzzy name.
+
+    Returns {park id: summarized NPS record}; parks without a match are left out.
+    """
+    by_code = {item.get('parkCode'): item for item in items if item.get('parkCode')}
+    index = None
+    matched = {}
+    for park in parks:
+        item = by_code.get(park.get('id'))
+        if item is None:
+            if index is None:
+                index = item_index(items)
+            item = name_match(park, items, index)
+        if item is not None:
+            matched[park['id']] = summarize(item)
+    return matched
@@ -166,28 +166,28 @@ function updateNearestInfo(lat=null, lon=null){
 }
 
 function calcNearest(lat, lon){
-  const parks = window.PARKS || [];
-  if (!parks.length) return;
-  let nearest = null, nearestDist = Infinity;
-  let nearestUnvisited = null, nearestUnvisitedDist = Infinity;
+  // The server answers from a spatial index, so we don't scan the catalog here.
   const visited = loadVisited();
-
-  parks.forEach(p => {
-    const d = haversine(lat, lon, p.lat, p.lon);
-    if (d < nearestDist){ nearestDist = d; nearest = p; }
-    if (!visited.includes(p.id) && d < nearestUnvisitedDist){ nearestUnvisitedDist = d; nearestUnvisited = p; }
-  });
-
-  document.getElementById('nearest-park').textContent = nearest ? `${nearest.name} (${nearestDist.toFixed(1)} km)` : '—';
-  document.getElementById('nearest-unvisited').textContent = nearestUnvisited ? `${nearestUnvisited.name} (${nearestUnvisitedDist.toFixed(1)} km)` : '—';
-
-  // highlight nearest on the map with a popup and camera
-  if (nearest){
-    new maplibregl.Popup({closeOnClick:false})
-      .setLngLat([nearest.lon, nearest.lat])
-      .setHTML(`<strong>${nearest.name}</strong><div>${nearest.state}</div><div>${nearestDist.toFixed(1)} km away</div>`)
-      .addTo(map);
-  }
+  const base = `/api/nearest?lat=${lat}&lon=${lon}&k=1`;
+  const first = data => (data.results && data.results.length) ? data.results[0] : null;
+  Promise.all([
+    fetch(base).then(r => r.json()),
+    fetch(`${base}&unvisited=1&visited=${encodeURIComponent(visited.join(','))}`).then(r => r.json())
+  ]).then(([all, unvisited]) => {
+    const nearest = first(all), nearestUnvisited = first(unvisited);
+
+    document.getElementById('nearest-park').textContent = nearest ? `${nearest.park.name} (${nearest.distance_km.toFixed(1)} km)` : '—';
+    document.getElementById('nearest-unvisited').textContent = nearestUnvisited ? `${nearestUnvisited.park.name} (${nearestUnvisited.distance_km.toFixed(1)} km)` : '—';
+
+    // highlight nearest on the map with a popup and camera
+    if (nearest){
+      const p = nearest.park;
+      new maplibregl.Popup({closeOnClick:false})
+        .setLngLat([p.lon, p.lat])
+        .setHTML(`<strong>${p.name}</strong><div>${p.state}</div><div>${nearest.distance_km.toFixed(1)} km away</div>`)
+        .addTo(map);
+    }
+  }).catch(() => {});
 }
 
 // Modal helpers
@@ -266,28 +266,77 @@ function sendChatMessage() {
   addChatMessage('You', message);
   input.value = '';
 
+  // Ask for a server-sent events stream; cached and rule-based answers still come back as JSON.
   fetch('/api/chat', {
     method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
+    headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream, application/json' },
     body: JSON.stringify({ message })
   })
-  .then(r => r.json())
-  .then(data => {
-    if (data.response) {
-      addChatMessage('AI Assistant', data.response);
-    } else if (data.error) {
-      addChatMessage('AI Assistant', 'Error: ' + data.error);
+  .then(r => {
+    if ((r.headers.get('Content-Type') || '').startsWith('text/event-stream') && r.body) {
+      return readChatStream(r.body, addChatMessage('AI Assistant', ''));
     }
+    return r.json().then(data => {
+      if (data.response) {
+        addChatMessage('AI Assistant', data.response);
+      } else if (data.error) {
+        addChatMessage('AI Assistant', 'Error: ' + data.error);
+      }
+    });
   })
   .catch(err => {
     addChatMessage('AI Assistant', 'Failed to get response: ' + err.message);
   });
 }
 
+// Render a streamed reply into `textEl` as the {"delta"} events arrive.
+function readChatStream(body, textEl) {
+  const reader = body.getReader();
+  const decoder = new TextDecoder();
+  const messages = document.getElementById('chat-messages');
+  let buffer = '';
+  let text = '';
+
+  function handleEvent(block) {
+    let event = 'message';
+    let data = '';
+    block.split('\n').forEach(line => {
+      if (line.startsWith('event:')) event = line.slice(6).trim();
+      else if (line.startsWith('data:')) data += line.slice(5).trim();
+    });
+    if (!data) return;
+    const payload = JSON.parse(data);
+    if (event === 'done') {
+      text = payload.response;
+    } else if (event === 'error') {
+      text += ' [' + payload.error + ']';
+    } else if (payload.delta) {
+      text += payload.delta;
+    }
+    textEl.textContent = text;
+    messages.scrollTop = messages.scrollHeight;
+  }
+
+  function pump() {
+    return reader.read().then(({ value, done }) => {
+      if (done) return;
+      buffer += decoder.decode(value, { stream: true });
+      let end;
+      while ((end = buffer.indexOf('\n\n')) !== -1) {
+        handleEvent(buffer.slice(0, end));
+        buffer = buffer.slice(end + 2);
+      }
+      return pump();
+    });
+  }
+  return pump();
+}
+
 function addChatMessage(sender, text) {
   const messages = document.getElementById('chat-messages');
   const msgDiv = document.createElement('div');
-  msgDiv.innerHTML = `<strong>${sender}:</strong> ${text}`;
+  msgDiv.innerHTML = `<strong>${sender}:</strong> <span>${text}</span>`;
   messages.appendChild(msgDiv);
   messages.scrollTop = messages.scrollHeight;
+  return msgDiv.querySelector('span');
 }
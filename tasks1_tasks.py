@@ -6,7 +6,15 @@ import os
 import datetime
 import textwrap
 
+try:
+    from finalproject.files import file_stamp
+    from finalproject.textsearch import SearchIndex
+except ImportError:
+    # standalone copy without finalproject: fall back to a plain substring scan
+    SearchIndex = None
+
 DATA_FILE = os.path.join(os.path.dirname(__file__), "tasks.json")
+INDEX_FILE = os.path.join(os.path.dirname(__file__), "tasks.index.json")
 
 def load_tasks():
     if not os.path.exists(DATA_FILE):
@@ -21,6 +29,28 @@ def save_tasks(tasks):
     with open(DATA_FILE, "w", encoding="utf-8") as f:
         json.dump(tasks, f, indent=2, ensure_ascii=False)
 
+def task_text(t):
+    return " ".join([
+        str(t.get("title", "")),
+        str(t.get("description", "")),
+        " ".join(t.get("tags", [])) if t.get("tags") else "",
+    ])
+
+def load_index(tasks):
+    """Return the search index for tasks.json, rebuilding it if it is missing or stale."""
+    index = SearchIndex.load(INDEX_FILE)
+    if index is None or index.stamp != file_stamp(DATA_FILE):
+        index = SearchIndex.build((t.get("id"), task_text(t)) for t in tasks)
+        save_index(index)
+    return index
+
+def save_index(index):
+    index.stamp = file_stamp(DATA_FILE)
+    try:
+        index.save(INDEX_FILE)
+    except OSError:
+        pass  # searching still works from the in-memory index
+
 def next_id(tasks):
     if not tasks:
         return 1
@@ -28,6 +58,7 @@ def next_id(tasks):
 
 def add_task(title, description, tags):
     tasks = load_tasks()
+    index = load_index(tasks) if SearchIndex is not None else None
     task = {
         "id": next_id(tasks),
         "title": title,
@@ -38,6 +69,9 @@ def add_task(title, description, tags):
     }
     tasks.append(task)
     save_tasks(tasks)
+    if index is not None:
+        index.add(task["id"], task_text(task))
+        save_index(index)
     print(f"Added task #{task['id']}: {task['title']}")
 
 def list_tasks():
@@ -50,17 +84,14 @@ def list_tasks():
         print(f"#{t.get('id')} {'[x]' if t.get('completed') else '[ ]'} {t.get('title')}\n  tags: {tags}\n  created: {t.get('created_at')}\n  desc: {textwrap.shorten(t.get('description',''), width=120)}\n")
 
 def search_tasks(query):
-    q = query.lower()
     tasks = load_tasks()
-    results = []
-    for t in tasks:
-        hay = " ".join([
-            str(t.get("title", "")),
-            str(t.get("description", "")),
-            " ".join(t.get("tags", [])) if t.get("tags") else "",
-        ]).lower()
-        if q in hay:
-            results.append(t)
+    if SearchIndex is not None:
+        # every word must match (the last one as a prefix); best BM25 matches first
+        by_id = {t.get("id"): t for t in tasks}
+        results = [by_id[doc] for doc, _ in load_index(tasks).search(query) if doc in by_id]
+    else:
+        q = query.lower()
+        results = [t for t in tasks if q in task_text(t).lower()]
     if not results:
         print("No matching tasks.")
         return
@@ -2,7 +2,13 @@ import json
 import os
 import random
 
+from .files import file_stamp
+from .fuzzy import NameIndex
+from .textsearch import SearchIndex
+
 DATA_FILE = "parks.json"
+# Keyword index over park names and notes, kept in step with DATA_FILE
+INDEX_FILE = "parks.index.json"
 
 # Valid US state codes
 STATE_CODES = {
@@ -51,33 +57,57 @@ USA_MAP = [
     "                             `~'"
 ]
 
+def park_text(park):
+    return " ".join([park["name"]] + park["notes"])
+
+
 class ParkTracker:
     def __init__(self):
         self.parks = []
+        self._search = None  # (key, SearchIndex) over park names and notes
+        self._names = None  # (parks list, count, NameIndex) over park names
+        self._revision = 0
+        self._saved = None  # (key, stamp of DATA_FILE) while self.parks matches the file
         self.load_data()
 
+    def _key(self):
+        return (id(self.parks), len(self.parks), self._revision)
+
     def load_data(self):
         if os.path.exists(DATA_FILE):
             with open(DATA_FILE, "r") as f:
                 self.parks = json.load(f)
+            self._saved = (self._key(), file_stamp(DATA_FILE))
         else:
             self.parks = []
 
     def save_data(self):
         with open(DATA_FILE, "w") as f:
             json.dump(self.parks, f, indent=4)
+        self._saved = (self._key(), file_stamp(DATA_FILE))
+        if self._search is not None and self._search[0] == self._saved[0]:
+            self._save_index(self._search[1])
+
+    def _save_index(self, index):
+        index.stamp = self._saved[1]
+        try:
+            index.save(INDEX_FILE)
+        except OSError:
+            pass  # searching still works from the in-memory index
 
     def add_park(self, name, state):
         state = state.lower()
         if state not in STATE_CODES:
             print(f"Invalid state code: {state}. Try again.")
             return
+        index = self._current_index()
         self.parks.append({
             "name": name,
             "state": state,
             "visited": False,
             "notes": []
         })
+        self._reindex(index, len(self.parks) - 1)
         self.save_data()
         print(f"Added {name} in {state.upper()}")
 
@@ -89,23 +119,43 @@ class ParkTracker:
             status = "✅ Visited" if park["visited"] else "🟠 Not Visited"
             print(f"{i}. {park['name']} ({park['state'].upper()}) - {status}")
 
-    def mark_visited(self, name):
+    def find_park(self, name):
         for park in self.parks:
             if park["name"].lower() == name.lower():
-                park["visited"] = True
-                self.save_data()
-                print(f"{name} marked as visited!")
-                return
-        print(f"No park named {name} found.")
+                return park
+        i = self._name_index().resolve(name)
+        return self.parks[i] if i is not None else None
+
+    def _name_index(self):
+        """Trigram index of park names: built once per parks list, extended as parks are appended."""
+        if self._names is None or self._names[0] is not self.parks or self._names[1] > len(self.parks):
+            self._names = (self.parks, 0, NameIndex())
+        parks, count, index = self._names
+        for i in range(count, len(parks)):
+            index.add([parks[i]["name"]], i)
+        self._names = (parks, len(parks), index)
+        return index
+
+    def mark_visited(self, name):
+        park = self.find_park(name)
+        if park is None:
+            print(f"No park named {name} found.")
+            return
+        park["visited"] = True
+        self.save_data()
+        print(f"{park['name']} marked as visited!")
 
     def add_note(self, name, note):
-        for park in self.parks:
-            if park["name"].lower() == name.lower():
-                park["notes"].append(note)
-                self.save_data()
-                print(f"Added note to {name}")
-                return
-        print(f"No park named {name} found.")
+        park = self.find_park(name)
+        if park is None:
+            print(f"No park named {name} found.")
+            return
+        index = self._current_index()
+        park["notes"].append(note)
+        self._revision += 1
+        self._reindex(index, next(i for i, p in enumerate(self.parks) if p is park))
+        self.save_data()
+        print(f"Added note to {park['name']}")
 
     def ai_suggest(self, keyword=None):
         if not self.parks:
@@ -114,7 +164,7 @@ class ParkTracker:
 
         unvisited = [p for p in self.parks if not p["visited"]]
         if keyword:
-            unvisited = [p for p in unvisited if keyword.lower() in p["name"].lower() or any(keyword.lower() in n.lower() for n in p["notes"])]
+            unvisited = [p for p in self.search(keyword) if not p["visited"]]
 
         if not unvisited:
             print("AI: No suggestions found for that keyword.")
@@ -123,6 +173,36 @@ class ParkTracker:
         choice = random.choice(unvisited)
         print(f"AI: You should check out {choice['name']} in {choice['state'].upper()} next!")
 
+    def search(self, query):
+        """Parks whose name or notes match `query`, best first."""
+        return [self.parks[i] for i, _ in self._search_index().search(query)]
+
+    def _current_index(self):
+        """The search index if it is up to date with self.parks, else None."""
+        if self._search is not None and self._search[0] == self._key():
+            return self._search[1]
+        return None
+
+    def _reindex(self, index, i):
+        """Update an index that was current before park `i` changed."""
+        if index is not None:
+            index.add(i, park_text(self.parks[i]))
+            self._search = (self._key(), index)
+
+    def _search_index(self):
+        """The index for self.parks: in memory, loaded from INDEX_FILE, or rebuilt and saved."""
+        index = self._current_index()
+        if index is not None:
+            return index
+        synced = self._saved is not None and self._saved[0] == self._key()
+        index = SearchIndex.load(INDEX_FILE) if synced else None
+        if index is None or index.stamp != self._saved[1]:
+            index = SearchIndex.build((i, park_text(p)) for i, p in enumerate(self.parks))
+            if synced:
+                self._save_index(index)
+        self._search = (self._key(), index)
+        return index
+
     def draw_map(self):
         # Make a mutable copy of ASCII map
         map_grid = [list(line) for line in USA_MAP]
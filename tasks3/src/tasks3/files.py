@@ -0,0 +1,13 @@
+"""File helpers shared by the caches and indexes built over data files."""
+
+import os
+from typing import Optional
+
+
+def file_stamp(path) -> Optional[list]:
+    """[mtime_ns, size] of `path`, stored with saved indexes to detect a stale one; None if missing."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
@@ -0,0 +1,143 @@
+"""Fuzzy name resolution over park names and NPS park codes.
+
+`NameIndex` is built once over (keys, value) entries, e.g. a park's name and
+its park code. Keys are normalized (case-folded, accents and punctuation
+removed) and also stored without generic designation words, so "Zion" and
+"zion np" both reach "Zion National Park". Lookups:
+
+1. an exact normalized key wins outright;
+2. otherwise the trigram index yields the few entries sharing the most
+   trigrams with the query, and only those are ranked by edit-distance
+   similarity (with credit for word-prefix matches such as "yellow").
+
+`resolve()` returns a value only when the best match is good enough and
+clearly ahead of the runner-up; `suggest()` lists ranked candidates for
+"did you mean" messages.
+
+tasks3 ships a verbatim copy of this module; test_textsearch.py fails if the
+copies drift apart.
+"""
+
+import re
+import unicodedata
+from collections import Counter
+from typing import Hashable, Iterable, List, Optional, Sequence, Tuple
+
+# Words that describe the kind of unit rather than which one it is.
+DESIGNATION_WORDS = frozenset(
+    'national park parks preserve monument memorial historic historical site sites '
+    'recreation area seashore lakeshore river riverway parkway trail battlefield '
+    'military the and of np nm nhp nhs nra'.split()
+)
+
+# Entries re-ranked by edit distance per query (best trigram overlap first).
+CANDIDATES = 30
+
+# Minimum similarity for resolve(), and how far ahead of the runner-up it must be.
+CUTOFF = 0.75
+MARGIN = 0.05
+
+_NON_WORD = re.compile(r'[^\w]+')
+
+
+def normalize(text: str) -> str:
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return _NON_WORD.sub(' ', text.casefold()).replace('_', ' ').strip()
+
+
+def _variants(key: str) -> List[str]:
+    norm = normalize(key)
+    if not norm:
+        return []
+    core = ' '.join(w for w in norm.split() if w not in DESIGNATION_WORDS)
+    return [norm, core] if core and core != norm else [norm]
+
+
+def trigrams(text: str) -> set:
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance (insert, delete, substitute)."""
+    if len(a) < len(b):
+        a, b = b, a
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+
+def similarity(query: str, key: str) -> float:
+    """1.0 for equal strings down to 0.0; word-prefix matches score at least 0.9."""
+    if query == key:
+        return 1.0
+    score = 1.0 - edit_distance(query, key) / max(len(query), len(key))
+    q_words, k_words = query.split(), key.split()
+    if len(q_words) <= len(k_words) and all(kw.startswith(qw) for qw, kw in zip(q_words, k_words)):
+        score = max(score, 0.9)
+    return score
+
+
+class NameIndex:
+    """Trigram index of normalized keys -> values, ranked by edit distance."""
+
+    def __init__(self, entries: Iterable[Tuple[Sequence[str], Hashable]] = ()):
+        self.keys: List[str] = []        # normalized key strings
+        self.owners: List[int] = []      # key position -> value position
+        self.values: list = []
+        self.exact = {}                  # normalized key -> value position (first wins)
+        self.grams = {}                  # trigram -> set of key positions
+        for keys, value in entries:
+            self.add(keys, value)
+
+    def __len__(self):
+        return len(self.values)
+
+    def add(self, keys: Sequence[str], value):
+        owner = len(self.values)
+        self.values.append(value)
+        for key in keys:
+            for variant in _variants(key):
+                self.exact.setdefault(variant, owner)
+                pos = len(self.keys)
+                self.keys.append(variant)
+                self.owners.append(owner)
+                for g in trigrams(variant):
+                    self.grams.setdefault(g, set()).add(pos)
+
+    def suggest(self, query: str, limit: int = 5) -> List[Tuple[object, float]]:
+        """Return up to `limit` (value, similarity) pairs, best first."""
+        norm = normalize(query)
+        if not norm:
+            return []
+        core = _variants(query)[-1]
+        shared = Counter()
+        for g in trigrams(norm) | trigrams(core):
+            for pos in self.grams.get(g, ()):
+                shared[pos] += 1
+        best = {}
+        for pos, _ in shared.most_common(CANDIDATES):
+            key = self.keys[pos]
+            score = max(similarity(norm, key), similarity(core, key))
+            owner = self.owners[pos]
+            if score > best.get(owner, -1.0):
+                best[owner] = score
+        for variant in (norm, core):
+            if variant in self.exact:
+                best[self.exact[variant]] = 1.0
+        ranked = sorted(best.items(), key=lambda kv: (-kv[1], kv[0]))[:limit]
+        return [(self.values[owner], score) for owner, score in ranked]
+
+    def resolve(self, query: str, cutoff: float = CUTOFF) -> Optional[object]:
+        """Return the value clearly matching `query`, or None if no match or it is ambiguous."""
+        ranked = self.suggest(query, limit=2)
+        if not ranked or ranked[0][1] < cutoff:
+            return None
+        if ranked[0][1] < 1.0 and len(ranked) > 1 and ranked[0][1] - ranked[1][1] < MARGIN:
+            return None
+        return ranked[0][0]
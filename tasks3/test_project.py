@@ -1,10 +1,11 @@
-from tasks3 import ParkTracker
+from tasks3 import ParkTracker, SearchIndex
 import os
 
 # Helper to clean up after tests
 def cleanup():
-    if os.path.exists("parks.json"):
-        os.remove("parks.json")
+    for path in ("parks.json", "parks.index.json"):
+        if os.path.exists(path):
+            os.remove(path)
 
 # Test adding a park
 def test_add_park():
@@ -39,3 +40,54 @@ def test_add_note():
     assert "Beautiful place" in tracker.parks[0]["notes"]
     cleanup()
 
+
+# Test keyword suggestions search park names and notes
+def test_ai_suggest_keyword(capsys):
+    tracker = ParkTracker()
+    tracker.parks = [
+        {"name": "Park D", "state": "UT", "visited": False, "notes": ["Great hiking trails"]},
+        {"name": "Park E", "state": "CA", "visited": False, "notes": []},
+    ]
+    tracker.ai_suggest("hiking")
+    captured = capsys.readouterr()
+    assert "Park D" in captured.out
+    cleanup()
+
+# Test that the search index follows added parks and notes and is reused from disk
+def test_search_index_persisted(monkeypatch):
+    cleanup()
+    tracker = ParkTracker()
+    tracker.add_park("Zion", "UT")
+    assert tracker.search("zion") == [tracker.parks[0]]  # builds and saves the index
+    tracker.add_park("Arches", "UT")
+    tracker.add_note("Arches", "Great hiking at Delicate Arch")
+    assert [p["name"] for p in tracker.search("hik")] == ["Arches"]
+    assert os.path.exists("parks.index.json")
+
+    def no_rebuild(docs):
+        raise AssertionError("index should be loaded from parks.index.json")
+    monkeypatch.setattr(SearchIndex, "build", no_rebuild)
+    reloaded = ParkTracker()
+    assert [p["name"] for p in reloaded.search("delicate arch")] == ["Arches"]
+    assert reloaded.search("zion") == [reloaded.parks[0]]
+    cleanup()
+
+# Test marking a park visited through a misspelled name, and refusing ambiguous ones
+def test_mark_visited_fuzzy(capsys):
+    tracker = ParkTracker()
+    tracker.parks = [
+        {"name": "Yellowstone National Park", "state": "WY", "visited": False, "notes": []},
+        {"name": "Grand Teton National Park", "state": "WY", "visited": False, "notes": []},
+        {"name": "Grand Canyon National Park", "state": "AZ", "visited": False, "notes": []},
+    ]
+    tracker.mark_visited("yelowstone")
+    assert tracker.parks[0]["visited"] is True
+    assert "Yellowstone National Park marked as visited!" in capsys.readouterr().out
+    tracker.mark_visited("grand")
+    assert not tracker.parks[1]["visited"] and not tracker.parks[2]["visited"]
+    assert "No park named grand found." in capsys.readouterr().out
+    index = tracker._name_index()
+    tracker.add_park("Zion National Park", "UT")
+    assert tracker.find_park("zion natonal park")["name"] == "Zion National Park"
+    assert tracker._name_index() is index  # extended, not rebuilt
+    cleanup()
@@ -0,0 +1,104 @@
+"""Measure batch summarization throughput against a local mock endpoint.
+
+Usage:
+  python bench_batch.py
+  python bench_batch.py --tasks 10000 --delay 0.05 --concurrency 1 16 64
+
+Starts an OpenAI-compatible stub that answers after `--delay` seconds (and
+sends a 429 with Retry-After to every `--rate-limit-every`-th request), then
+runs `tasks4.batch.run_batch` over `--tasks` generated descriptions once for
+each concurrency level. Throughput should grow with the concurrency limit
+until the stub or the machine saturates.
+"""
+
+import argparse
+import io
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from openai import OpenAI
+
+from tasks4.batch import SummaryCache, run_batch
+
+
+def start_mock_openai(delay=0.0, rate_limit_every=0, retry_after="0"):
+    """OpenAI-compatible chat completions stub; returns (server, base URL, stats).
+
+    The summary is the description's first word upper-cased. `stats` counts
+    "requests" and "rate_limited" and tracks the "peak" number of requests
+    being served at once.
+    """
+    stats = {"requests": 0, "rate_limited": 0, "active": 0, "peak": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            with lock:
+                stats["requests"] += 1
+                limited = rate_limit_every and stats["requests"] % rate_limit_every == 1
+                stats["active"] += 1
+                stats["peak"] = max(stats["peak"], stats["active"])
+            try:
+                if limited:
+                    stats["rate_limited"] += 1
+                    self.reply(429, {"error": {"message": "rate limited", "type": "rate_limit"}}, {"Retry-After": retry_after})
+                    return
+                time.sleep(delay)
+                description = request["messages"][-1]["content"].split("\n\n", 1)[-1]
+                self.reply(200, {
+                    "id": "mock", "object": "chat.completion", "created": 0, "model": request["model"],
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": description.split()[0].upper()}}],
+                })
+            finally:
+                with lock:
+                    stats["active"] -= 1
+
+        def reply(self, status, payload, headers=()):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in dict(headers).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1", stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=500)
+    parser.add_argument("--delay", type=float, default=0.05)
+    parser.add_argument("--rate-limit-every", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    args = parser.parse_args(argv)
+
+    server, base_url, stats = start_mock_openai(args.delay, args.rate_limit_every, retry_after="0.2")
+    lines = [f"task{i} develop feature number {i} of the park tracker" for i in range(args.tasks)]
+    print(f"{args.tasks} tasks, {args.delay * 1000:.0f} ms per request")
+    print(f"{'concurrency':<18} {'tasks/s':>9} {'seconds':>9}")
+    try:
+        for concurrency in args.concurrency:
+            client = OpenAI(api_key="mock", base_url=base_url, max_retries=0)
+            result = run_batch(client, lines, io.StringIO(), concurrency=concurrency, cache=SummaryCache())
+            print(f"{concurrency:<18} {result['tasks'] / result['seconds']:>9.1f} {result['seconds']:>9.3f}")
+    finally:
+        server.shutdown()
+    print(f"peak concurrent requests {stats['peak']}, rate limited {stats['rate_limited']}")
+
+
+if __name__ == "__main__":
+    main()
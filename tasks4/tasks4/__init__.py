@@ -1,12 +1,16 @@
 from openai import OpenAI
 
-def summarize_task(client, description: str) -> str:
+MODEL = "gpt-5-mini"
+SYSTEM_PROMPT = "You are a helpful assistant that summarizes tasks concisely."
+USER_PROMPT = "Summarize this task in 5 words or fewer:\n\n{description}"
+
+def summarize_task(client, description: str, model: str = MODEL) -> str:
     """Send a paragraph-length description to ChatGPT and return a short summary phrase."""
     response = client.chat.completions.create(
-        model="gpt-5-mini",
+        model=model,
         messages=[
-            {"role": "system", "content": "You are a helpful assistant that summarizes tasks concisely."},
-            {"role": "user", "content": f"Summarize this task in 5 words or fewer:\n\n{description}"}
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": USER_PROMPT.format(description=description)}
         ],
     )
     return response.choices[0].message.content.strip()
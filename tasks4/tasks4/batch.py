@@ -0,0 +1,246 @@
+"""Batch summarization: stream task descriptions through the model concurrently.
+
+Usage:
+  python -m tasks4.batch descriptions.txt -o summaries.jsonl
+  cat descriptions.jsonl | python -m tasks4.batch - --concurrency 32
+
+Input has one description per line, as plain text or as a JSON object with a
+"description" field (and an optional "id", copied to the output). Blank lines
+are skipped. Output is one JSON object per description, in input order:
+
+  {"line": 3, "hash": "...", "summary": "...", "cached": false}
+
+If a request still fails after its retries, the object has "error" instead of
+"summary".
+
+Requests run on a pool of `concurrency` threads. At most `concurrency * 4`
+descriptions are in flight at once, so any input size streams through in
+constant memory. A 429, 5xx or connection error is retried with exponential
+backoff and jitter. A 429 that carries Retry-After pauses every worker until
+that time has passed, not just the one that hit it.
+
+Summaries are cached in a JSON Lines file, keyed by a SHA-256 of the model,
+prompt and description. Re-running over the same input only calls the API for
+descriptions it has not seen.
+"""
+
+import argparse
+import email.utils
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import openai
+from openai import OpenAI
+
+from tasks4 import MODEL, SYSTEM_PROMPT, USER_PROMPT, summarize_task
+
+RETRYABLE = (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError)
+
+
+def content_hash(description: str, model: str = MODEL) -> str:
+    """Cache key of one description; changes when the model or prompt does."""
+    return hashlib.sha256("\0".join((model, SYSTEM_PROMPT, USER_PROMPT, description)).encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    """Summaries by content hash, appended to a JSON Lines file as they arrive."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self._entries[entry["hash"]] = entry["summary"]
+                    except (ValueError, KeyError, TypeError):
+                        continue  # a line cut short by an interrupted run
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        return self._entries.get(key)
+
+    def put(self, key, summary):
+        with self._lock:
+            self._entries[key] = summary
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"hash": key, "summary": summary}) + "\n")
+
+
+class RateLimiter:
+    """A pause shared by all workers, set from a 429's Retry-After."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._until = 0.0
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self._until = max(self._until, time.monotonic() + seconds)
+
+    def wait(self):
+        while True:
+            with self._lock:
+                delay = self._until - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+
+def retry_after(response) -> float | None:
+    """Seconds to wait from a response's retry-after-ms or Retry-After header, or None."""
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return max(0.0, float(headers["retry-after-ms"]) / 1000)
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def summarize_with_retry(client, description: str, limiter: RateLimiter, model: str = MODEL,
+                         retries: int = 6, base_delay: float = 0.5, max_delay: float = 60.0) -> str:
+    """`summarize_task` with backoff on rate limits and transient errors."""
+    for attempt in range(retries + 1):
+        limiter.wait()
+        try:
+            return summarize_task(client, description, model=model)
+        except RETRYABLE as e:
+            if attempt == retries:
+                raise
+            wait = retry_after(getattr(e, "response", None)) if isinstance(e, openai.RateLimitError) else None
+            if wait is not None:
+                limiter.pause(wait)
+            else:
+                time.sleep(min(max_delay, base_delay * 2 ** attempt) * random.uniform(0.5, 1.0))
+
+
+def read_tasks(lines):
+    """Yield (line number, id or None, description) for each non-blank input line."""
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        task_id = None
+        if line.startswith("{"):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            if isinstance(record, dict) and "description" in record:
+                task_id, line = record.get("id"), str(record["description"])
+        yield number, task_id, line
+
+
+def run_batch(client, lines, out, concurrency: int = 8, cache: SummaryCache | None = None,
+              model: str = MODEL, **retry) -> dict:
+    """Summarize every description in `lines`, writing JSON Lines to `out` in input order.
+
+    Returns counts of tasks, cached (answered from the cache), summarized
+    (upstream calls made), coalesced (repeats answered by a call already in
+    flight for the same text) and errors, and the elapsed seconds.
+    """
+    cache = cache if cache is not None else SummaryCache()
+    limiter = RateLimiter()
+    stats = Counter()
+    started = time.perf_counter()
+    pending = deque()  # (record, future or None, whether this record made the call), in input order
+    inflight = {}  # hash -> future, so repeated descriptions share one request
+
+    def work(key, description):
+        summary = summarize_with_retry(client, description, limiter, model=model, **retry)
+        cache.put(key, summary)
+        return summary
+
+    def emit(record, future, owner):
+        if future is not None:
+            try:
+                record["summary"] = future.result()
+                record["cached"] = False
+                stats["summarized" if owner else "coalesced"] += 1
+            except Exception as e:
+                record["error"] = f"{type(e).__name__}: {e}"
+                stats["errors"] += 1
+            if inflight.get(record["hash"]) is future:
+                del inflight[record["hash"]]
+        else:
+            stats["cached"] += 1
+        out.write(json.dumps(record) + "\n")
+
+    def flush(block):
+        while pending and (block or pending[0][1] is None or pending[0][1].done()):
+            emit(*pending.popleft())
+            block = False
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for number, task_id, description in read_tasks(lines):
+            stats["tasks"] += 1
+            key = content_hash(description, model)
+            record = {"line": number, "hash": key}
+            if task_id is not None:
+                record["id"] = task_id
+            summary = cache.get(key)
+            if summary is not None:
+                record.update(summary=summary, cached=True)
+                pending.append((record, None, False))
+            else:
+                future = inflight.get(key)
+                owner = future is None
+                if owner:
+                    future = inflight[key] = pool.submit(work, key, description)
+                pending.append((record, future, owner))
+            flush(block=len(pending) >= concurrency * 4)
+        while pending:
+            flush(block=True)
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    return {name: stats[name] for name in ("tasks", "cached", "summarized", "coalesced", "errors", "seconds")}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", nargs="?", default="-", help="descriptions file, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSON Lines output file, or - for stdout")
+    parser.add_argument("-c", "--concurrency", type=int, default=8)
+    parser.add_argument("--cache", default="summary_cache.jsonl", help='cache file ("" to disable)')
+    parser.add_argument("--model", default=MODEL)
+    parser.add_argument("--retries", type=int, default=6)
+    args = parser.parse_args(argv)
+
+    # retries are handled here so a 429 can pause all workers at once
+    client = OpenAI(max_retries=0)
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        stats = run_batch(client, source, out, concurrency=args.concurrency,
+                          cache=SummaryCache(args.cache or None), model=args.model, retries=args.retries)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    print(json.dumps(stats), file=sys.stderr)
+    return 1 if stats["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
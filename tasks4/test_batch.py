@@ -0,0 +1,39 @@
+import io
+import json
+
+from openai import OpenAI
+
+from bench_batch import start_mock_openai
+from tasks4.batch import SummaryCache, run_batch
+
+
+# Test concurrent summaries in input order, a shared Retry-After pause, and cache hits on a re-run
+def test_run_batch(tmp_path):
+    server, base_url, stats = start_mock_openai(delay=0.05, rate_limit_every=100, retry_after="0.2")
+    client = OpenAI(api_key="mock", base_url=base_url, max_retries=0)
+    lines = [f"task{i} build something useful\n" for i in range(30)]
+    lines[3] = "\n"
+    lines[5] = json.dumps({"id": "t5", "description": "task5 from json"}) + "\n"
+    lines.append("task0 build something useful\n")  # same text as line 1
+    cache_path = tmp_path / "cache.jsonl"
+    try:
+        out = io.StringIO()
+        first = run_batch(client, lines, out, concurrency=8, cache=SummaryCache(cache_path))
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        calls = stats["requests"]
+
+        again = io.StringIO()
+        second = run_batch(client, lines, again, concurrency=8, cache=SummaryCache(cache_path))
+    finally:
+        server.shutdown()
+
+    assert [r["line"] for r in records] == [n for n in range(1, 32) if n != 4]
+    assert [r["summary"] for r in records] == [f"TASK{i}" for i in range(30) if i != 3] + ["TASK0"]
+    assert records[4]["id"] == "t5" and records[0]["hash"] == records[-1]["hash"]
+    # the repeated text is answered by line 1's call, in flight or already cached
+    assert first["tasks"] == 30 and first["errors"] == 0 and first["summarized"] == 29
+    assert first["coalesced"] + first["cached"] == 1
+    assert stats["rate_limited"] == 1 and calls == 30  # one 429, then 29 unique texts + its retry
+    assert 1 < stats["peak"] <= 8
+    assert stats["requests"] == calls and second["cached"] == 30
+    assert [json.loads(line)["summary"] for line in again.getvalue().splitlines()] == [r["summary"] for r in records]
@@ -0,0 +1,665 @@
+import gzip
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cache import PromptCache, TTLCache
+from catalog import LazyCatalog, ParksCatalog
+from finalproject import geo, outbound, route
+import enrich_parks
+import main
+
+
+def start_stub_server(payload, statuses=()):
+    """Serve `payload` as JSON (bytes as-is) from a local HTTP server; returns (server, url, hits list).
+
+    `statuses` lists status codes for the first requests (200 after that).
+    """
+    hits = []
+    statuses = list(statuses)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits.append(self.path)
+            body = payload if isinstance(payload, bytes) else json.dumps(payload).encode('utf-8')
+            self.send_response(statuses.pop(0) if statuses else 200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/api/v1/parks', hits
+
+
+def start_fake_openai(delay=0.0, answer='stub answer'):
+    """OpenAI-compatible chat completions stub (plain and streamed); returns (server, base URL, request bodies)."""
+    calls = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            calls.append(request)
+            time.sleep(delay)
+            if request.get('stream'):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.end_headers()
+                for piece in answer.split(' '):
+                    chunk = {'id': 'stub', 'object': 'chat.completion.chunk', 'created': 0, 'model': 'stub',
+                             'choices': [{'index': 0, 'delta': {'content': piece + ' '}, 'finish_reason': None}]}
+                    self.wfile.write(f'data: {json.dumps(chunk)}\n\n'.encode('utf-8'))
+                    self.wfile.flush()
+                self.wfile.write(b'data: [DONE]\n\n')
+                return
+            body = json.dumps({
+                'id': 'stub', 'object': 'chat.completion', 'created': 0, 'model': 'stub',
+                'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': answer}}],
+            }).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/v1', calls
+
+
+def write_parks(path, parks):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(parks, f)
+
+
+# Test that the catalog indexes parks by id and reloads when the file changes
+def test_catalog_reloads_on_change(tmp_path):
+    path = tmp_path / "parks.json"
+    write_parks(path, [{"id": "a", "name": "Park A", "lat": 40.0, "lon": -100.0}])
+    catalog = ParksCatalog(str(path))
+    assert catalog.get("a")["name"] == "Park A"
+    first = catalog.version
+    assert catalog.version == first  # unchanged file is not re-parsed
+
+    write_parks(path, [{"id": "a", "name": "Park A"}, {"id": "b", "name": "Park B"}])
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1_000_000))
+    assert catalog.get("b")["name"] == "Park B"
+    assert catalog.version == first + 1
+
+
+# Test that a half-written file keeps the previous snapshot
+def test_catalog_keeps_snapshot_on_bad_json(tmp_path):
+    path = tmp_path / "parks.json"
+    write_parks(path, [{"id": "a", "name": "Park A"}])
+    catalog = ParksCatalog(str(path))
+    assert len(catalog.parks()) == 1
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[{"id": "a", ')
+    assert len(catalog.parks()) == 1
+
+
+# Test that concurrent first requests for a derived value build it only once
+def test_catalog_derived_builds_once(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+    path = tmp_path / "parks.json"
+    write_parks(path, [{"id": "a", "name": "Park A"}])
+    catalog = ParksCatalog(str(path))
+    builds = []
+
+    def build(parks):
+        builds.append(1)
+        time.sleep(0.05)
+        return len(parks)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        values = list(pool.map(lambda _: catalog.derived('count', build), range(8)))
+    assert values == [1] * 8 and len(builds) == 1
+
+
+# Test the admin reload endpoint and the detail lookup
+def test_admin_reload_and_detail(monkeypatch):
+    monkeypatch.delenv('NPS_API_KEY', raising=False)
+    monkeypatch.delenv('ADMIN_TOKEN', raising=False)
+    client = main.app.test_client()
+    resp = client.post('/api/admin/reload')
+    assert resp.status_code == 200
+    assert resp.get_json()['count'] == len(main.load_parks())
+
+    park_id = main.load_parks()[0]['id']
+    resp = client.get(f'/api/park/{park_id}')
+    assert resp.get_json()['park']['id'] == park_id
+    assert client.get('/api/park/does-not-exist').status_code == 404
+
+
+# Test that /api/parks serves gzip with an ETag and answers revalidation with 304
+def test_api_parks_etag_and_gzip():
+    client = main.app.test_client()
+    resp = client.get('/api/parks', headers={'Accept-Encoding': 'gzip'})
+    assert resp.status_code == 200
+    assert resp.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(resp.data)) == main.load_parks()
+    etag = resp.headers['ETag']
+
+    resp = client.get('/api/parks', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert resp.status_code == 304
+    assert resp.data == b''
+
+    resp = client.get('/api/parks')
+    assert 'Content-Encoding' not in resp.headers
+    assert resp.get_json() == main.load_parks()
+
+
+# Test that NPS details are fetched once from the stub server and then served from cache
+def test_park_detail_uses_nps_cache(monkeypatch):
+    park = main.load_parks()[0]
+    server, url, hits = start_stub_server({'data': [{'fullName': park['name'] + ' National Park', 'description': 'stub'}]})
+    try:
+        monkeypatch.setenv('NPS_API_KEY', 'test')
+        monkeypatch.setattr(main, 'NPS_API_URL', url)
+        main.NPS_CACHE.clear()
+        client = main.app.test_client()
+        first = client.get(f"/api/park/{park['id']}").get_json()
+        second = client.get(f"/api/park/{park['id']}").get_json()
+        assert first['nps']['description'] == 'stub'
+        assert second == first
+        assert len(hits) == 1
+        stats = client.get('/api/metrics').get_json()['nps_cache']
+        assert stats['hits'] >= 1 and stats['misses'] >= 1
+    finally:
+        server.shutdown()
+
+
+# Test the async app: NPS details through the async client, chat fallback, and Flask routes behind it
+def test_asgi_app(monkeypatch):
+    import asyncio
+    import asgi
+    park = main.load_parks()[0]
+    server, url, hits = start_stub_server({'data': [{'fullName': park['name'] + ' National Park', 'description': 'stub'}]})
+    monkeypatch.setenv('NPS_API_KEY', 'test')
+    monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+    monkeypatch.setattr(main, 'NPS_API_URL', url)
+    monkeypatch.setattr(main, 'ENRICHMENT', LazyCatalog(os.path.join(os.path.dirname(__file__), 'missing.json')))
+    main.NPS_CACHE.clear()
+    app = asgi.AsyncApp(nps_concurrency=2, wsgi_threads=2)
+
+    async def run():
+        try:
+            details = await asyncio.gather(*(asgi.call(app, 'GET', f"/api/park/{park['id']}") for _ in range(3)))
+            missing = await asgi.call(app, 'GET', '/api/park/does-not-exist')
+            chat = await asgi.call(app, 'POST', '/api/chat', b'{"message": "Tell me about Yellowstone"}')
+            bad_chat = await asgi.call(app, 'POST', '/api/chat', b'["Yellowstone"]')
+            parks = await asgi.call(app, 'GET', '/api/parks?x=1', headers=[('Accept-Encoding', 'identity')])
+            return details, missing, chat, bad_chat, parks
+        finally:
+            await outbound.aclose()
+
+    try:
+        details, missing, chat, bad_chat, parks = asyncio.run(run())
+    finally:
+        server.shutdown()
+        app.pool.shutdown()
+    for status, _, body in details:
+        assert status == 200 and json.loads(body)['nps']['description'] == 'stub'
+    assert 1 <= len(hits) <= 3
+    assert missing[0] == 404
+    assert 'Yellowstone' in json.loads(chat[2])['response']
+    assert bad_chat[0] == 400
+    assert parks[0] == 200 and parks[1]['ETag'] and json.loads(parks[2]) == main.load_parks()
+
+
+# Test that lifespan startup builds the retrieval index off the event loop and reports a failed warm-up
+def test_asgi_lifespan_warm_up(monkeypatch):
+    import asyncio
+    import asgi
+    monkeypatch.setattr(main, '_retrieval', None)
+    app = asgi.AsyncApp(wsgi_threads=1)
+    messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message['type'])
+
+    asyncio.run(app({'type': 'lifespan'}, receive, send))
+    assert sent == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+    assert main._retrieval is not None or not main.retrieval.available()
+
+    def broken():
+        raise OSError('parks.json unreadable')
+
+    app = asgi.AsyncApp(wsgi_threads=1)
+    monkeypatch.setattr(app, 'warm_up', broken)
+    messages.append({'type': 'lifespan.startup'})
+    failed = []
+
+    async def send_failed(message):
+        failed.append(message)
+
+    asyncio.run(app({'type': 'lifespan'}, receive, send_failed))
+    assert failed == [{'type': 'lifespan.startup.failed', 'message': 'OSError: parks.json unreadable'}]
+    app.pool.shutdown()
+
+
+# Test that a non-JSON answer from the NPS API is a 502 in the async app
+def test_asgi_park_detail_bad_nps_body(monkeypatch):
+    import asyncio
+    import asgi
+    park = main.load_parks()[0]
+    server, url, hits = start_stub_server(b'<html>maintenance</html>')
+    monkeypatch.setenv('NPS_API_KEY', 'test')
+    monkeypatch.setattr(main, 'NPS_API_URL', url)
+    monkeypatch.setattr(main, 'ENRICHMENT', LazyCatalog(os.path.join(os.path.dirname(__file__), 'missing.json')))
+    main.NPS_CACHE.clear()
+    app = asgi.AsyncApp(wsgi_threads=1)
+
+    async def run():
+        try:
+            return await asgi.call(app, 'GET', f"/api/park/{park['id']}")
+        finally:
+            await outbound.aclose()
+
+    try:
+        status, _, body = asyncio.run(run())
+    finally:
+        server.shutdown()
+        app.pool.shutdown()
+    assert status == 502 and json.loads(body)['error'] == 'failed to fetch NPS data'
+    assert len(hits) == 1
+
+
+# Test that identical chat questions share one LLM call and later ones hit the cache
+def test_chat_cache_coalesces(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    server, base_url, calls = start_fake_openai(delay=0.3)
+    monkeypatch.setenv('OPENAI_API_KEY', 'test-chat-cache')
+    monkeypatch.setenv('OPENAI_BASE_URL', base_url)
+    monkeypatch.setattr(main, 'CHAT_CACHE', PromptCache(maxsize=8, ttl=60))
+    client = main.app.test_client()
+    # park-only questions are answered locally (see test_chat_retrieval), so ask about wildlife
+    questions = ['What wildlife is in Yellowstone?', 'what wildlife is in   yellowstone', 'WHAT WILDLIFE IS IN YELLOWSTONE!'] * 2
+    try:
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            answers = list(pool.map(lambda q: client.post('/api/chat', json={'message': q}).get_json(), questions))
+        again = client.post('/api/chat', json={'message': 'what wildlife is in yellowstone.'}).get_json()
+        other = client.post('/api/chat', json={'message': 'what wildlife is in zion'}).get_json()
+    finally:
+        server.shutdown()
+    assert all(a == {'response': 'stub answer'} for a in answers + [again, other])
+    assert len(calls) == 2
+    stats = client.get('/api/metrics').get_json()['chat_cache']
+    assert stats['misses'] == 2 and stats['hits'] + stats['coalesced'] == 6
+    assert stats['saved_seconds'] >= 0.3 and stats['hit_rate'] == 0.75
+    assert client.post('/api/chat', json=['what wildlife is in zion']).status_code == 400
+
+
+# Test that park-only questions skip the LLM and others get retrieved context with a smaller reply budget
+def test_chat_retrieval(monkeypatch, tmp_path):
+    server, base_url, calls = start_fake_openai()
+    monkeypatch.setenv('OPENAI_API_KEY', 'test-chat-retrieval')
+    monkeypatch.setenv('OPENAI_BASE_URL', base_url)
+    monkeypatch.setattr(main, 'CHAT_CACHE', PromptCache(maxsize=8, ttl=60))
+    monkeypatch.setattr(main, 'RETRIEVAL_INDEX_PATH', str(tmp_path / 'vectors.npz'))
+    monkeypatch.setattr(main, '_retrieval', None)
+    client = main.app.test_client()
+    try:
+        local = client.post('/api/chat', json={'message': 'Where is Acadia?'}).get_json()
+        grounded = client.post('/api/chat', json={'message': 'What wildlife is in Yellowstone?'}).get_json()
+        plain = client.post('/api/chat', json={'message': 'what is the weather like'}).get_json()
+    finally:
+        server.shutdown()
+    assert 'Acadia' in local['response'] and 'Maine' in local['response']
+    assert grounded == plain == {'response': 'stub answer'}
+    assert [c['max_tokens'] for c in calls] == [main.LLM_GROUNDED_MAX_TOKENS, main.LLM_MAX_TOKENS]
+    assert 'Yellowstone' in calls[0]['messages'][1]['content'] and len(calls[1]['messages']) == 2
+    assert (tmp_path / 'vectors.npz').exists()
+    assert client.get('/api/metrics').get_json()['chat_latency']['local']['count'] >= 1
+
+
+def parse_sse(text):
+    """[(event name, JSON payload)] from a server-sent events body."""
+    events = []
+    for block in text.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((fields.get('event', 'message'), json.loads(fields['data'])))
+    return events
+
+
+# Test streaming chat answers as server-sent events, sync and async, with instant cached/fallback replies
+def test_chat_streaming(monkeypatch):
+    import asyncio
+    import asgi
+    server, base_url, calls = start_fake_openai(answer='Old Faithful erupts often')
+    monkeypatch.setenv('OPENAI_API_KEY', 'test-chat-stream')
+    monkeypatch.setenv('OPENAI_BASE_URL', base_url)
+    monkeypatch.setattr(main, 'CHAT_CACHE', PromptCache(maxsize=8, ttl=60))
+    client = main.app.test_client()
+    sse = {'Accept': 'text/event-stream'}
+    try:
+        resp = client.post('/api/chat', json={'message': 'Old Faithful?'}, headers=sse)
+        assert resp.mimetype == 'text/event-stream'
+        events = parse_sse(resp.get_data(as_text=True))
+        assert ''.join(p['delta'] for e, p in events if e == 'message') == 'Old Faithful erupts often '
+        assert events[-1] == ('done', {'response': 'Old Faithful erupts often'})
+        cached = client.post('/api/chat', json={'message': 'old faithful'}, headers=sse)
+        assert cached.get_json() == {'response': 'Old Faithful erupts often'}
+        assert len(calls) == 1 and calls[0]['stream'] is True
+
+        app = asgi.AsyncApp()
+
+        async def run():
+            try:
+                return await asgi.call(app, 'POST', '/api/chat?stream=1', b'{"message": "geysers"}')
+            finally:
+                await outbound.aclose()
+
+        status, headers, body = asyncio.run(run())
+        app.pool.shutdown()
+        assert status == 200 and headers['content-type'].startswith('text/event-stream')
+        assert parse_sse(body.decode('utf-8'))[-1] == ('done', {'response': 'Old Faithful erupts often'})
+    finally:
+        server.shutdown()
+
+    monkeypatch.delenv('OPENAI_API_KEY')
+    fallback = client.post('/api/chat', json={'message': 'hello'}, headers=sse)
+    assert fallback.mimetype == 'application/json' and 'Hi!' in fallback.get_json()['response']
+    latency = client.get('/api/metrics').get_json()['chat_latency']
+    assert latency['stream_first_token']['count'] == 2
+    assert latency['stream_first_byte']['p50_ms'] <= latency['stream_total']['p50_ms']
+    assert latency['cached']['count'] == 1 and latency['fallback']['count'] >= 1
+
+
+# Test that concurrent streamed questions share one LLM call and a failed stream falls back without a retry
+def test_chat_streaming_coalesces(monkeypatch):
+    import asyncio
+    import asgi
+    from concurrent.futures import ThreadPoolExecutor
+    from types import SimpleNamespace
+    server, base_url, calls = start_fake_openai(delay=0.3, answer='Geysers erupt')
+    monkeypatch.setenv('OPENAI_API_KEY', 'test-chat-stream-coalesce')
+    monkeypatch.setenv('OPENAI_BASE_URL', base_url)
+    monkeypatch.setattr(main, 'CHAT_CACHE', PromptCache(maxsize=8, ttl=60))
+    client = main.app.test_client()
+    sse = {'Accept': 'text/event-stream'}
+    app = asgi.AsyncApp()
+
+    async def run_async():
+        try:
+            return await asyncio.gather(*(asgi.call(app, 'POST', '/api/chat?stream=1', b'{"message": "mud pots?"}')
+                                          for _ in range(3)))
+        finally:
+            await outbound.aclose()
+
+    try:
+        def ask(_):
+            r = client.post('/api/chat', json={'message': 'geysers?'}, headers=sse)
+            body = r.get_data(as_text=True)  # read here: the others wait for this stream to finish
+            return r.mimetype, parse_sse(body)[-1][1] if r.mimetype == 'text/event-stream' else json.loads(body)
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            replies = list(pool.map(ask, range(4)))
+        async_replies = asyncio.run(run_async())
+    finally:
+        server.shutdown()
+        app.pool.shutdown()
+    assert [answer for _, answer in replies] == [{'response': 'Geysers erupt'}] * 4
+    assert sum(mimetype == 'text/event-stream' for mimetype, _ in replies) == 1
+    assert [parse_sse(b.decode('utf-8'))[-1][1] if h['content-type'].startswith('text/event-stream') else json.loads(b)
+            for _, h, b in async_replies] == [{'response': 'Geysers erupt'}] * 3
+    assert len(calls) == 2 and main.CHAT_CACHE.stats()['coalesced'] == 5
+
+    attempts = []
+
+    def create(**kwargs):
+        attempts.append(kwargs)
+        raise RuntimeError('upstream down')
+
+    async def acreate(**kwargs):
+        return create(**kwargs)
+
+    monkeypatch.setattr(outbound, 'llm_client', lambda: SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create))))
+    monkeypatch.setattr(outbound, 'async_llm_client', lambda: SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=acreate))))
+    fallback = client.post('/api/chat', json={'message': 'hello'}, headers=sse).get_json()
+    status, _, body = asyncio.run(asgi.call(asgi.AsyncApp(wsgi_threads=1), 'POST', '/api/chat?stream=1', b'{"message": "hello"}'))
+    assert 'Hi!' in fallback['response'] and 'Hi!' in json.loads(body)['response']
+    assert len(attempts) == 2 and all(a.get('stream') for a in attempts)
+    assert not main.CHAT_CACHE._flights and not main.CHAT_CACHE._async_flights
+
+
+# Test prompt cache persistence, expiry and async single flight
+def test_prompt_cache_disk_and_async(tmp_path):
+    import asyncio
+    path = str(tmp_path / 'chat_cache.jsonl')
+    cache = PromptCache(maxsize=2, ttl=60, path=path)
+    assert cache.get_or_call('a', lambda: 'A') == 'A'
+    assert cache.get_or_call('a', lambda: 'not called') == 'A'
+    for key in 'bcd':
+        cache.get_or_call(key, lambda: key.upper())
+    with open(path, 'a') as f:
+        f.write('{"torn')
+    reloaded = PromptCache(maxsize=2, ttl=60, path=path)
+    assert reloaded.get('d') == 'D' and reloaded.get('c') == 'C' and reloaded.get('a') is None
+
+    calls = []
+
+    async def ask():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 'answer'
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError('upstream down')
+
+    async def run():
+        answers = await asyncio.gather(*(reloaded.get_or_call_async('q', ask) for _ in range(5)))
+        errors = await asyncio.gather(*(reloaded.get_or_call_async('x', fail) for _ in range(3)), return_exceptions=True)
+        return answers, errors
+
+    answers, errors = asyncio.run(run())
+    assert answers == ['answer'] * 5 and len(calls) == 1
+    assert all(isinstance(e, ValueError) for e in errors)
+    assert reloaded.get('x') is None
+    assert reloaded.stats()['coalesced'] == 6
+
+
+# Test LRU eviction and negative caching in the TTL cache
+def test_ttl_cache_lru_and_negative():
+    cache = TTLCache(maxsize=2, ttl=60, negative_ttl=0, stale_ttl=0)
+    calls = []
+    cache.get_or_load('a', lambda: calls.append('a') or 1)
+    cache.get_or_load('b', lambda: calls.append('b') or 2)
+    cache.get_or_load('a', lambda: calls.append('a') or 1)
+    cache.get_or_load('c', lambda: calls.append('c') or 3)  # evicts 'b'
+    assert cache.get_or_load('b', lambda: calls.append('b') or 2) == 2
+    assert calls == ['a', 'b', 'c', 'b']
+    assert cache.stats()['evictions'] == 2
+
+    # a None result expires immediately when negative_ttl is 0
+    cache.get_or_load('missing', lambda: calls.append('m'))
+    cache.get_or_load('missing', lambda: calls.append('m'))
+    assert calls.count('m') == 2
+
+
+# Test building the enrichment snapshot and serving details from it without an NPS key
+def test_enrichment_snapshot(monkeypatch, tmp_path):
+    payload = {'total': '1', 'data': [{'parkCode': 'acad', 'fullName': 'Acadia National Park', 'description': 'stub'}]}
+    server, url, hits = start_stub_server(payload)
+    try:
+        parks = [{'id': 'acad', 'name': 'Acadia'}, {'id': 'zzzz', 'name': 'Nowhere'}]
+        records = enrich_parks.build_snapshot(parks, 'test', url=url)
+    finally:
+        server.shutdown()
+    assert records[0]['id'] == 'acad'
+    assert records[0]['nps']['fullName'] == 'Acadia National Park'
+    assert records[1] == {'id': 'zzzz', 'nps': None}
+
+    path = tmp_path / 'nps_enrichment.json'
+    enrich_parks.write_snapshot(records, str(path))
+    monkeypatch.setattr(main, 'ENRICHMENT', LazyCatalog(str(path)))
+    monkeypatch.delenv('NPS_API_KEY', raising=False)
+    data = main.app.test_client().get('/api/park/acad').get_json()
+    assert data['nps']['description'] == 'stub'
+    assert (tmp_path / 'nps_enrichment.json.idx').exists()
+
+
+# Test matching parks to NPS records by code first, then by fuzzy name
+def test_match_parks_fuzzy():
+    import nps
+    items = [{'parkCode': 'grte', 'fullName': 'Grand Teton National Park', 'name': 'Grand Teton'},
+             {'parkCode': 'grca', 'fullName': 'Grand Canyon National Park', 'name': 'Grand Canyon'},
+             {'parkCode': 'yell', 'fullName': 'Yellowstone National Park', 'name': 'Yellowstone'}]
+    parks = [{'id': 'grca', 'name': 'Anything'}, {'id': 'p1', 'name': 'Yelowstone'},
+             {'id': 'p2', 'name': 'grand teton np'}, {'id': 'p3', 'name': 'Grand'}]
+    matched = nps.match_parks(parks, items)
+    assert matched['grca']['fullName'] == 'Grand Canyon National Park'
+    assert matched['p1']['fullName'] == 'Yellowstone National Park'
+    assert matched['p2']['fullName'] == 'Grand Teton National Park'
+    assert 'p3' not in matched
+
+
+# Test streaming records from JSON arrays and JSON Lines, and lookups by id
+def test_record_file(tmp_path):
+    from finalproject.recordfile import RecordFile, read_records
+    records = [{'id': 'a', 'name': 'Tricky "}]" name', 'tags': [{'x': '['}]}, {'id': 7, 'name': 'B'}]
+    array = tmp_path / 'parks.json'
+    array.write_text(json.dumps(records, indent=2))
+    lines = tmp_path / 'parks.jsonl'
+    lines.write_text('\n'.join(json.dumps(r) for r in records) + '\n\n')
+    for path in (array, lines):
+        assert list(RecordFile(path)) == records
+        assert read_records(path) == records
+        assert RecordFile(path).get(7) == records[1]
+        assert RecordFile(path).get('missing') is None
+    assert ParksCatalog(str(lines)).get('a')['name'] == 'Tricky "}]" name'
+
+    # the saved index is reused, and rebuilt once the file changes
+    assert (tmp_path / 'parks.json.idx').exists()
+    array.write_text(json.dumps([{'id': 'c'}]))
+    assert RecordFile(array).get('c') == {'id': 'c'}
+    array.write_text(json.dumps(records)[:-10])
+    try:
+        list(RecordFile(array))
+        assert False, 'truncated array accepted'
+    except ValueError:
+        pass
+
+
+# Test that outbound GETs retry on 503 and reuse one pooled connection
+def test_outbound_retries_and_pool_stats(monkeypatch):
+    server, url, hits = start_stub_server({'ok': True}, statuses=[503])
+    try:
+        monkeypatch.setattr(outbound.JitterRetry, 'get_backoff_time', lambda self: 0)
+        resp = outbound.get(url)
+        assert resp.status_code == 200 and resp.json() == {'ok': True}
+        assert len(hits) == 2
+        outbound.get(url)
+        pools = outbound.stats()['http']['pools']
+        pool = next(p for p in pools if p['host'].endswith(f":{server.server_address[1]}"))
+        assert pool['requests'] == 3
+        assert pool['connections_opened'] == 1
+    finally:
+        server.shutdown()
+
+
+# Test that the spatial index agrees with a brute-force haversine scan
+def test_nearest_matches_brute_force():
+    rng = random.Random(1)
+    parks = [{'id': str(i), 'lat': rng.uniform(-80, 80), 'lon': rng.uniform(-180, 180)} for i in range(2000)]
+    index = geo.ParkIndex(parks)
+    for _ in range(50):
+        lat, lon = rng.uniform(-90, 90), rng.uniform(-180, 180)
+        exclude = {str(rng.randrange(2000)) for _ in range(20)}
+        got = index.nearest(lat, lon, k=5, exclude=exclude)
+        want = sorted((geo.haversine_km(lat, lon, p['lat'], p['lon']), p['id']) for p in parks if p['id'] not in exclude)[:5]
+        assert [p['id'] for p, _ in got] == [pid for _, pid in want]
+        assert abs(got[0][1] - want[0][0]) < 1e-6
+
+
+# Test the /api/nearest endpoint including the unvisited filter
+def test_api_nearest():
+    client = main.app.test_client()
+    park = main.load_parks()[0]
+    data = client.get(f"/api/nearest?lat={park['lat']}&lon={park['lon']}&k=3").get_json()
+    assert data['results'][0]['park']['id'] == park['id']
+    assert data['results'][0]['distance_km'] < 0.01
+    assert len(data['results']) == 3
+
+    data = client.get(f"/api/nearest?lat={park['lat']}&lon={park['lon']}&unvisited=1&visited={park['id']}").get_json()
+    assert data['results'][0]['park']['id'] != park['id']
+    assert client.get('/api/nearest?lat=abc&lon=1').status_code == 400
+
+
+# Test that NumPy and pure-Python batch distances agree with haversine_km
+def test_coordinate_array_backends_agree():
+    rng = random.Random(2)
+    parks = [{'id': str(i), 'lat': rng.uniform(20, 60), 'lon': rng.uniform(-160, -70)} for i in range(300)]
+    points = [(rng.uniform(20, 60), rng.uniform(-160, -70)) for _ in range(10)]
+    fast = geo.CoordinateArray(parks).within(points, 800)
+    slow = geo.CoordinateArray(parks, use_numpy=False).within(points, 800)
+    assert [[p['id'] for p, _ in row] for row in fast] == [[p['id'] for p, _ in row] for row in slow]
+    p = parks[0]
+    want = geo.haversine_km(points[0][0], points[0][1], p['lat'], p['lon'])
+    assert abs(geo.CoordinateArray(parks).distances_from(*points[0])[0] - want) < 1e-6
+    assert abs(geo.CoordinateArray(parks, use_numpy=False).distance_matrix()[0][1]
+               - geo.haversine_km(p['lat'], p['lon'], parks[1]['lat'], parks[1]['lon'])) < 1e-6
+
+
+# Test /api/parks/within with GET and a batched POST
+def test_api_parks_within():
+    client = main.app.test_client()
+    park = main.load_parks()[0]
+    data = client.get(f"/api/parks/within?lat={park['lat']}&lon={park['lon']}&radius_km=1").get_json()
+    assert [hit['park']['id'] for hit in data['results'][0]['parks']] == [park['id']]
+
+    points = [[p['lat'], p['lon']] for p in main.load_parks()[:3]]
+    data = client.post('/api/parks/within', json={'points': points, 'radius_km': 500}).get_json()
+    assert len(data['results']) == 3
+    assert client.post('/api/parks/within', json={'points': points}).status_code == 400
+    assert client.post('/api/parks/within', json=[[40, -100]]).status_code == 400
+    assert client.post('/api/parks/within', json={'points': [[95, 0]], 'radius_km': 1}).status_code == 400
+    assert client.get('/api/parks/within?lat=0&lon=200&radius_km=1').status_code == 400
+    for radius in ('nan', 'inf', '-1'):
+        assert client.get(f'/api/parks/within?lat=0&lon=0&radius_km={radius}').status_code == 400
+
+
+# Test that planned routes visit every stop and are optimal on tiny inputs
+def test_plan_route_small_is_optimal():
+    rng = random.Random(3)
+    for _ in range(5):
+        parks = [{'id': str(i), 'lat': rng.uniform(30, 45), 'lon': rng.uniform(-120, -80)} for i in range(6)]
+        start = (rng.uniform(30, 45), rng.uniform(-120, -80))
+        plan = route.plan_route(route.DistanceMatrix(parks), start, time_budget=1)
+        assert sorted(p['id'] for p in plan.stops) == sorted(p['id'] for p in parks)
+
+        def length(order):
+            pts = [start] + [(p['lat'], p['lon']) for p in order]
+            return sum(geo.haversine_km(*a, *b) for a, b in zip(pts, pts[1:]))
+        assert abs(length(plan.stops) - plan.total_km) < 1e-6
+        assert plan.total_km <= min(length(o) for o in itertools.permutations(parks)) * 1.01
+
+
+# Test /api/route skips visited parks
+def test_api_route():
+    client = main.app.test_client()
+    parks = main.load_parks()[:5]
+    body = {'start': [39.74, -104.99], 'park_ids': [p['id'] for p in parks], 'visited': [parks[0]['id']]}
+    data = client.post('/api/route', json=body).get_json()
+    assert sorted(s['park']['id'] for s in data['stops']) == sorted(p['id'] for p in parks[1:])
+    assert abs(sum(s['leg_km'] for s in data['stops']) - data['total_km']) < 0.01
+    assert client.post('/api/route', json={}).status_code == 400
+    for bad in ({'park_ids': 5}, {'park_ids': 'yell'}, {'visited': 5}, {'visited': [1]}, {'start': [400, -105]}):
+        assert client.post('/api/route', json={**body, **bad}).status_code == 400
+    assert client.post('/api/route', json=[body]).status_code == 400